@@ -1,16 +1,18 @@
 # countries are taken from https://www.kaggle.com/nikitagrec/world-capitals-gps/data
-import sys
-import traceback
+import os
 
-from flask_taxonomies.api import TermIdentification
+from flask_taxonomies.importer import import_terms, read_records
 from flask_taxonomies.models import Base
 from flask_taxonomies.proxies import current_flask_taxonomies
-import os
-import csv
 
 
 def import_countries(db):
-    # with db.session.begin_nested():
+    """
+    Imports the countries into the 'country' taxonomy, the same can be done from the command line:
+
+        flask taxonomies import country example/countries.csv --slug ContinentName --slug CountryCode \\
+            --title 'List of countries' --url https://www.kaggle.com/nikitagrec/world-capitals-gps/data
+    """
     try:
         Base.metadata.create_all(db.engine)
     except:
@@ -27,33 +29,6 @@ def import_countries(db):
         },
         url='https://www.kaggle.com/nikitagrec/world-capitals-gps/data')
 
-    continents = {}
     with open(os.path.join(os.path.dirname(__file__), 'countries.csv'), 'r') as f:
-        rdr = csv.DictReader(f)
-        for row in rdr:
-            try:
-                continent = row['ContinentName']
-                country = row['CountryCode']
-                if continent not in continents:
-                    print('Creating continent', continent.lower())
-                    continent_term = current_flask_taxonomies.create_term(
-                        TermIdentification(taxonomy=tax, slug=continent.lower().replace(' ', '-')),
-                    )
-                    continents[continent] = continent_term
-
-                slug = '%s/%s' % (continent.lower(), country.lower())
-                slug = slug.replace(' ', '-')
-                print('Importing', slug)
-                current_flask_taxonomies.create_term(
-                    TermIdentification(taxonomy=tax, slug=slug),
-                    extra_data=row
-                )
-            except:
-                traceback.print_exc()
-                return
-    try:
-        db.session.commit()
-    except:
-        traceback.print_exc()
-        sys.exit(1)
-        
+        stats = import_terms(tax, read_records(f, 'csv'), ['ContinentName', 'CountryCode'])
+    print('Imported %s terms' % stats.created)
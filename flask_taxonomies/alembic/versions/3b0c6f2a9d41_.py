@@ -0,0 +1,37 @@
+"""term change log
+
+Revision ID: 3b0c6f2a9d41
+Revises: e9f9ed09a386
+Create Date: 2026-10-19 10:12:40.118209
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+import flask_taxonomies.fields
+
+# revision identifiers, used by Alembic.
+revision = '3b0c6f2a9d41'
+down_revision = 'e9f9ed09a386'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('taxonomy_term_change',
+    sa.Column('seq', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('operation', sa.Enum('created', 'updated', 'deleted', 'moved', name='termchangeenum'), nullable=False),
+    sa.Column('taxonomy_code', sa.String(length=256), nullable=True),
+    sa.Column('slug', flask_taxonomies.fields.SlugType().with_variant(flask_taxonomies.fields.PostgresSlugType(), 'postgresql'), nullable=True),
+    sa.Column('target_slug', flask_taxonomies.fields.SlugType().with_variant(flask_taxonomies.fields.PostgresSlugType(), 'postgresql'), nullable=True),
+    sa.Column('term_id', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index(op.f('ix_taxonomy_term_change_taxonomy_code'), 'taxonomy_term_change', ['taxonomy_code'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_taxonomy_term_change_taxonomy_code'), table_name='taxonomy_term_change')
+    op.drop_table('taxonomy_term_change')
+    sa.Enum(name='termchangeenum').drop(op.get_bind(), checkfirst=True)
@@ -1,48 +1,69 @@
+import datetime
+import functools
 import logging
+import threading
+from collections import defaultdict
 from dataclasses import MISSING
+from urllib.parse import urlparse
 
 import jsonpatch
 import jsonpointer
 import sqlalchemy
-from flask import current_app
+from flask import current_app, g, has_app_context
 from flask_sqlalchemy import get_state
 from slugify import slugify
 from sqlalchemy import func
-from sqlalchemy.orm import Session, aliased
+from sqlalchemy.orm import Session, aliased, scoped_session, sessionmaker
 from sqlalchemy.orm.attributes import flag_modified
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.util import deprecated
 from werkzeug.utils import cached_property, import_string
 
+from .cache import NegativeCache, SingleFlight
 from .constants import INCLUDE_DATA, INCLUDE_DESCENDANTS
 from .models import (
     Taxonomy,
     TaxonomyError,
     TaxonomyTerm,
     TaxonomyTermBusyError,
+    TaxonomyTermChange,
+    TermChangeEnum,
     TermStatusEnum,
 )
 from .signals import (
     after_taxonomy_created,
     after_taxonomy_deleted,
+    after_taxonomy_synced,
     after_taxonomy_term_created,
     after_taxonomy_term_deleted,
     after_taxonomy_term_moved,
     after_taxonomy_term_updated,
+    after_taxonomy_terms_bulk_created,
     after_taxonomy_updated,
     before_taxonomy_created,
     before_taxonomy_deleted,
+    before_taxonomy_synced,
     before_taxonomy_term_created,
     before_taxonomy_term_deleted,
     before_taxonomy_term_moved,
     before_taxonomy_term_updated,
+    before_taxonomy_terms_bulk_created,
     before_taxonomy_updated,
 )
+from .sync import TermDiff, parse_tree
 from .term_identification import TermIdentification, _coerce_ti
 from .views.perms import PermsEnforcer
 
 log = logging.getLogger(__name__)
 
+# session.info key of callables run after the session's transaction is committed
+AFTER_COMMIT_CALLBACKS = 'flask_taxonomies_after_commit'
+
+# postgresql advisory lock serializing the writers of the change log, see Api._lock_change_log
+CHANGE_LOG_LOCK_KEY = 0x74786368
+# connection.info key of the transaction holding the lock
+CHANGE_LOG_LOCKED = 'flask_taxonomies_change_log_locked'
+
 
 class Api:
     def __init__(self, app=None):
@@ -54,10 +75,88 @@ class Api:
         db = get_state(self.app).db
         return db.session
 
+    @property
+    def read_session(self):
+        """
+        Session used by the read methods when no session is passed. After ``use_read_copy`` has been called
+        in the current application context (by the GET requests of the REST API), it is the session
+        of the read-only snapshot if FLASK_TAXONOMIES_SNAPSHOT is set or of the FLASK_TAXONOMIES_READ_BIND
+        database (a replica). Otherwise, and after ``use_primary``, it is ``session``, so that the reads
+        of a script see its own writes and return terms that can be passed to the write methods.
+        Writes always use ``session``.
+        """
+        if not has_app_context() or not g.get('flask_taxonomies_read_copy') or g.get('flask_taxonomies_primary'):
+            return self.session
+        if self.snapshot_session is not None:
+            return self.snapshot_session
+        if self.read_bind_session is not None:
+            return self.read_bind_session
+        return self.session
+
+    def use_read_copy(self):
+        """
+        Makes the read methods use the snapshot or the read replica, if configured, for the rest
+        of the application context. Called for read-only requests.
+        """
+        g.flask_taxonomies_read_copy = True
+
+    def use_primary(self):
+        """
+        Makes the read methods use the primary database for the rest of the application context,
+        even if ``use_read_copy`` has been called. Called for all non-GET requests.
+        """
+        g.flask_taxonomies_primary = True
+
+    @cached_property
+    def snapshot_session(self):
+        path = self.app.config.get('FLASK_TAXONOMIES_SNAPSHOT')
+        if not path:
+            return None
+        from .snapshot import snapshot_engine
+        return scoped_session(sessionmaker(bind=snapshot_engine(path)))
+
+    @cached_property
+    def read_bind_session(self):
+        bind = self.app.config.get('FLASK_TAXONOMIES_READ_BIND')
+        if not bind:
+            return None
+        db = get_state(self.app).db
+        return scoped_session(sessionmaker(bind=db.get_engine(self.app, bind=bind)))
+
+    def remove_read_sessions(self, exc=None):
+        if self.snapshot_session is not None:
+            self.snapshot_session.remove()
+        if self.read_bind_session is not None:
+            self.read_bind_session.remove()
+
+    @cached_property
+    def binary_snapshots(self):
+        directory = self.app.config.get('FLASK_TAXONOMIES_BINARY_SNAPSHOT_DIR')
+        if not directory:
+            return None
+        from .binary_snapshot import SnapshotRegistry
+        check_interval = self.app.config.get('FLASK_TAXONOMIES_BINARY_SNAPSHOT_CHECK_INTERVAL', 1)
+        return SnapshotRegistry(directory, check_interval=check_interval)
+
+    @cached_property
+    def async_api(self):
+        """The asyncio variant of this api, see ``flask_taxonomies.async_api.AsyncApi``"""
+        from .async_api import AsyncApi
+        return AsyncApi(self)
+
+    def binary_snapshot(self, code):
+        """
+        Memory-mapped binary snapshot of the taxonomy (see ``binary_snapshot.TaxonomySnapshot``)
+        or None if FLASK_TAXONOMIES_BINARY_SNAPSHOT_DIR is not set or contains no snapshot of the taxonomy.
+        """
+        if self.binary_snapshots is None:
+            return None
+        return self.binary_snapshots.get(code)
+
     def list_taxonomies(self, session=None, return_descendants_count=False,
                         return_descendants_busy_count=False):
         """Return a list of all available taxonomies."""
-        session = session or self.session
+        session = session or self.read_session
 
         query_parts = [Taxonomy]
         if return_descendants_count:
@@ -155,7 +254,7 @@ class Api:
                       status_cond=TaxonomyTerm.status == TermStatusEnum.alive,
                       order=True, session=None, return_descendants_count=False,
                       return_descendants_busy_count=False):
-        session = session or self.session
+        session = session or self.read_session
 
         query_parts = [TaxonomyTerm]
         if return_descendants_count:
@@ -220,6 +319,31 @@ class Api:
             ret = ret + '?representation:include=' + INCLUDE_DESCENDANTS
         return ret
 
+    def parse_term_url(self, url, taxonomy_code=None):
+        """
+        Splits term url (as returned by taxonomy_term_url) into taxonomy code and slug.
+
+        :param url: term url, path starting with FLASK_TAXONOMIES_URL_PREFIX or "code/slug"
+        :param taxonomy_code: if set, the url might be just a slug inside this taxonomy
+        :return: tuple (taxonomy_code, slug)
+        :raises TaxonomyError: if the url does not point to a term on this server
+        """
+        prefix = current_app.config['FLASK_TAXONOMIES_URL_PREFIX']
+        if url.startswith('http://') or url.startswith('https://') or url.startswith(prefix):
+            path = urlparse(url).path
+            if not path.startswith(prefix):
+                raise TaxonomyError('Url %s does not start with FLASK_TAXONOMIES_URL_PREFIX' % url)
+            path = path[len(prefix):]
+        elif taxonomy_code:
+            path = taxonomy_code + '/' + url.lstrip('/')
+        else:
+            path = url.lstrip('/')
+        path = path.strip('/')
+        if '/' not in path:
+            raise TaxonomyError('Url %s does not identify a taxonomy term' % url)
+        code, slug = path.split('/', maxsplit=1)
+        return code, slug
+
     def taxonomy_term_parent_url(self, taxonomy_term: TaxonomyTerm, descendants=False):
         if '/' not in taxonomy_term.slug:
             return None
@@ -254,26 +378,323 @@ class Api:
                                   taxonomy_id=taxonomy.id,
                                   taxonomy_code=taxonomy.code)
             session.add(parent)
+            self._log_change(TermChangeEnum.created, parent, session=session)
+            self._discard_not_found(taxonomy.code, slug, session=session)
             after_taxonomy_term_created.send(parent, taxonomy=taxonomy, term=parent)
             return parent
 
+    def bulk_create_terms(self, taxonomy: [Taxonomy, str], terms, chunk_size=1000, session=None):
+        """
+        Creates many terms with set-based inserts.
+
+        The per-term signals are not sent, receivers of before/after_taxonomy_terms_bulk_created
+        get the slugs of the created terms instead.
+
+        :param taxonomy: taxonomy or its code
+        :param terms: iterable of (slug, extra_data). The parent of each term must be an alive term
+                      in the database or be contained in terms as well
+        :param chunk_size: max number of rows inserted by a single statement
+        :return: dict slug -> id of the created terms
+        """
+        session = session or self.session
+        if isinstance(taxonomy, str):
+            taxonomy = self.get_taxonomy(taxonomy, session=session)
+        by_level = defaultdict(list)
+        for slug, extra_data in terms:
+            by_level[slug.count('/')].append((slug, extra_data))
+        if not by_level:
+            return {}
+
+        slugs = [slug for level_terms in by_level.values() for slug, _ in level_terms]
+        before_taxonomy_terms_bulk_created.send(taxonomy, slugs=slugs)
+        table = TaxonomyTerm.__table__
+        ids = {}
+        with session.begin_nested():
+            # parents have to be inserted before their children to know their ids
+            for level in sorted(by_level):
+                level_terms = by_level[level]
+                if level:
+                    parent_slugs = set(slug.rsplit('/', maxsplit=1)[0] for slug, _ in level_terms)
+                    ids.update(self._term_ids(taxonomy, parent_slugs - ids.keys(), chunk_size, session))
+                rows = [self._bulk_term_row(taxonomy, level, slug, extra_data, ids)
+                        for slug, extra_data in level_terms]
+                for i in range(0, len(rows), chunk_size):
+                    session.execute(table.insert(), rows[i:i + chunk_size])
+                ids.update(self._term_ids(taxonomy, [row['slug'] for row in rows], chunk_size, session))
+            self._log_term_changes(TermChangeEnum.created, [ids[slug] for slug in slugs],
+                                   chunk_size=chunk_size, session=session)
+        for slug in slugs:
+            self._discard_not_found(taxonomy.code, slug, session=session)
+        after_taxonomy_terms_bulk_created.send(taxonomy, slugs=slugs)
+        return {slug: ids[slug] for slug in slugs}
+
+    @staticmethod
+    def _bulk_term_row(taxonomy, level, slug, extra_data, ids):
+        parent_id = None
+        if level:
+            parent_id = ids.get(slug.rsplit('/', maxsplit=1)[0])
+            if parent_id is None:
+                raise TaxonomyError('Can not create term %s, its parent does not exist' % slug)
+        return {
+            'slug': slug,
+            'extra_data': extra_data,
+            'level': level,
+            'parent_id': parent_id,
+            'taxonomy_id': taxonomy.id,
+            'taxonomy_code': taxonomy.code,
+            'busy_count': 0,
+            'status': TermStatusEnum.alive
+        }
+
+    def _term_ids(self, taxonomy, slugs, chunk_size, session):
+        slugs = list(slugs)
+        ret = {}
+        for i in range(0, len(slugs), chunk_size):
+            ret.update(session.query(TaxonomyTerm.slug, TaxonomyTerm.id).filter(
+                TaxonomyTerm.taxonomy_id == taxonomy.id,
+                TaxonomyTerm.status == TermStatusEnum.alive,
+                TaxonomyTerm.slug.in_(slugs[i:i + chunk_size])
+            ))
+        return ret
+
+    def sync_taxonomy(self, taxonomy: [Taxonomy, str], tree, dry_run=False, chunk_size=1000, check=None,
+                      session=None):
+        """
+        Makes the terms of the taxonomy match the tree, changing only the terms that differ.
+
+        The tree has the shape returned by ``utils.to_json``. The differences are computed in memory
+        from a single read of the taxonomy and applied with set-based statements: missing terms are
+        created, terms with changed data are updated and terms missing in the tree are marked
+        as deleted. Terms that are not alive in the tree and have ``obsoleted_by`` are moved there.
+
+        Per-term signals are sent only for moves, receivers of before/after_taxonomy_synced
+        get the computed differences.
+
+        :param taxonomy: taxonomy or its code
+        :param tree: list of nodes
+        :param dry_run: only compute the differences, do not modify the database
+        :param check: called with the taxonomy and each ``sync.TermDiff`` before it is applied,
+                      may raise to abort the sync
+        :return: dict with lists of 'created', 'updated', 'deleted' slugs and 'moved' (old slug, new slug) pairs
+        :raises TaxonomyError: if the tree is not valid
+        :raises TaxonomyTermBusyError: if a term that should be changed is busy or lies in a busy subtree
+        """
+        session = session or self.session
+        if isinstance(taxonomy, str):
+            taxonomy = self.get_taxonomy(taxonomy, session=session)
+        desired, moves = parse_tree(tree)
+
+        diff = TermDiff(self._sync_state(taxonomy, session), desired, moves)
+        if check:
+            check(taxonomy, diff)
+        if dry_run:
+            return diff.as_dict()
+
+        with session.begin_nested():
+            before_taxonomy_synced.send(taxonomy, diff=diff)
+            self._apply_diff(taxonomy, diff, desired, chunk_size, session)
+            if diff.moved:
+                for old_slug, new_slug in diff.moved:
+                    self._sync_move(taxonomy, old_slug, new_slug, session)
+                # terms inside moved subtrees
+                moved_diff = TermDiff(self._sync_state(taxonomy, session), desired)
+                if check:
+                    check(taxonomy, moved_diff)
+                self._apply_diff(taxonomy, moved_diff, desired, chunk_size, session)
+                diff.created.extend(moved_diff.created)
+                diff.revived.extend(moved_diff.revived)
+                diff.updated.extend(moved_diff.updated)
+                diff.deleted.extend(moved_diff.deleted)
+            after_taxonomy_synced.send(taxonomy, diff=diff)
+        return diff.as_dict()
+
+    def _sync_state(self, taxonomy, session):
+        return {
+            slug: (term_id, status, extra_data, busy_count)
+            for term_id, slug, status, extra_data, busy_count in session.query(
+                TaxonomyTerm.id, TaxonomyTerm.slug, TaxonomyTerm.status,
+                TaxonomyTerm.extra_data, TaxonomyTerm.busy_count
+            ).filter(TaxonomyTerm.taxonomy_id == taxonomy.id)
+        }
+
+    def _apply_diff(self, taxonomy, diff, desired, chunk_size, session):
+        if diff.busy:
+            raise TaxonomyTermBusyError('Can not change busy terms %s' % ', '.join(diff.busy))
+        table = TaxonomyTerm.__table__
+        if diff.revived:
+            session.execute(table.update().where(table.c.id == sqlalchemy.bindparam('term_id')).values(
+                extra_data=sqlalchemy.bindparam('extra_data'),
+                status=TermStatusEnum.alive,
+                obsoleted_by_id=None
+            ), [{'term_id': term_id, 'extra_data': desired[slug]} for term_id, slug in diff.revived])
+            self._log_term_changes(TermChangeEnum.created, [term_id for term_id, _ in diff.revived],
+                                   chunk_size=chunk_size, session=session)
+        if diff.updated:
+            session.execute(table.update().where(table.c.id == sqlalchemy.bindparam('term_id')).values(
+                extra_data=sqlalchemy.bindparam('extra_data')
+            ), [{'term_id': term_id, 'extra_data': desired[slug]} for term_id, slug in diff.updated])
+            self._log_term_changes(TermChangeEnum.updated, [term_id for term_id, _ in diff.updated],
+                                   chunk_size=chunk_size, session=session)
+        if diff.created:
+            self.bulk_create_terms(taxonomy, [(slug, desired[slug]) for slug in diff.created],
+                                   chunk_size=chunk_size, session=session)
+        deleted_ids = [term_id for term_id, _ in diff.deleted]
+        for i in range(0, len(deleted_ids), chunk_size):
+            session.execute(table.update().where(table.c.id.in_(deleted_ids[i:i + chunk_size])).values(
+                status=TermStatusEnum.deleted
+            ))
+        self._log_term_changes(TermChangeEnum.deleted, deleted_ids, chunk_size=chunk_size, session=session)
+        session.expire_all()
+
+    def _sync_move(self, taxonomy, old_slug, new_slug, session):
+        ti = TermIdentification(taxonomy=taxonomy, slug=old_slug)
+        new_parent = new_slug.rsplit('/', maxsplit=1)[0] if '/' in new_slug else None
+        new_leaf = self._last_slug_element(new_slug)
+        if new_parent:
+            parent_ti = TermIdentification(taxonomy=taxonomy, slug=new_parent)
+            if ti.contains(parent_ti):
+                raise TaxonomyError('Can not move inside self')
+            elements = self.descendants_or_self(ti, status_cond=sqlalchemy.sql.true(), order=False,
+                                                session=session)
+            self._rename_or_move(elements, parent_query=self.filter_term(parent_ti, session=session),
+                                 slug=new_leaf, remove_after_delete=False, session=session)
+            return
+        if '/' in old_slug:
+            # rename keeps the current parent, so move to root first
+            _, moved = self.move_term(ti, new_parent='', remove_after_delete=False, session=session)
+            ti = TermIdentification(taxonomy=taxonomy, slug=moved.slug)
+        if self._last_slug_element(ti.slug) != new_leaf:
+            self.rename_term(ti, new_slug=new_leaf, remove_after_delete=False, session=session)
+
     def filter_term(self, ti: TermIdentification,
                     status_cond=TaxonomyTerm.status == TermStatusEnum.alive,
                     return_descendants_count=False,
                     return_descendants_busy_count=False,
                     session=None):
         ti = _coerce_ti(ti)
-        session = session or self.session
+        session = session or self.read_session
         return ti.term_query(session, return_descendants_count=return_descendants_count,
                              return_descendants_busy_count=return_descendants_busy_count).filter(status_cond)
 
+    def filter_terms(self, taxonomy: [Taxonomy, str], slugs,
+                     status_cond=TaxonomyTerm.status == TermStatusEnum.alive,
+                     order=True, session=None, return_descendants_count=False,
+                     return_descendants_busy_count=False):
+        """Returns terms with the given slugs inside a taxonomy, using a single query."""
+        return self.list_taxonomy(taxonomy, status_cond=status_cond, order=order, session=session,
+                                  return_descendants_count=return_descendants_count,
+                                  return_descendants_busy_count=return_descendants_busy_count). \
+            filter(TaxonomyTerm.slug.in_(list(slugs)))
+
+    def resolve_urls(self, urls, chunk_size=500, session=None):
+        """
+        Resolves term urls (as returned by taxonomy_term_url) to alive terms.
+
+        Urls of moved terms resolve to the final term in their obsoleted_by chain.
+        Terms are looked up with set-based queries, grouped by taxonomy, so this is suitable
+        for resolving thousands of urls at once.
+
+        :param urls: iterable of term urls
+        :param chunk_size: max number of slugs looked up in a single query
+        :param session: use a different db session
+        :return: dictionary url -> TaxonomyTerm, or None if the url does not resolve to an alive term
+        """
+        session = session or self.read_session
+        ret = {}
+        requested = {}  # taxonomy code -> slug -> urls
+        for url in urls:
+            ret[url] = None
+            try:
+                code, slug = self.parse_term_url(url)
+            except TaxonomyError:
+                continue
+            requested.setdefault(code, {}).setdefault(slug, []).append(url)
+
+        obsoleted = {}  # obsoleted_by_id -> urls
+        for code, slugs in requested.items():
+            self._resolve_slugs(code, slugs, ret, obsoleted, chunk_size, session)
+
+        for term_id, term in self.resolve_obsoleted(obsoleted, chunk_size=chunk_size, session=session).items():
+            for url in obsoleted[term_id]:
+                ret[url] = term
+        return ret
+
+    def _resolve_slugs(self, code, slugs, ret, obsoleted, chunk_size, session):
+        # alive terms go to ret, urls of moved terms are collected in obsoleted by obsoleted_by_id
+        slug_list = list(slugs)
+        for start in range(0, len(slug_list), chunk_size):
+            terms = self.filter_terms(code, slug_list[start:start + chunk_size], order=False,
+                                      status_cond=sqlalchemy.sql.true(), session=session)
+            for term in terms:
+                if term.status == TermStatusEnum.alive:
+                    for url in slugs[term.slug]:
+                        ret[url] = term
+                elif term.obsoleted_by_id:
+                    obsoleted.setdefault(term.obsoleted_by_id, []).extend(slugs[term.slug])
+
+    def resolve_obsoleted(self, term_ids, chunk_size=500, max_depth=100, session=None):
+        """
+        Follows obsoleted_by links of moved terms to the final alive term.
+
+        The whole chain is resolved with a single recursive query (per chunk of term_ids),
+        regardless of how many times the terms have been moved.
+
+        :param term_ids: ids of terms to start with. Alive terms resolve to themselves
+        :param chunk_size: max number of term ids resolved in a single query
+        :param max_depth: max length of the followed chain, guards against cycles
+        :param session: use a different db session
+        :return: dictionary term id -> alive TaxonomyTerm. Ids whose chain does not end
+                 in an alive term are left out
+        """
+        session = session or self.read_session
+        term_ids = list(term_ids)
+        ret = {}
+        for start in range(0, len(term_ids), chunk_size):
+            chain = session.query(
+                TaxonomyTerm.id.label('start_id'),
+                TaxonomyTerm.id.label('term_id'),
+                sqlalchemy.literal(0).label('depth')
+            ).filter(TaxonomyTerm.id.in_(term_ids[start:start + chunk_size])).cte('obsoleted_chain', recursive=True)
+
+            obsoleted = aliased(TaxonomyTerm, name='obsoleted_term')
+            chain = chain.union_all(
+                session.query(chain.c.start_id, obsoleted.obsoleted_by_id, chain.c.depth + 1).filter(
+                    obsoleted.id == chain.c.term_id,
+                    obsoleted.status != TermStatusEnum.alive,
+                    obsoleted.obsoleted_by_id.isnot(None),
+                    chain.c.depth < max_depth
+                )
+            )
+            query = session.query(chain.c.start_id, TaxonomyTerm).join(
+                TaxonomyTerm, TaxonomyTerm.id == chain.c.term_id
+            ).filter(TaxonomyTerm.status == TermStatusEnum.alive)
+            for start_id, term in query:
+                ret[start_id] = term
+        return ret
+
     def update_term(self, ti: [TaxonomyTerm, TermIdentification],
                     status_cond=TaxonomyTerm.status == TermStatusEnum.alive,
-                    extra_data=None, patch=False, status=MISSING, session=None):
+                    extra_data=None, patch=False, status=MISSING, reload=True, session=None):
+        """
+        Updates extra_data (and optionally status) of a taxonomy term.
+
+        :param ti: term identification or the term
+        :param status_cond: the term is looked up only among terms satisfying the condition
+        :param extra_data: new extra data, or a json patch if ``patch`` is set
+        :param status: new status of the term
+        :param reload: if False and ``ti`` is a TaxonomyTerm loaded in ``session``, the term is updated
+                       as it is, without looking it up again. The caller is responsible for checking its status,
+                       ``status_cond`` is not used
+        :return: the updated term
+        """
+        loaded_term = ti if not reload and isinstance(ti, TaxonomyTerm) else None
         ti = _coerce_ti(ti)
         session = session or self.session
         with session.begin_nested():
-            term = self.filter_term(ti, status_cond=status_cond, session=session).one()
+            if loaded_term is not None:
+                term = loaded_term
+            else:
+                term = self.filter_term(ti, status_cond=status_cond, session=session).one()
 
             before_taxonomy_term_updated.send(term, term=term, taxonomy=term.taxonomy,
                                               extra_data=extra_data)
@@ -288,6 +709,7 @@ class Api:
                 term.status = status
                 flag_modified(term, "status")
             session.add(term)
+            self._log_change(TermChangeEnum.updated, term, session=session)
             after_taxonomy_term_updated.send(term, term=term, taxonomy=term.taxonomy)
             return term
 
@@ -320,7 +742,7 @@ class Api:
                      return_descendants_count=False,
                      return_descendants_busy_count=False):
         ti = _coerce_ti(ti)
-        session = session or self.session
+        session = session or self.read_session
         query = ti.descendant_query(session,
                                     return_descendants_count=return_descendants_count,
                                     return_descendants_busy_count=return_descendants_busy_count)
@@ -349,7 +771,7 @@ class Api:
     def _ancestors(self, ti: TermIdentification, return_term=True, status_cond=None, session=session,
                    return_descendants_count=False, return_descendants_busy_count=False):
         ti = _coerce_ti(ti)
-        session = session or self.session
+        session = session or self.read_session
         query = ti.ancestor_query(session,
                                   return_descendants_count=return_descendants_count,
                                   return_descendants_busy_count=return_descendants_busy_count)
@@ -364,7 +786,7 @@ class Api:
         session = session or self.session
         with session.begin_nested():
             terms = self.descendants_or_self(ti,
-                                             order=False, status_cond=sqlalchemy.sql.true())
+                                             order=False, status_cond=sqlalchemy.sql.true(), session=session)
             locked_terms = [r[0] for r in
                             terms.with_for_update().values(TaxonomyTerm.id)]  # get ids to actually lock the terms
 
@@ -384,6 +806,8 @@ class Api:
             taxonomy = term.taxonomy
             before_taxonomy_term_deleted.send(term, taxonomy=taxonomy, term=term, terms=terms,
                                               locked_terms=locked_terms)
+            # logged before unmark_busy, which removes delete_pending terms
+            self._log_term_changes(TermChangeEnum.deleted, locked_terms, session=session)
             self.unmark_busy(locked_terms, session=session)
             after_taxonomy_term_deleted.send(term, taxonomy=taxonomy, term=term)
             return term
@@ -419,7 +843,8 @@ class Api:
     def rename_term(self, ti: TermIdentification, new_slug=None,
                     remove_after_delete=True, session=None):
         ti = _coerce_ti(ti)
-        elements = self.descendants_or_self(ti, status_cond=sqlalchemy.sql.true(), order=False)
+        session = session or self.session
+        elements = self.descendants_or_self(ti, status_cond=sqlalchemy.sql.true(), order=False, session=session)
         return self._rename_or_move(elements, parent_query=None, slug=new_slug,
                                     remove_after_delete=remove_after_delete, session=session)
 
@@ -496,10 +921,11 @@ class Api:
                            status=(
                                TermStatusEnum.delete_pending
                                if remove_after_delete else TermStatusEnum.deleted
-                           ))
+                           ), session=session)
             before_taxonomy_term_moved.send(root, target_path=target_path, terms=elements, locked_terms=locked_terms)
             target_root = self._copy(root, parent, target_path, session)
-            self.unmark_busy(locked_terms)
+            self._discard_not_found(target_root.taxonomy_code, target_path, prefix=True, session=session)
+            self.unmark_busy(locked_terms, session=session)
             if not remove_after_delete:
                 session.refresh(root)
                 root.obsoleted_by_id = target_root.id
@@ -525,12 +951,97 @@ class Api:
         assert new_term.id > 0
         term.obsoleted_by_id = new_term.id
         session.add(term)
+        self._log_change(TermChangeEnum.moved, term, target_slug=target_path, session=session)
         for child in term.children:
             self._copy(child, new_term,
                        target_path + '/' + self._last_slug_element(child.slug),
                        session)
         return new_term
 
+    @property
+    def change_log_enabled(self):
+        return self.app.config.get('FLASK_TAXONOMIES_CHANGE_LOG', False)
+
+    def _discard_not_found(self, code, slug, prefix=False, session=None):
+        # a concurrent request might not see the uncommitted term and cache it as not found again,
+        # so the entry is removed once more when the transaction is committed
+        if prefix:
+            discard = functools.partial(self.negative_cache.discard_prefix, code, slug)
+        else:
+            discard = functools.partial(self.negative_cache.discard, (code, slug))
+        discard()
+        session = session or self.session
+        session.info.setdefault(AFTER_COMMIT_CALLBACKS, []).append(discard)
+
+    @staticmethod
+    def _lock_change_log(session):
+        """
+        Makes the transactions writing to the change log commit in the order of their seq: on PostgreSQL
+        the first write takes a transaction-level advisory lock, SQLite has a single writer anyway.
+        Otherwise a reader could see a change committed with a higher seq before the one with a lower seq
+        and skip the latter when continuing from its last seen seq.
+        """
+        connection = session.connection()
+        if connection.dialect.name != 'postgresql':
+            return
+        transaction = connection.get_transaction()
+        if connection.info.get(CHANGE_LOG_LOCKED) is not transaction:
+            connection.execute(sqlalchemy.text('SELECT pg_advisory_xact_lock(:key)'), {'key': CHANGE_LOG_LOCK_KEY})
+            connection.info[CHANGE_LOG_LOCKED] = transaction
+
+    def _log_change(self, operation, term, target_slug=None, session=None):
+        if not self.change_log_enabled:
+            return
+        session = session or self.session
+        self._lock_change_log(session)
+        session.add(TaxonomyTermChange(operation=operation, taxonomy_code=term.taxonomy_code,
+                                       slug=term.slug, target_slug=target_slug, term=term))
+
+    def _log_term_changes(self, operation, term_ids, chunk_size=1000, session=None):
+        # set-based variant of _log_change, copies slugs of the terms with the given ids
+        if not self.change_log_enabled or not term_ids:
+            return
+        session = session or self.session
+        self._lock_change_log(session)
+        table = TaxonomyTermChange.__table__
+        terms = TaxonomyTerm.__table__
+        timestamp = datetime.datetime.utcnow()
+        term_ids = list(term_ids)
+        for i in range(0, len(term_ids), chunk_size):
+            session.execute(table.insert().from_select(
+                ['timestamp', 'operation', 'taxonomy_code', 'slug', 'term_id'],
+                sqlalchemy.select([
+                    sqlalchemy.literal(timestamp, type_=table.c.timestamp.type),
+                    sqlalchemy.literal(operation, type_=table.c.operation.type),
+                    terms.c.taxonomy_code, terms.c.slug, terms.c.id
+                ]).where(terms.c.id.in_(term_ids[i:i + chunk_size])).order_by(terms.c.slug)
+            ))
+
+    def list_changes(self, since=0, taxonomy: [Taxonomy, str] = None, limit=None, session=None):
+        """
+        Returns a query of the change log entries with seq greater than since, in the order of seq.
+        Writers of the change log commit in the order of seq (see ``_lock_change_log``), so the last seq
+        of the returned entries can be used as ``since`` of the next call without missing any change.
+
+        :param since: the last seq the caller has seen
+        :param taxonomy: return only changes of terms in this taxonomy (or taxonomy code),
+                         or in any of the taxonomies of a list
+        :param limit: max number of returned changes
+        """
+        session = session or self.session
+        query = session.query(TaxonomyTermChange).filter(TaxonomyTermChange.seq > (since or 0))
+        if isinstance(taxonomy, (list, tuple)):
+            codes = [x.code if isinstance(x, Taxonomy) else x for x in taxonomy]
+            query = query.filter(TaxonomyTermChange.taxonomy_code.in_(codes))
+        elif taxonomy is not None:
+            if isinstance(taxonomy, Taxonomy):
+                taxonomy = taxonomy.code
+            query = query.filter(TaxonomyTermChange.taxonomy_code == taxonomy)
+        query = query.order_by(TaxonomyTermChange.seq)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
     @staticmethod
     def _slugify(parent_path, slug):
         slug = slugify(slug)
@@ -542,6 +1053,24 @@ class Api:
     def _last_slug_element(slug):
         return slug.split('/')[-1]
 
+    @cached_property
+    def negative_cache(self):
+        """Cache of (taxonomy code, slug) of terms that were not found, see FLASK_TAXONOMIES_NEGATIVE_CACHE_TTL"""
+        return NegativeCache(maxsize=self.app.config.get('FLASK_TAXONOMIES_NEGATIVE_CACHE_SIZE', 10000))
+
+    @cached_property
+    def single_flight(self):
+        """Coalesces identical concurrent tree requests, see FLASK_TAXONOMIES_COALESCE_READS"""
+        return SingleFlight()
+
+    @cached_property
+    def heavy_request_slots(self):
+        """Semaphore limiting concurrent heavy tree requests, see FLASK_TAXONOMIES_MAX_HEAVY_REQUESTS"""
+        max_heavy_requests = self.app.config.get('FLASK_TAXONOMIES_MAX_HEAVY_REQUESTS')
+        if not max_heavy_requests:
+            return None
+        return threading.BoundedSemaphore(max_heavy_requests)
+
     @cached_property
     def query_parser(self):
         parser_or_import = self.app.config.get('FLASK_TAXONOMIES_QUERY_PARSER',
@@ -559,14 +1088,30 @@ class Api:
         return executor_or_import
 
     def apply_taxonomy_query(self, sqlalchemy_query, query_string, session=None):
-        session = session or self.session
+        session = session or self.read_session
         return self.query_executor(session, sqlalchemy_query, Taxonomy, self.query_parser(query_string))
 
     def apply_term_query(self, sqlalchemy_query, query_string, taxonomy_code, session=None):
-        session = session or self.session
+        session = session or self.read_session
         return self.query_executor(session, sqlalchemy_query, TaxonomyTerm,
                                    self.query_parser(query_string, taxonomy_code=taxonomy_code))
 
     def commit(self, session=None):
         session = session or self.session
         session.commit()
+
+
+@sqlalchemy.event.listens_for(Session, 'after_commit')
+def _run_after_commit_callbacks(session):
+    if session.in_nested_transaction():
+        # only a savepoint has been released, the outer transaction may still be rolled back
+        return
+    for callback in session.info.pop(AFTER_COMMIT_CALLBACKS, []):
+        callback()
+
+
+@sqlalchemy.event.listens_for(Session, 'after_transaction_end')
+def _clear_after_commit_callbacks(session, transaction):
+    if transaction.parent is None:
+        # rolled back, callbacks of a committed transaction have already been run
+        session.info.pop(AFTER_COMMIT_CALLBACKS, None)
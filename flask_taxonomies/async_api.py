@@ -0,0 +1,207 @@
+"""
+Asyncio variant of the taxonomy api, working with a SQLAlchemy ``AsyncSession``.
+
+Reads build their statements with the query builders of ``Api`` (and so ``TermIdentification``)
+and execute them on the async session, returning lists of results instead of queries.
+Writes run the ``Api`` write methods in the session's greenlet (``AsyncSession.run_sync``),
+so they send the same signals and keep the change log just like the synchronous api.
+
+Needs ``greenlet`` and an async database driver, for example ``asyncpg`` or ``aiosqlite``
+(``pip install flask-taxonomies[async]``).
+"""
+import asyncio
+
+import sqlalchemy
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_scoped_session,
+    create_async_engine,
+)
+from sqlalchemy.orm import sessionmaker
+
+from .models import Taxonomy, TaxonomyTerm, TermStatusEnum
+from .term_identification import TermIdentification, _coerce_ti
+
+ASYNC_DRIVERS = {
+    'postgresql': 'asyncpg',
+    'sqlite': 'aiosqlite',
+    'mysql': 'aiomysql',
+}
+
+
+def async_database_uri(uri):
+    """Converts a database uri to the same database accessed with an asyncio driver."""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError('No asyncio driver known for database %s, set FLASK_TAXONOMIES_ASYNC_DATABASE_URI' % backend)
+    return str(url.set(drivername='%s+%s' % (backend, ASYNC_DRIVERS[backend])))
+
+
+class AsyncApi:
+    """
+    :param api: the synchronous api (current_flask_taxonomies), provides the configuration and query builders
+    :param engine: async engine, by default created from FLASK_TAXONOMIES_ASYNC_DATABASE_URI
+                   or from SQLALCHEMY_DATABASE_URI with the driver replaced by an async one
+    """
+
+    def __init__(self, api, engine=None):
+        self.api = api
+        if engine is None:
+            config = api.app.config
+            uri = config.get('FLASK_TAXONOMIES_ASYNC_DATABASE_URI') or \
+                async_database_uri(config['SQLALCHEMY_DATABASE_URI'])
+            engine = create_async_engine(uri)
+        self.engine = engine
+        # loaded objects stay usable after commit, async code can not lazy load expired attributes
+        self.session = async_scoped_session(
+            sessionmaker(engine, class_=AsyncSession, expire_on_commit=False),
+            scopefunc=asyncio.current_task)
+
+    async def remove_session(self):
+        """Closes the session of the current task, call it when the task (request) is finished."""
+        await self.session.remove()
+
+    @staticmethod
+    async def _all(session, query):
+        result = await session.execute(query.statement)
+        if len(query.column_descriptions) == 1:
+            return result.scalars().all()
+        return result.all()
+
+    @staticmethod
+    async def _one_or_none(session, query):
+        result = await session.execute(query.statement)
+        if len(query.column_descriptions) == 1:
+            return result.scalars().one_or_none()
+        return result.one_or_none()
+
+    async def all(self, query, session=None):
+        """Executes a query built by ``Api`` and returns the list of its results."""
+        session = session or self.session()
+        return await self._all(session, query)
+
+    async def count(self, query, session=None):
+        """Returns the number of results of a query built by ``Api``, like ``Query.count``."""
+        session = session or self.session()
+        return await session.scalar(
+            sqlalchemy.select(sqlalchemy.func.count()).select_from(query.statement.subquery()))
+
+    async def list_taxonomies(self, session=None, return_descendants_count=False,
+                              return_descendants_busy_count=False):
+        """Returns a list of all taxonomies (rows with counts if requested), see ``Api.list_taxonomies``."""
+        session = session or self.session()
+        query = self.api.list_taxonomies(session=session.sync_session,
+                                         return_descendants_count=return_descendants_count,
+                                         return_descendants_busy_count=return_descendants_busy_count)
+        return await self._all(session, query.order_by(Taxonomy.code))
+
+    async def get_taxonomy(self, code, fail=True, session=None, return_descendants_count=False,
+                           return_descendants_busy_count=False):
+        session = session or self.session()
+        query = self.api.filter_taxonomy(code, session=session.sync_session,
+                                         return_descendants_count=return_descendants_count,
+                                         return_descendants_busy_count=return_descendants_busy_count)
+        result = await session.execute(query.statement)
+        if len(query.column_descriptions) == 1:
+            result = result.scalars()
+        return result.one() if fail else result.one_or_none()
+
+    async def list_taxonomy(self, taxonomy: [Taxonomy, str], levels=None,
+                            status_cond=TaxonomyTerm.status == TermStatusEnum.alive,
+                            order=True, session=None, return_descendants_count=False,
+                            return_descendants_busy_count=False):
+        session = session or self.session()
+        query = self.api.list_taxonomy(taxonomy, levels=levels, status_cond=status_cond, order=order,
+                                       session=session.sync_session,
+                                       return_descendants_count=return_descendants_count,
+                                       return_descendants_busy_count=return_descendants_busy_count)
+        return await self._all(session, query)
+
+    async def filter_term(self, ti: TermIdentification,
+                          status_cond=TaxonomyTerm.status == TermStatusEnum.alive,
+                          return_descendants_count=False,
+                          return_descendants_busy_count=False,
+                          session=None):
+        """Returns the term (a row with counts if requested) or None."""
+        session = session or self.session()
+        query = self.api.filter_term(ti, status_cond=status_cond, session=session.sync_session,
+                                     return_descendants_count=return_descendants_count,
+                                     return_descendants_busy_count=return_descendants_busy_count)
+        return await self._one_or_none(session, query)
+
+    async def descendants(self, ti: TermIdentification, levels=None,
+                          status_cond=TaxonomyTerm.status == TermStatusEnum.alive,
+                          order=True, session=None, return_descendants_count=False,
+                          return_descendants_busy_count=False):
+        session = session or self.session()
+        query = self.api.descendants(ti, levels=levels, status_cond=status_cond, order=order,
+                                     session=session.sync_session,
+                                     return_descendants_count=return_descendants_count,
+                                     return_descendants_busy_count=return_descendants_busy_count)
+        return await self._all(session, query)
+
+    async def descendants_or_self(self, ti: TermIdentification, levels=None,
+                                  status_cond=TaxonomyTerm.status == TermStatusEnum.alive,
+                                  order=True, session=None, return_descendants_count=False,
+                                  return_descendants_busy_count=False):
+        session = session or self.session()
+        query = self.api.descendants_or_self(ti, levels=levels, status_cond=status_cond, order=order,
+                                             session=session.sync_session,
+                                             return_descendants_count=return_descendants_count,
+                                             return_descendants_busy_count=return_descendants_busy_count)
+        return await self._all(session, query)
+
+    async def ancestors(self, ti: TermIdentification, status_cond=TaxonomyTerm.status == TermStatusEnum.alive,
+                        session=None, return_descendants_count=False, return_descendants_busy_count=False):
+        """Returns ancestors of the term, from the root down."""
+        session = session or self.session()
+        query = self.api.ancestors(ti, status_cond=status_cond, session=session.sync_session,
+                                   return_descendants_count=return_descendants_count,
+                                   return_descendants_busy_count=return_descendants_busy_count)
+        return await self._all(session, query.order_by(TaxonomyTerm.level))
+
+    async def ancestors_or_self(self, ti: TermIdentification,
+                                status_cond=TaxonomyTerm.status == TermStatusEnum.alive, session=None,
+                                return_descendants_count=False,
+                                return_descendants_busy_count=False):
+        """Returns the term and its ancestors, from the root down."""
+        session = session or self.session()
+        query = self.api.ancestors_or_self(ti, status_cond=status_cond, session=session.sync_session,
+                                           return_descendants_count=return_descendants_count,
+                                           return_descendants_busy_count=return_descendants_busy_count)
+        return await self._all(session, query.order_by(TaxonomyTerm.level))
+
+    async def _run_sync(self, session, method, *args, **kwargs):
+        session = session or self.session()
+        return await session.run_sync(lambda sync_session: method(*args, session=sync_session, **kwargs))
+
+    async def create_term(self, ti: TermIdentification, extra_data=None, session=None):
+        return await self._run_sync(session, self.api.create_term, _coerce_ti(ti), extra_data=extra_data)
+
+    async def update_term(self, ti: [TaxonomyTerm, TermIdentification],
+                          status_cond=TaxonomyTerm.status == TermStatusEnum.alive,
+                          extra_data=None, patch=False, status=None, session=None):
+        kwargs = {'status': status} if status is not None else {}
+        return await self._run_sync(session, self.api.update_term, ti, status_cond=status_cond,
+                                    extra_data=extra_data, patch=patch, **kwargs)
+
+    async def delete_term(self, ti: TermIdentification, remove_after_delete=True, session=None):
+        return await self._run_sync(session, self.api.delete_term, ti, remove_after_delete=remove_after_delete)
+
+    async def rename_term(self, ti: TermIdentification, new_slug=None, remove_after_delete=True, session=None):
+        return await self._run_sync(session, self.api.rename_term, ti, new_slug=new_slug,
+                                    remove_after_delete=remove_after_delete)
+
+    async def move_term(self, ti: TermIdentification, new_parent=None, remove_after_delete=True, session=None):
+        return await self._run_sync(session, self.api.move_term, ti, new_parent=new_parent,
+                                    remove_after_delete=remove_after_delete)
+
+    async def commit(self, session=None):
+        session = session or self.session()
+        await session.commit()
+
+    async def rollback(self, session=None):
+        session = session or self.session()
+        await session.rollback()
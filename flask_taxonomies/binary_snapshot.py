@@ -0,0 +1,343 @@
+"""
+Compact binary snapshots of taxonomies, shared by worker processes through ``mmap``.
+
+A snapshot file contains a single taxonomy with terms sorted by slug (in the tree order
+used by the database, ``/`` sorting before any other character):
+
+* header - magic, format version, byte order, taxonomy version, number of terms and section offsets
+* slug table - uint32 offsets into a blob of utf-8 slugs with ``\\x01`` as the path separator
+* arrays - term ids (int64), parent and obsoleted_by indices (int32, -1 if none), levels (uint16)
+  and statuses (one byte, ``TermStatusEnum`` value)
+* extra data - uint64 offsets into a blob of json encoded extra data
+
+Lookups binary search the slug table and read the arrays through memoryviews on the mapping,
+so the data is never copied into the python heap and the pages are shared by all processes
+that open the file. Descendants of a term are a contiguous range of the slug table.
+
+Snapshots are replaced by writing a new file and renaming it over the old one. The taxonomy version
+stored in the snapshot is the seq of the last change of the taxonomy in the change log, ``write_binary_snapshot``
+is a no-op when the version has not changed. ``SnapshotRegistry`` notices the swapped file
+and opens it, readers holding the old snapshot keep using it until they drop it.
+"""
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+
+from sqlalchemy import func
+
+from flask_taxonomies.models import (
+    Taxonomy,
+    TaxonomyError,
+    TaxonomyTerm,
+    TaxonomyTermChange,
+    TermStatusEnum,
+)
+
+MAGIC = b'FTAXSNAP'
+FORMAT_VERSION = 1
+SNAPSHOT_SUFFIX = '.taxsnap'
+
+# magic, format version, byte order, taxonomy version, term count, code length, 9 section offsets
+_HEADER = struct.Struct('=8sHBxQII9Q')
+_BYTE_ORDERS = {'little': 1, 'big': 2}
+
+_STATUSES = {status.value.encode('ascii')[0]: status for status in TermStatusEnum}
+
+
+def _slug_key(slug):
+    return slug.replace('/', '\x01').encode('utf-8')
+
+
+def taxonomy_version(taxonomy: Taxonomy, session):
+    """Seq of the last change of the taxonomy in the change log, 0 if there is none."""
+    return session.query(func.max(TaxonomyTermChange.seq)).filter(
+        TaxonomyTermChange.taxonomy_code == taxonomy.code).scalar() or 0
+
+
+def read_snapshot_version(path):
+    """Taxonomy version stored in a snapshot file or None if the file does not exist."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < _HEADER.size or header[:len(MAGIC)] != MAGIC:
+        return None
+    return _HEADER.unpack(header)[3]
+
+
+def write_binary_snapshot(taxonomy: [Taxonomy, str], path, force=False, session=None):
+    """
+    Writes a taxonomy (terms in all states) to a binary snapshot file, replacing it atomically.
+
+    :param taxonomy: taxonomy or its code
+    :param path: path of the snapshot file
+    :param force: write the snapshot even if the file already contains the current taxonomy version.
+                  Without the change log the version is always 0, use force to refresh the snapshot
+    :return: the taxonomy version if the file has been written, None if it was up to date
+    """
+    from flask_taxonomies.proxies import current_flask_taxonomies
+    session = session or current_flask_taxonomies.session
+    if isinstance(taxonomy, str):
+        taxonomy = current_flask_taxonomies.get_taxonomy(taxonomy, session=session)
+    version = taxonomy_version(taxonomy, session)
+    if not force and read_snapshot_version(path) == version:
+        return None
+
+    rows = session.query(
+        TaxonomyTerm.id, TaxonomyTerm.slug, TaxonomyTerm.level, TaxonomyTerm.status,
+        TaxonomyTerm.parent_id, TaxonomyTerm.obsoleted_by_id, TaxonomyTerm.extra_data
+    ).filter(TaxonomyTerm.taxonomy_id == taxonomy.id).all()
+    rows.sort(key=lambda row: _slug_key(row.slug))
+    index = {row.id: idx for idx, row in enumerate(rows)}
+
+    slug_offsets = array.array('I', [0])
+    slugs = bytearray()
+    data_offsets = array.array('Q', [0])
+    data = bytearray()
+    for row in rows:
+        slugs += _slug_key(row.slug)
+        slug_offsets.append(len(slugs))
+        if row.extra_data is not None:
+            data += json.dumps(row.extra_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        data_offsets.append(len(data))
+    sections = [
+        slug_offsets,
+        slugs,
+        array.array('q', [row.id for row in rows]),
+        array.array('i', [index.get(row.parent_id, -1) for row in rows]),
+        array.array('i', [index.get(row.obsoleted_by_id, -1) for row in rows]),
+        array.array('H', [row.level for row in rows]),
+        bytes(row.status.value.encode('ascii')[0] for row in rows),
+        data_offsets,
+        data,
+    ]
+
+    code = taxonomy.code.encode('utf-8')
+    offsets = []
+    position = _HEADER.size + len(code)
+    for section in sections:
+        position += -position % 8  # keep the arrays aligned
+        offsets.append(position)
+        position += len(memoryview(section).cast('B'))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.%s-' % taxonomy.code, suffix=SNAPSHOT_SUFFIX, dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, _BYTE_ORDERS[sys.byteorder], version,
+                                 len(rows), len(code), *offsets))
+            f.write(code)
+            for offset, section in zip(offsets, sections):
+                f.write(b'\0' * (offset - f.tell()))
+                f.write(memoryview(section).cast('B'))
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return version
+
+
+class SnapshotTerm:
+    """A term in a snapshot, data is read from the mapping on access."""
+    __slots__ = ('snapshot', 'index')
+
+    def __init__(self, snapshot, index):
+        self.snapshot = snapshot
+        self.index = index
+
+    @property
+    def id(self):
+        return self.snapshot._ids[self.index]
+
+    @property
+    def slug(self):
+        return self.snapshot._slug_key(self.index).decode('utf-8').replace('\x01', '/')
+
+    @property
+    def level(self):
+        return self.snapshot._levels[self.index]
+
+    @property
+    def status(self):
+        return _STATUSES[self.snapshot._statuses[self.index]]
+
+    @property
+    def extra_data(self):
+        start, end = self.snapshot._data_offsets[self.index], self.snapshot._data_offsets[self.index + 1]
+        if start == end:
+            return None
+        return json.loads(bytes(self.snapshot._data[start:end]).decode('utf-8'))
+
+    @property
+    def parent(self):
+        parent = self.snapshot._parents[self.index]
+        return SnapshotTerm(self.snapshot, parent) if parent >= 0 else None
+
+    @property
+    def obsoleted_by(self):
+        obsoleted_by = self.snapshot._obsoleted_by[self.index]
+        return SnapshotTerm(self.snapshot, obsoleted_by) if obsoleted_by >= 0 else None
+
+    def __eq__(self, other):
+        return isinstance(other, SnapshotTerm) and other.snapshot is self.snapshot and other.index == self.index
+
+    def __hash__(self):
+        return hash(self.index)
+
+    def __repr__(self):
+        return 'SnapshotTerm[tax {}, lev {}, slug {}]'.format(self.snapshot.code, self.level, self.slug)
+
+
+class TaxonomySnapshot:
+    """
+    Read-only view of a binary snapshot file.
+
+    The methods mirror ``Api.filter_term``, ``Api.descendants`` and ``Api.ancestors``,
+    taking slugs and returning ``SnapshotTerm`` instances instead of database queries.
+    ``status`` arguments are a ``TermStatusEnum`` or None for terms in any state.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+        if len(self._buffer) < _HEADER.size:
+            raise TaxonomyError('%s is not a taxonomy snapshot' % path)
+        magic, format_version, byte_order, self.version, self.count, code_length, *offsets = \
+            _HEADER.unpack_from(self._buffer)
+        if magic != MAGIC:
+            raise TaxonomyError('%s is not a taxonomy snapshot' % path)
+        if format_version != FORMAT_VERSION:
+            raise TaxonomyError('Unsupported snapshot format version %s in %s' % (format_version, path))
+        if byte_order != _BYTE_ORDERS[sys.byteorder]:
+            raise TaxonomyError('Snapshot %s was written on a machine with a different byte order' % path)
+        self.code = bytes(self._buffer[_HEADER.size:_HEADER.size + code_length]).decode('utf-8')
+
+        count = self.count
+        ends = offsets[1:] + [len(self._buffer)]
+        section = [self._buffer[start:end] for start, end in zip(offsets, ends)]
+        self._slug_offsets = section[0][:(count + 1) * 4].cast('I')
+        self._slugs_start = offsets[1]
+        self._ids = section[2][:count * 8].cast('q')
+        self._parents = section[3][:count * 4].cast('i')
+        self._obsoleted_by = section[4][:count * 4].cast('i')
+        self._levels = section[5][:count * 2].cast('H')
+        self._statuses = section[6][:count]
+        self._data_offsets = section[7][:(count + 1) * 8].cast('Q')
+        self._data = section[8]
+
+    def __len__(self):
+        return self.count
+
+    def _slug_key(self, index):
+        start = self._slugs_start
+        return self._mmap[start + self._slug_offsets[index]:start + self._slug_offsets[index + 1]]
+
+    def _lower_bound(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._slug_key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _find(self, slug):
+        key = _slug_key(slug)
+        index = self._lower_bound(key)
+        if index < self.count and self._slug_key(index) == key:
+            return index
+        return None
+
+    def _matches(self, index, status):
+        return status is None or self._statuses[index] == status.value.encode('ascii')[0]
+
+    def filter_term(self, slug, status=TermStatusEnum.alive):
+        """Returns the term with the slug or None."""
+        index = self._find(slug)
+        if index is None or not self._matches(index, status):
+            return None
+        return SnapshotTerm(self, index)
+
+    def descendants(self, slug, levels=None, include_self=False, status=TermStatusEnum.alive):
+        """Yields descendants of the term in slug order, levels limits the depth below the term."""
+        index = self._find(slug)
+        if index is None:
+            return
+        key = _slug_key(slug)
+        end = self._lower_bound(key + b'\x02')  # just after the last slug starting with key + separator
+        max_level = self._levels[index] + levels if levels is not None else None
+        for idx in range(index if include_self else index + 1, end):
+            if max_level is not None and self._levels[idx] > max_level:
+                continue
+            if self._matches(idx, status):
+                yield SnapshotTerm(self, idx)
+
+    def descendants_or_self(self, slug, levels=None, status=TermStatusEnum.alive):
+        return self.descendants(slug, levels=levels, include_self=True, status=status)
+
+    def ancestors(self, slug, include_self=False, status=TermStatusEnum.alive):
+        """Returns ancestors of the term from the root down."""
+        index = self._find(slug)
+        if index is None:
+            return []
+        ret = []
+        if not include_self:
+            index = self._parents[index]
+        while index >= 0:
+            if self._matches(index, status):
+                ret.append(SnapshotTerm(self, index))
+            index = self._parents[index]
+        ret.reverse()
+        return ret
+
+    def ancestors_or_self(self, slug, status=TermStatusEnum.alive):
+        return self.ancestors(slug, include_self=True, status=status)
+
+
+class SnapshotRegistry:
+    """
+    Opens snapshots ``<directory>/<code>.taxsnap`` on demand and reopens them when the file is swapped.
+
+    :param check_interval: minimal number of seconds between checks of a file for a new version
+    """
+
+    def __init__(self, directory, check_interval=1.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._snapshots = {}  # code -> (snapshot, file identity, time of the last check)
+
+    def path(self, code):
+        return os.path.join(self.directory, code + SNAPSHOT_SUFFIX)
+
+    @staticmethod
+    def _identity(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size
+
+    def get(self, code):
+        """The current snapshot of the taxonomy or None if there is no snapshot file."""
+        now = time.monotonic()
+        snapshot, identity, checked = self._snapshots.get(code, (None, None, None))
+        if checked is not None and now - checked < self.check_interval:
+            return snapshot
+        path = self.path(code)
+        current = self._identity(path)
+        if current != identity:
+            # the old snapshot is unmapped when the last reference to it is dropped
+            snapshot = TaxonomySnapshot(path) if current else None
+        self._snapshots[code] = (snapshot, current, now)
+        return snapshot
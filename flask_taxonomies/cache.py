@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+
+class NegativeCache:
+    """
+    Per-process cache of keys (taxonomy code, slug) known not to exist.
+
+    Entries expire after ``ttl`` seconds, as terms created by other processes can not
+    invalidate them. Terms created in this process are removed from the cache immediately.
+    """
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key, ttl):
+        if not ttl or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = time.monotonic() + ttl
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_prefix(self, code, slug):
+        """Removes the slug and all slugs below it."""
+        prefix = slug + '/'
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == code and (k[1] == slug or k[1].startswith(prefix))]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            expires = self._entries.get(key)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._entries[key]
+                return False
+            return True
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Per-process coalescing of concurrent computations of the same value.
+
+    The first caller of ``do`` with a key computes the value, callers with the same key arriving
+    while the computation runs wait for it and get the same value. Nothing is remembered after
+    the computation has finished. If it fails, the waiting callers get the same exception, so that
+    a burst of failing requests (for example for a term that does not exist) runs the computation once.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        call, leader = self._join(key)
+        if not leader:
+            call.done.wait()
+            return self._result(call)
+        try:
+            call.value = func()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+
+    async def do_async(self, key, func):
+        """Variant of ``do`` for a coroutine function, waiting for the first caller does not block the event loop."""
+        call, leader = self._join(key)
+        if not leader:
+            await asyncio.get_running_loop().run_in_executor(None, call.done.wait)
+            return self._result(call)
+        try:
+            call.value = await func()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+
+    def _join(self, key):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+        return call, leader
+
+    def _finish(self, key, call):
+        with self._lock:
+            del self._calls[key]
+        call.done.set()
+
+    @staticmethod
+    def _result(call):
+        if call.error is not None:
+            raise call.error
+        return call.value
@@ -0,0 +1,229 @@
+import functools
+import json
+import os
+import time
+
+import click
+import sqlalchemy
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.orm.exc import NoResultFound
+
+from flask_taxonomies.binary_snapshot import SNAPSHOT_SUFFIX, write_binary_snapshot
+from flask_taxonomies.exporter import EXPORT_FORMATS, export_changes, export_terms
+from flask_taxonomies.importer import (
+    FORMATS,
+    check_consistency,
+    guess_format,
+    import_terms,
+    import_terms_parallel,
+    read_records,
+)
+from flask_taxonomies.models import TaxonomyError, TaxonomyTerm, TermStatusEnum
+from flask_taxonomies.proxies import current_flask_taxonomies
+from flask_taxonomies.snapshot import write_snapshot
+
+
+@click.group()
+def taxonomies():
+    """Taxonomy management commands."""
+
+
+def on_primary(f):
+    # management commands work with the primary database even if reads are served from a snapshot
+    @functools.wraps(f)
+    def wrapped(*args, **kwargs):
+        current_flask_taxonomies.use_primary()
+        return f(*args, **kwargs)
+
+    return wrapped
+
+
+@taxonomies.command('sync')
+@click.argument('code')
+@click.argument('tree_file', type=click.File('r'))
+@click.option('--dry-run', is_flag=True, help='Only print the differences')
+@with_appcontext
+@on_primary
+def sync(code, tree_file, dry_run):
+    """
+    Makes taxonomy CODE match the tree in TREE_FILE (json in the format of utils.to_json).
+    """
+    tree = json.load(tree_file)
+    try:
+        diff = current_flask_taxonomies.sync_taxonomy(code, tree, dry_run=dry_run)
+    except NoResultFound:
+        raise click.ClickException('Taxonomy %s does not exist' % code)
+    except TaxonomyError as e:
+        raise click.ClickException(str(e))
+    if not dry_run:
+        current_flask_taxonomies.commit()
+    for slug in diff['created']:
+        click.echo('+ %s' % slug)
+    for slug in diff['updated']:
+        click.echo('* %s' % slug)
+    for slug in diff['deleted']:
+        click.echo('- %s' % slug)
+    for old_slug, new_slug in diff['moved']:
+        click.echo('> %s -> %s' % (old_slug, new_slug))
+    click.echo('%s created, %s updated, %s deleted, %s moved' % tuple(
+        len(diff[x]) for x in ('created', 'updated', 'deleted', 'moved')))
+
+
+@taxonomies.command('import')
+@click.argument('code')
+@click.argument('input_file', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'input_format', type=click.Choice(FORMATS),
+              help='Input format, guessed from the file extension if not set')
+@click.option('--slug', 'slug_fields', multiple=True, required=True,
+              help='Field making the slug, repeat for each hierarchy level starting at the top')
+@click.option('--parent', 'parent_field', help='Field containing slug of the parent term')
+@click.option('--chunk-size', default=1000, show_default=True, help='Terms inserted and committed together')
+@click.option('--title', help='Title of the taxonomy if it is created')
+@click.option('--url', help='Url of the taxonomy if it is created')
+@click.option('--processes', default=1, show_default=True,
+              help='Number of worker processes importing subtrees of top-level terms in parallel')
+@with_appcontext
+@on_primary
+def import_(code, input_file, input_format, slug_fields, parent_field, chunk_size, title, url, processes):
+    """
+    Imports terms from INPUT_FILE (csv, json or ndjson) into taxonomy CODE,
+    creating the taxonomy if it does not exist. Terms that already exist are skipped,
+    deleted or moved terms are not revived.
+
+    Example: flask taxonomies import country countries.csv --slug ContinentName --slug CountryCode
+    """
+    if not input_format:
+        input_format = guess_format(input_file.name)
+    taxonomy = current_flask_taxonomies.get_taxonomy(code, fail=False)
+    if not taxonomy:
+        taxonomy = current_flask_taxonomies.create_taxonomy(
+            code, extra_data={'title': title} if title else None, url=url)
+        current_flask_taxonomies.commit()
+
+    start = time.monotonic()
+
+    def throughput(stats):
+        return stats.created / max(time.monotonic() - start, 1e-6)
+
+    def progress(stats):
+        click.echo('%s records read, %s terms created, %s skipped, %.0f terms/s' % (
+            stats.read, stats.created, stats.skipped, throughput(stats)))
+
+    def partition_progress(partition, stats):
+        click.echo('%s: %s terms created, %s skipped, %.0f terms/s' % (
+            'top-level terms' if partition is None else 'partition %s' % partition,
+            stats.created, stats.skipped, throughput(stats)))
+
+    records = read_records(input_file, input_format)
+    errors = {}
+    if processes > 1:
+        stats, errors = import_terms_parallel(current_app._get_current_object(), taxonomy, records, slug_fields,
+                                              parent_field=parent_field, processes=processes,
+                                              chunk_size=chunk_size, progress=partition_progress)
+    else:
+        stats = import_terms(taxonomy, records, slug_fields,
+                             parent_field=parent_field, chunk_size=chunk_size, progress=progress)
+    _echo_import_summary(stats, errors, time.monotonic() - start)
+
+    inconsistent = check_consistency(taxonomy)
+    if inconsistent:
+        click.echo('Inconsistent parent_id/level of %s terms: %s' % (
+            len(inconsistent), ', '.join(inconsistent[:20])), err=True)
+    if errors or inconsistent:
+        raise click.exceptions.Exit(1)
+
+
+def _echo_import_summary(stats, errors, elapsed):
+    click.echo('Done: %s terms created, %s skipped, %s invalid records in %.1f s (%.0f terms/s)' % (
+        stats.created, stats.skipped, stats.invalid, elapsed, stats.created / max(elapsed, 1e-6)))
+    if stats.deleted:
+        click.echo('%s records of deleted or moved terms (or of terms below them) were not imported' % (
+            stats.deleted), err=True)
+    for partition, error in sorted(errors.items()):
+        click.echo('Partition %s failed: %s' % (partition, error), err=True)
+
+
+@taxonomies.command('export')
+@click.argument('code')
+@click.argument('output_file', type=click.File('w', encoding='utf-8'), default='-')
+@click.option('--format', 'output_format', type=click.Choice(EXPORT_FORMATS), default='json', show_default=True,
+              help='Nested json tree or newline delimited json with one term per line')
+@click.option('--alive-only', is_flag=True, help='Do not export deleted terms')
+@click.option('--batch-size', default=1000, show_default=True, help='Number of terms read from the database at once')
+@click.option('--since', help='Export only terms changed after this change log sequence number '
+                              'or ISO 8601 timestamp')
+@with_appcontext
+@on_primary
+def export(code, output_file, output_format, alive_only, batch_size, since):
+    """
+    Exports terms of taxonomy CODE to OUTPUT_FILE (standard output by default).
+    """
+    taxonomy = current_flask_taxonomies.get_taxonomy(code)
+    if since is not None:
+        if alive_only:
+            raise click.UsageError('--alive-only can not be used with --since, deletions are part of the delta')
+        start = time.monotonic()
+        try:
+            count, until = export_changes(current_flask_taxonomies, taxonomy, output_file, since,
+                                          format=output_format, batch_size=batch_size)
+        except TaxonomyError as e:
+            raise click.UsageError(str(e))
+        elapsed = time.monotonic() - start
+        click.echo('Exported %s changed terms in %.1f s, next export --since %s' % (count, elapsed, until),
+                   err=True)
+        return
+    status_cond = TaxonomyTerm.status == TermStatusEnum.alive if alive_only else sqlalchemy.sql.true()
+    start = time.monotonic()
+    count = export_terms(current_flask_taxonomies, taxonomy, output_file, format=output_format,
+                         status_cond=status_cond, batch_size=batch_size)
+    elapsed = time.monotonic() - start
+    click.echo('Exported %s terms in %.1f s' % (count, elapsed), err=True)
+
+
+@taxonomies.command('snapshot')
+@click.argument('output_file', type=click.Path(dir_okay=False, writable=True))
+@click.argument('codes', nargs=-1)
+@click.option('--batch-size', default=1000, show_default=True, help='Number of terms copied at once')
+@with_appcontext
+@on_primary
+def snapshot(output_file, codes, batch_size):
+    """
+    Writes taxonomies CODES (all taxonomies if not given) to a read-only SQLite file OUTPUT_FILE,
+    see FLASK_TAXONOMIES_SNAPSHOT. An existing file is replaced atomically.
+    """
+    start = time.monotonic()
+    try:
+        stats = write_snapshot(output_file, codes=codes, batch_size=batch_size)
+    except TaxonomyError as e:
+        raise click.UsageError(str(e))
+    elapsed = time.monotonic() - start
+    click.echo('Written %s taxonomies with %s terms in %.1f s' % (stats.taxonomies, stats.terms, elapsed))
+
+
+@taxonomies.command('binary-snapshot')
+@click.argument('codes', nargs=-1)
+@click.option('--directory', help='Output directory, defaults to FLASK_TAXONOMIES_BINARY_SNAPSHOT_DIR')
+@click.option('--force', is_flag=True, help='Write the snapshots even if the taxonomy version has not changed')
+@with_appcontext
+@on_primary
+def binary_snapshot(codes, directory, force):
+    """
+    Writes memory-mapped binary snapshots of taxonomies CODES (all taxonomies if not given).
+    A snapshot is replaced only if the taxonomy has changed since it was written.
+    """
+    directory = directory or current_app.config.get('FLASK_TAXONOMIES_BINARY_SNAPSHOT_DIR')
+    if not directory:
+        raise click.UsageError('Pass --directory or set FLASK_TAXONOMIES_BINARY_SNAPSHOT_DIR')
+    if not codes:
+        codes = [x.code for x in current_flask_taxonomies.list_taxonomies()]
+    for code in codes:
+        path = os.path.join(directory, code + SNAPSHOT_SUFFIX)
+        try:
+            version = write_binary_snapshot(code, path, force=force)
+        except NoResultFound:
+            raise click.UsageError('Taxonomy %s does not exist' % code)
+        if version is None:
+            click.echo('%s: up to date' % code)
+        else:
+            click.echo('%s: written version %s' % (code, version))
@@ -1,10 +1,13 @@
 from flask_taxonomies.constants import (
+    INCLUDE_ANCESTOR_LIST,
     INCLUDE_ANCESTORS,
     INCLUDE_ANCESTORS_HIERARCHY,
     INCLUDE_DATA,
+    INCLUDE_DESCENDANTS_COUNT,
     INCLUDE_DESCENDANTS_URL,
     INCLUDE_SELF,
     INCLUDE_SLUG,
+    INCLUDE_STATUS,
     INCLUDE_URL,
 )
 
@@ -56,6 +59,157 @@ FLASK_TAXONOMIES_REPRESENTATION = {
 
 FLASK_TAXONOMIES_MAX_RESULTS_RETURNED = 10000
 
+# maximum number of operations in a single POST /_batch request
+FLASK_TAXONOMIES_BATCH_MAX_OPERATIONS = 1000
+
+#
+# If True, term changes are recorded in the taxonomy_term_change table,
+# in the same transaction as the change itself, and served at /_changes.
+# Needs the alembic revision 3b0c6f2a9d41. On PostgreSQL, transactions changing terms
+# are serialized by an advisory lock held until commit.
+#
+FLASK_TAXONOMIES_CHANGE_LOG = False
+
+# default and maximum number of changes returned by a single GET /_changes request
+FLASK_TAXONOMIES_CHANGES_MAX_LIMIT = 1000
+
+#
+# Path to a read-only SQLite snapshot written by ``flask taxonomies snapshot``. If set, the read methods
+# of the api (and so the GET endpoints) serve from the snapshot, writes go to the primary database.
+#
+FLASK_TAXONOMIES_SNAPSHOT = None
+
+#
+# Name of a Flask-SQLAlchemy bind (a key of SQLALCHEMY_BINDS, usually a read replica) used by the read
+# methods of the api and the GET endpoints. Writes and requests other than GET use the primary database.
+#
+FLASK_TAXONOMIES_READ_BIND = None
+
+#
+# Database uri used by the asyncio api (current_flask_taxonomies.async_api). If not set, SQLALCHEMY_DATABASE_URI
+# with the driver replaced by an asyncio one (asyncpg, aiosqlite) is used.
+#
+FLASK_TAXONOMIES_ASYNC_DATABASE_URI = None
+
 # FLASK_TAXONOMIES_QUERY_PARSER = 'flask_taxonomies.query.default_query_parser'
 
 # FLASK_TAXONOMIES_QUERY_EXECUTOR = 'flask_taxonomies.query.default_query_executor'
+
+#
+# Settings of the full-text query executor (flask_taxonomies.fulltext.fulltext_query_executor).
+# Dot-separated json paths inside term extra_data that get indexed, None to index all string values.
+# The index must be (re)created by flask_taxonomies.fulltext.create_fulltext_index after changing the paths.
+#
+FLASK_TAXONOMIES_FULLTEXT_PATHS = None
+
+#
+# PostgreSQL text search configuration used for the full-text index
+#
+FLASK_TAXONOMIES_FULLTEXT_LANGUAGE = 'simple'
+
+#
+# If True, full-text results are ordered by relevance instead of by slug
+#
+FLASK_TAXONOMIES_FULLTEXT_RANK = False
+
+#
+# Dot-separated json paths inside term extra_data that are queried with ``path:value``
+# often enough to deserve an expression index. The indexes are created by
+# flask_taxonomies.indexes.create_field_indexes, usually from a migration.
+#
+FLASK_TAXONOMIES_INDEXED_FIELDS = []
+
+#
+# Number of seconds a (taxonomy, slug) that was not found is remembered, so that repeated
+# requests for non-existing terms (old links, crawlers) are answered with 404 without a database query.
+# The cache is per-process: terms created in other processes become visible after this time at the latest.
+# 0 disables the cache.
+#
+FLASK_TAXONOMIES_NEGATIVE_CACHE_TTL = 0
+
+#
+# Max number of entries in the negative cache
+#
+FLASK_TAXONOMIES_NEGATIVE_CACHE_SIZE = 10000
+
+#
+# If True, concurrent identical GET requests for a taxonomy or a term with descendants (same url parameters
+# and representation) are computed once per process: the requests arriving while the first one is being
+# built wait for it and get a copy of its response. Permissions are still checked for each request.
+#
+FLASK_TAXONOMIES_COALESCE_READS = False
+
+#
+# Extra estimated cost of a returned term for representation features, the base cost of a term is 1.
+# Used by the admission control of requests with descendants (flask_taxonomies.views.admission).
+#
+FLASK_TAXONOMIES_TREE_COST_FEATURES = {
+    INCLUDE_DESCENDANTS_COUNT: 1,
+    INCLUDE_STATUS: 1,
+    INCLUDE_ANCESTORS: 1,
+    INCLUDE_ANCESTORS_HIERARCHY: 1,
+    INCLUDE_ANCESTOR_LIST: 1,
+}
+
+#
+# Max estimated cost (number of returned terms times their cost) of a request with descendants,
+# None for no limit. FLASK_TAXONOMIES_REPRESENTATION_MAX_TREE_COST sets the limit per representation
+# name, for example {'minimal': 100000, 'full': 5000}.
+#
+FLASK_TAXONOMIES_MAX_TREE_COST = None
+
+FLASK_TAXONOMIES_REPRESENTATION_MAX_TREE_COST = {}
+
+#
+# What to do with a request over the max cost: 'paginate' returns the first page of a size fitting into
+# the limit (requests that already ask for a page size get 413), 'reject' returns 413
+#
+FLASK_TAXONOMIES_EXPENSIVE_TREE_POLICY = 'paginate'
+
+#
+# Requests with descendants with estimated cost at least FLASK_TAXONOMIES_HEAVY_TREE_COST are heavy.
+# At most FLASK_TAXONOMIES_MAX_HEAVY_REQUESTS heavy requests are served by a process at the same time,
+# a request waits at most FLASK_TAXONOMIES_HEAVY_REQUEST_WAIT seconds for a free slot and gets 429 otherwise.
+# None disables the limit.
+#
+FLASK_TAXONOMIES_HEAVY_TREE_COST = None
+
+FLASK_TAXONOMIES_MAX_HEAVY_REQUESTS = None
+
+FLASK_TAXONOMIES_HEAVY_REQUEST_WAIT = 0
+
+#
+# Timeout in milliseconds of a single SQL statement executed by a request to the taxonomy endpoints,
+# None for no timeout. FLASK_TAXONOMIES_ENDPOINT_STATEMENT_TIMEOUTS sets the timeout per view name,
+# for example {'get_taxonomy': 5000, 'get_taxonomy_term': 2000}. Requests with a statement over the timeout
+# get 503.
+#
+FLASK_TAXONOMIES_STATEMENT_TIMEOUT = None
+
+FLASK_TAXONOMIES_ENDPOINT_STATEMENT_TIMEOUTS = {}
+
+#
+# Max number of SQL statements executed by a single request to the taxonomy endpoints, None for no limit.
+# FLASK_TAXONOMIES_ENDPOINT_QUERY_BUDGETS sets the budget per view name. Requests over the budget get 503.
+#
+FLASK_TAXONOMIES_QUERY_BUDGET = None
+
+FLASK_TAXONOMIES_ENDPOINT_QUERY_BUDGETS = {}
+
+#
+# If True, durations of the phases of requests to the taxonomy endpoints (taxonomy lookup, permission check,
+# term query, count, building the tree, json encoding) and of their SQL statements are returned
+# in the Server-Timing response header and logged by the flask_taxonomies.timing logger at INFO level
+#
+FLASK_TAXONOMIES_SERVER_TIMING = False
+
+#
+# Directory with binary taxonomy snapshots written by ``flask taxonomies binary-snapshot``,
+# served by ``current_flask_taxonomies.binary_snapshot(code)``
+#
+FLASK_TAXONOMIES_BINARY_SNAPSHOT_DIR = None
+
+#
+# Minimal number of seconds between checks whether a binary snapshot file has been replaced
+#
+FLASK_TAXONOMIES_BINARY_SNAPSHOT_CHECK_INTERVAL = 1
@@ -18,3 +18,8 @@ INCLUDE_LEVEL = 'lvl'
 INCLUDE_STATUS = 'sta'
 INCLUDE_SELF = 'self'
 INCLUDE_PARENT = 'par'
+
+# Prefer: return= value asking write operations not to return any representation,
+# just the status code and Location header. ``minimal`` can not be used as it is
+# a regular representation in this api.
+RETURN_NONE = 'none'
@@ -0,0 +1,253 @@
+"""
+Streaming export of taxonomy terms.
+
+Terms are read in slug order with ``yield_per`` and the slugs of terms referenced by
+``obsoleted_by`` are looked up once per batch, so memory use does not depend
+on the size of the taxonomy. The output has the format of ``utils.to_json``,
+either as a nested json tree or as newline delimited json with one term per line.
+
+Delta exports (``export_changes``) contain only the terms touched by changes recorded
+in the change log after a given sequence number or time, in their current state.
+"""
+import datetime
+import json
+
+import sqlalchemy
+from sqlalchemy import func
+
+from flask_taxonomies.models import (
+    Taxonomy,
+    TaxonomyError,
+    TaxonomyTerm,
+    TaxonomyTermChange,
+    TermStatusEnum,
+)
+from flask_taxonomies.term_identification import TermIdentification
+
+EXPORT_FORMATS = ('json', 'ndjson')
+
+_TERM_COLUMNS = (
+    TaxonomyTerm.slug, TaxonomyTerm.level, TaxonomyTerm.status,
+    TaxonomyTerm.extra_data, TaxonomyTerm.obsoleted_by_id
+)
+
+
+def iter_terms(api, taxonomy_or_term, status_cond=sqlalchemy.sql.true(), batch_size=1000, session=None):
+    """
+    Yields terms of a taxonomy (or a term and its descendants) in slug order.
+
+    :param api: the taxonomy api (current_flask_taxonomies)
+    :param taxonomy_or_term: Taxonomy, taxonomy code or TaxonomyTerm
+    :param status_cond: condition on term status, by default terms in any state are exported
+    :param batch_size: number of rows fetched from the database at once
+    :return: generator of dicts - term data with 'slug', 'level', 'status' and for moved terms 'obsoleted_by'
+    """
+    session = session or api.session
+    if isinstance(taxonomy_or_term, (Taxonomy, str)):
+        query = api.list_taxonomy(taxonomy_or_term, status_cond=status_cond, session=session)
+    else:
+        query = api.descendants_or_self(TermIdentification(term=taxonomy_or_term),
+                                        status_cond=status_cond, session=session)
+    query = query.with_entities(*_TERM_COLUMNS).yield_per(batch_size)
+
+    batch = []
+    for row in query:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield from _batch_terms(batch, session)
+            batch = []
+    if batch:
+        yield from _batch_terms(batch, session)
+
+
+def _batch_terms(batch, session):
+    obsoleted_by_ids = set(row.obsoleted_by_id for row in batch if row.obsoleted_by_id)
+    obsoleted_by = {}
+    if obsoleted_by_ids:
+        obsoleted_by = dict(session.query(TaxonomyTerm.id, TaxonomyTerm.slug).filter(
+            TaxonomyTerm.id.in_(obsoleted_by_ids)))
+    for row in batch:
+        data = {
+            **(row.extra_data or {}),
+            'slug': row.slug,
+            'level': row.level,
+            'status': row.status.value
+        }
+        if row.obsoleted_by_id:
+            data['obsoleted_by'] = obsoleted_by.get(row.obsoleted_by_id)
+        yield data
+
+
+def write_ndjson(terms, fp):
+    """Writes terms from ``iter_terms`` as newline delimited json, returns the number of terms."""
+    count = 0
+    for term in terms:
+        fp.write(json.dumps(term, ensure_ascii=False))
+        fp.write('\n')
+        count += 1
+    return count
+
+
+def write_json(terms, fp):
+    """
+    Writes terms from ``iter_terms`` as a nested json tree (a list of top-level terms with their
+    ``children``), returns the number of terms. Only the levels of the path to the current term
+    are kept in memory.
+    """
+    count = 0
+    levels = []  # levels of the terms whose children are being written
+    fp.write('[')
+    first = True
+    for term in terms:
+        level = term['level']
+        while levels and levels[-1] >= level:
+            fp.write(']}')
+            levels.pop()
+            first = False
+        if not first:
+            fp.write(',')
+        # 'children' in the term's data is replaced by the children in the tree
+        encoded = json.dumps({k: v for k, v in term.items() if k != 'children'}, ensure_ascii=False)
+        # leave the children list open
+        fp.write(encoded[:-1])
+        fp.write(', "children": [')
+        levels.append(level)
+        first = True
+        count += 1
+    while levels:
+        fp.write(']}')
+        levels.pop()
+    fp.write(']')
+    return count
+
+
+def export_terms(api, taxonomy_or_term, fp, format='json', status_cond=sqlalchemy.sql.true(),
+                 batch_size=1000, session=None):
+    """
+    Writes terms of the taxonomy (or the term and its descendants) to an open text file.
+
+    :param format: 'json' for a nested tree, 'ndjson' for one term per line
+    :return: number of exported terms
+    """
+    terms = iter_terms(api, taxonomy_or_term, status_cond=status_cond, batch_size=batch_size, session=session)
+    if format == 'ndjson':
+        return write_ndjson(terms, fp)
+    if format == 'json':
+        return write_json(terms, fp)
+    raise ValueError('Unknown format %s, expected one of %s' % (format, ', '.join(EXPORT_FORMATS)))
+
+
+def resolve_since(since, session):
+    """
+    Converts the start of a delta export to a change log sequence number.
+
+    :param since: sequence number (int or a string of digits), or a datetime (or an ISO 8601 string).
+                  Naive datetimes are in UTC
+    :return: seq of the last change made before or at the given time
+    """
+    if isinstance(since, str):
+        if since.isdigit():
+            return int(since)
+        try:
+            since = datetime.datetime.fromisoformat(since)
+        except ValueError:
+            raise TaxonomyError('Expected a sequence number or an ISO 8601 timestamp, got %s' % since)
+    if isinstance(since, datetime.datetime):
+        if since.tzinfo:
+            since = since.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return session.query(func.max(TaxonomyTermChange.seq)).filter(
+            TaxonomyTermChange.timestamp <= since).scalar() or 0
+    return int(since or 0)
+
+
+def changed_slugs(api, taxonomy: [Taxonomy, str], since, until=None, batch_size=1000, session=None):
+    """
+    Returns slugs of terms of the taxonomy that were created, changed, moved or deleted
+    by changes with seq in (since, until]. Both the old and the new slug of a moved term are included.
+
+    :param since: see ``resolve_since``
+    :param until: seq of the last change to include, defaults to the last change in the log. Changes are
+                  committed in the order of seq (see ``Api._lock_change_log``), so no change with a lower seq
+                  can appear later and ``until`` is a safe ``since`` of the next delta
+    :return: tuple (sorted list of slugs, until)
+    """
+    session = session or api.session
+    if not api.change_log_enabled:
+        raise TaxonomyError('Delta export needs the change log, set FLASK_TAXONOMIES_CHANGE_LOG to True')
+    if isinstance(taxonomy, Taxonomy):
+        taxonomy = taxonomy.code
+    since = resolve_since(since, session)
+    if until is None:
+        until = max(session.query(func.max(TaxonomyTermChange.seq)).scalar() or 0, since)
+    slugs = set()
+    query = session.query(TaxonomyTermChange.slug, TaxonomyTermChange.target_slug).filter(
+        TaxonomyTermChange.taxonomy_code == taxonomy,
+        TaxonomyTermChange.seq > since,
+        TaxonomyTermChange.seq <= until
+    ).yield_per(batch_size)
+    for slug, target_slug in query:
+        slugs.add(slug)
+        if target_slug:
+            slugs.add(target_slug)
+    return sorted(slugs), until
+
+
+def iter_changed_terms(api, taxonomy: [Taxonomy, str], slugs, batch_size=1000, session=None):
+    """
+    Yields the current state of terms with the given (sorted) slugs in the format of ``iter_terms``.
+    Deleted terms are included with their ``obsoleted_by`` redirect target, terms that have already been
+    removed from the database are yielded as tombstones containing only ``slug``, ``level`` and ``status``.
+    """
+    session = session or api.session
+    if isinstance(taxonomy, str):
+        taxonomy = api.get_taxonomy(taxonomy, session=session)
+    for i in range(0, len(slugs), batch_size):
+        chunk = slugs[i:i + batch_size]
+        rows = session.query(*_TERM_COLUMNS).filter(
+            TaxonomyTerm.taxonomy_id == taxonomy.id,
+            TaxonomyTerm.slug.in_(chunk)
+        ).all()
+        terms = {term['slug']: term for term in _batch_terms(rows, session)}
+        for slug in chunk:
+            yield terms.get(slug) or {
+                'slug': slug,
+                'level': slug.count('/'),
+                'status': TermStatusEnum.deleted.value
+            }
+
+
+def encode_changes(terms, since, until, format='json'):
+    """
+    Yields pieces of the encoded delta export. The json format is an object with ``since``, ``until``
+    and the flat list of ``terms``, ndjson contains one term per line.
+    """
+    if format == 'ndjson':
+        for term in terms:
+            yield json.dumps(term, ensure_ascii=False) + '\n'
+    elif format == 'json':
+        yield '{"since": %d, "until": %d, "terms": [' % (since, until)
+        first = True
+        for term in terms:
+            if not first:
+                yield ','
+            yield json.dumps(term, ensure_ascii=False)
+            first = False
+        yield ']}'
+    else:
+        raise ValueError('Unknown format %s, expected one of %s' % (format, ', '.join(EXPORT_FORMATS)))
+
+
+def export_changes(api, taxonomy: [Taxonomy, str], fp, since, format='ndjson', batch_size=1000, session=None):
+    """
+    Writes the terms touched by changes after ``since`` (see ``changed_slugs``) to an open text file.
+
+    :return: tuple (number of exported terms, seq of the last included change - the ``since``
+             of the next delta export)
+    """
+    session = session or api.session
+    since = resolve_since(since, session)
+    slugs, until = changed_slugs(api, taxonomy, since, batch_size=batch_size, session=session)
+    terms = iter_changed_terms(api, taxonomy, slugs, batch_size=batch_size, session=session)
+    for piece in encode_changes(terms, since, until, format=format):
+        fp.write(piece)
+    return len(slugs), until
@@ -5,8 +5,10 @@ class FlaskTaxonomies:
             self.init_app(app)
 
     def init_app(self, app):
-        from flask_taxonomies import api, config
+        from flask_taxonomies import api, cli, config
         for k in dir(config):
             if k.startswith('FLASK_TAXONOMIES_'):
                 app.config.setdefault(k, getattr(config, k))
         app.extensions['flask-taxonomies'] = api.Api(app)
+        app.teardown_appcontext(app.extensions['flask-taxonomies'].remove_read_sessions)
+        app.cli.add_command(cli.taxonomies)
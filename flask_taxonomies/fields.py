@@ -4,29 +4,46 @@ from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.sql import ColumnElement
 from sqlalchemy.sql.elements import Grouping
 from sqlalchemy.sql.operators import custom_op
+from sqlalchemy.sql.visitors import InternalTraversal
 from sqlalchemy_utils import LtreeType
 
 
-class Ancestor(ColumnElement):
+class _SlugComparison(ColumnElement):
+    # lhs and rhs take part in the cache key, so the statements using ancestor_of/descendant_of
+    # are compiled once and then served from sqlalchemy's compiled cache
+    _traverse_internals = [
+        ('lhs', InternalTraversal.dp_clauseelement),
+        ('rhs', InternalTraversal.dp_clauseelement),
+    ]
+    inherit_cache = True
+    type = sa.Boolean()
+
     def __init__(self, lhs, rhs):
         self.lhs = lhs
+        if isinstance(rhs, str):
+            # a bound parameter, not a string baked into the compiled statement
+            rhs = sa.literal(rhs, type_=lhs.type)
         self.rhs = rhs
 
 
-class Descendant(ColumnElement):
-    def __init__(self, lhs, rhs):
-        self.lhs = lhs
-        self.rhs = rhs
+class Ancestor(_SlugComparison):
+    inherit_cache = True
+
+
+class Descendant(_SlugComparison):
+    inherit_cache = True
 
 
 # postgresql ltree does not allow for hyphens in path, so need to change them to _
 class PostgresSlugType(LtreeType):
+    cache_ok = True
+
     class comparator_factory(types.Concatenable.Comparator):
         def ancestor_of(self, other):
-            return Ancestor(self, other)
+            return Ancestor(self.expr, other)
 
         def descendant_of(self, other):
-            return Descendant(self, other)
+            return Descendant(self.expr, other)
 
     def bind_processor(self, dialect):
         def process(value):
@@ -60,13 +77,14 @@ ESCAPE_CHAR = '\x01'  # as low as possible, \x00 is handled incorrectly in sqlit
 
 class SlugType(types.TypeDecorator):
     impl = sa.UnicodeText()
+    cache_ok = True
 
     class Comparator(sa.UnicodeText.Comparator):
         def ancestor_of(self, other):
-            return Ancestor(self, other)
+            return Ancestor(self.expr, other)
 
         def descendant_of(self, other):
-            return Descendant(self, other)
+            return Descendant(self.expr, other)
 
         def reverse_op(self, opstring, precedence=0, is_comparison=False, return_type=None):
             operator = custom_op(opstring, precedence, is_comparison, return_type)
@@ -97,8 +115,6 @@ def compile_descendant(element, compiler, **kw):
 def compile_descendant(element, compiler, **kw):
     lhs = element.lhs
     rhs = element.rhs
-    if isinstance(rhs, str):
-        rhs = rhs.replace('/', '.').replace('-', '_')
     expr = Grouping(lhs.op('<@')(rhs))
     return compiler.visit_grouping(expr)
 
@@ -115,8 +131,6 @@ def compile_ancestor(element, compiler, **kw):
 def compile_ancestor(element, compiler, **kw):
     lhs = element.lhs
     rhs = element.rhs
-    if isinstance(rhs, str):
-        rhs = rhs.replace('/', '.').replace('-', '_')
     expr = Grouping(lhs.op('@>')(rhs))
     return compiler.visit_grouping(expr)
 
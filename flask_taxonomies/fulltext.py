@@ -0,0 +1,188 @@
+"""
+Indexed full-text search over term ``extra_data``.
+
+PostgreSQL keeps a generated ``tsvector`` column on ``taxonomy_term`` with a GIN
+index, SQLite keeps an FTS5 shadow table maintained by triggers. In both cases the
+database itself keeps the index in sync with term writes, including the bulk
+updates and deletes performed by move and delete operations.
+
+The index is created by ``create_fulltext_index`` (call it after ``create_all``
+or from a migration) and used by setting
+
+    FLASK_TAXONOMIES_QUERY_EXECUTOR = 'flask_taxonomies.fulltext.fulltext_query_executor'
+"""
+import sqlalchemy
+from flask import current_app
+from sqlalchemy import Column, Integer, MetaData, Table, Text, func, literal_column
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Query as SQLAlchemyQuery
+
+from flask_taxonomies.models import TaxonomyError, TaxonomyTerm
+from flask_taxonomies.query import TaxonomyQuery, default_query_executor, dialect_name
+
+FULLTEXT_TABLE = 'taxonomy_term_fulltext'
+FULLTEXT_COLUMN = 'fulltext'
+FULLTEXT_INDEX = 'taxonomy_term_fulltext_idx'
+
+# FTS5 virtual table on sqlite, not part of models.Base so that create_all does not touch it
+sqlite_fulltext_table = Table(
+    FULLTEXT_TABLE, MetaData(),
+    Column('rowid', Integer, primary_key=True),
+    Column('content', Text),
+    Column('rank', sqlalchemy.Float),
+)
+
+# generated tsvector column on postgresql, added by create_fulltext_index and therefore not mapped on TaxonomyTerm
+postgresql_fulltext_column = sqlalchemy.column(FULLTEXT_COLUMN, TSVECTOR, _selectable=TaxonomyTerm.__table__)
+
+
+def _config(key, default=None):
+    return current_app.config.get(key, default)
+
+
+def _split_path(path):
+    return [x for x in path.split('.') if x]
+
+
+def _sql_literal(value):
+    return "'%s'" % value.replace("'", "''")
+
+
+def _postgresql_document(paths, language):
+    language = _sql_literal(language) + '::regconfig'
+    if not paths:
+        return "jsonb_to_tsvector(%s, coalesce(extra_data, '{}'::jsonb), '[\"string\"]')" % language
+    parts = [
+        "coalesce(extra_data #>> %s, '')" % _sql_literal('{%s}' % ','.join(
+            '"%s"' % p.replace('"', '\\"') for p in _split_path(path)))
+        for path in paths
+    ]
+    return "to_tsvector(%s, %s)" % (language, " || ' ' || ".join(parts))
+
+
+def _sqlite_document(paths, row):
+    if not paths:
+        return "coalesce((SELECT group_concat(value, ' ') FROM json_tree(%s.extra_data) " \
+               "WHERE type = 'text'), '')" % row
+    parts = [
+        "coalesce(json_extract(%s.extra_data, %s), '')" % (row, _sql_literal('$.' + '.'.join(
+            '"%s"' % p.replace('"', '""') for p in _split_path(path))))
+        for path in paths
+    ]
+    return " || ' ' || ".join(parts)
+
+
+def create_fulltext_index(connection, paths=None, language=None):
+    """
+    (Re)creates the full-text index over taxonomy terms and fills it with existing data.
+
+    :param connection:  sqlalchemy engine, connection or session
+    :param paths:       dot-separated json paths to index, defaults to FLASK_TAXONOMIES_FULLTEXT_PATHS.
+                        If empty, all string values inside extra_data are indexed
+    :param language:    postgresql text search configuration, defaults to FLASK_TAXONOMIES_FULLTEXT_LANGUAGE
+    """
+    if paths is None:
+        paths = _config('FLASK_TAXONOMIES_FULLTEXT_PATHS')
+    if language is None:
+        language = _config('FLASK_TAXONOMIES_FULLTEXT_LANGUAGE') or 'simple'
+    drop_fulltext_index(connection)
+    dialect = dialect_name(connection)
+
+    if dialect == 'postgresql':
+        statements = [
+            'ALTER TABLE taxonomy_term ADD COLUMN %s tsvector GENERATED ALWAYS AS (%s) STORED' % (
+                FULLTEXT_COLUMN, _postgresql_document(paths, language)),
+            'CREATE INDEX %s ON taxonomy_term USING gin (%s)' % (FULLTEXT_INDEX, FULLTEXT_COLUMN)
+        ]
+    elif dialect == 'sqlite':
+        statements = [
+            "CREATE VIRTUAL TABLE %s USING fts5(content, tokenize='unicode61 remove_diacritics 2')" % (
+                FULLTEXT_TABLE),
+            'CREATE TRIGGER %s_ai AFTER INSERT ON taxonomy_term BEGIN '
+            'INSERT INTO %s(rowid, content) VALUES (new.id, %s); END' % (
+                FULLTEXT_TABLE, FULLTEXT_TABLE, _sqlite_document(paths, 'new')),
+            'CREATE TRIGGER %s_au AFTER UPDATE OF extra_data ON taxonomy_term BEGIN '
+            'DELETE FROM %s WHERE rowid = old.id; '
+            'INSERT INTO %s(rowid, content) VALUES (new.id, %s); END' % (
+                FULLTEXT_TABLE, FULLTEXT_TABLE, FULLTEXT_TABLE, _sqlite_document(paths, 'new')),
+            'CREATE TRIGGER %s_ad AFTER DELETE ON taxonomy_term BEGIN '
+            'DELETE FROM %s WHERE rowid = old.id; END' % (FULLTEXT_TABLE, FULLTEXT_TABLE),
+            'INSERT INTO %s(rowid, content) SELECT id, %s FROM taxonomy_term' % (
+                FULLTEXT_TABLE, _sqlite_document(paths, 'taxonomy_term'))
+        ]
+    else:
+        raise TaxonomyError('Full-text index not supported on database %s' % dialect)
+
+    for stmt in statements:
+        connection.execute(sqlalchemy.text(stmt))
+
+
+def drop_fulltext_index(connection):
+    """
+    Removes the full-text index created by ``create_fulltext_index``, if it exists.
+
+    :param connection:  sqlalchemy engine, connection or session
+    """
+    dialect = dialect_name(connection)
+    if dialect == 'postgresql':
+        statements = [
+            'ALTER TABLE taxonomy_term DROP COLUMN IF EXISTS %s' % FULLTEXT_COLUMN
+        ]
+    elif dialect == 'sqlite':
+        statements = [
+            'DROP TRIGGER IF EXISTS %s_ai' % FULLTEXT_TABLE,
+            'DROP TRIGGER IF EXISTS %s_au' % FULLTEXT_TABLE,
+            'DROP TRIGGER IF EXISTS %s_ad' % FULLTEXT_TABLE,
+            'DROP TABLE IF EXISTS %s' % FULLTEXT_TABLE,
+        ]
+    else:
+        return
+    for stmt in statements:
+        connection.execute(sqlalchemy.text(stmt))
+
+
+def _fts5_query(q):
+    # quote each token so that fts5 syntax characters in user input are taken literally,
+    # the trailing * keeps prefix matching close to the former ``contains`` semantics
+    return ' '.join('"%s"*' % token.replace('"', '""') for token in q.split())
+
+
+def fulltext_query_executor(session, query: SQLAlchemyQuery,
+                            model, taxonomy_query: TaxonomyQuery) -> SQLAlchemyQuery:
+    """
+    Query executor using the full-text index for simple queries on terms.
+
+    Complex queries and queries on taxonomies are delegated to ``default_query_executor``.
+    If FLASK_TAXONOMIES_FULLTEXT_RANK is set, the results are ordered by relevance
+    instead of by slug.
+
+    :param session:  sqlalchemy session
+    :param query:    the sqlalchemy query
+    :param taxonomy_query: parsed query from default_query_parser
+    :return:            modified sqlalchemy query
+    """
+    if not taxonomy_query.is_simple or model is not TaxonomyTerm or not taxonomy_query.query.strip():
+        return default_query_executor(session, query, model, taxonomy_query)
+
+    rank = _config('FLASK_TAXONOMIES_FULLTEXT_RANK')
+    dialect = session.bind.dialect.name
+
+    if dialect == 'postgresql':
+        language = _config('FLASK_TAXONOMIES_FULLTEXT_LANGUAGE') or 'simple'
+        document = postgresql_fulltext_column
+        tsquery = func.plainto_tsquery(literal_column(_sql_literal(language) + '::regconfig'),
+                                       taxonomy_query.query)
+        query = query.filter(document.op('@@')(tsquery))
+        if rank:
+            query = query.order_by(None).order_by(func.ts_rank(document, tsquery).desc(), TaxonomyTerm.slug)
+        return query
+
+    if dialect == 'sqlite':
+        fts = sqlite_fulltext_table
+        query = query.join(fts, fts.c.rowid == TaxonomyTerm.id).filter(
+            fts.c.content.op('MATCH')(_fts5_query(taxonomy_query.query)))
+        if rank:
+            query = query.order_by(None).order_by(fts.c.rank, TaxonomyTerm.slug)
+        return query
+
+    return default_query_executor(session, query, model, taxonomy_query)
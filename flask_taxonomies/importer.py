@@ -0,0 +1,397 @@
+"""
+Streaming import of taxonomy terms from CSV, JSON and NDJSON files.
+
+Each input record becomes a term, its slug is built from one or more record fields
+(``slug_fields``, from the top of the hierarchy down), optionally prefixed with the slug
+of the parent taken from ``parent_field``. Missing intermediate terms are created without data.
+Terms are inserted with ``Api.bulk_create_terms`` in chunks, each chunk is committed.
+
+``import_terms_parallel`` partitions the input by top-level slug and imports the partitions
+in worker processes, each with its own database connection.
+"""
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import tempfile
+import zlib
+
+from flask_sqlalchemy import get_state
+from slugify import slugify
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import aliased
+
+from flask_taxonomies.models import (
+    Taxonomy,
+    TaxonomyError,
+    TaxonomyTerm,
+    TermStatusEnum,
+)
+from flask_taxonomies.proxies import current_flask_taxonomies
+from flask_taxonomies.sync import in_subtree
+
+log = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'json', 'ndjson')
+
+
+def guess_format(filename):
+    ext = os.path.splitext(filename)[1].lower().lstrip('.')
+    if ext == 'jsonl':
+        return 'ndjson'
+    if ext in FORMATS:
+        return ext
+    raise TaxonomyError('Can not guess format of %s, please specify it' % filename)
+
+
+def read_records(fp, format):
+    """
+    Yields records (dicts) from an open text file.
+
+    CSV and NDJSON files are streamed, a JSON file has to contain a list of records
+    and is loaded at once - use NDJSON for large inputs.
+    """
+    if format == 'csv':
+        yield from csv.DictReader(fp)
+    elif format == 'ndjson':
+        for line in fp:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    elif format == 'json':
+        data = json.load(fp)
+        if not isinstance(data, list):
+            raise TaxonomyError('JSON input must contain a list of records')
+        yield from data
+    else:
+        raise TaxonomyError('Unknown format %s, expected one of %s' % (format, ', '.join(FORMATS)))
+
+
+def _field(record, field):
+    # dotted names address nested json fields
+    value = record
+    for part in field.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def record_slug(record, slug_fields, parent_field=None):
+    """Full slug of the term described by the record or None if a slug field is empty."""
+    parts = []
+    if parent_field:
+        parent = _field(record, parent_field)
+        if parent:
+            parts.extend(slugify(x) for x in str(parent).split('/') if x)
+    for field in slug_fields:
+        value = _field(record, field)
+        if value is None or value == '':
+            return None
+        parts.append(slugify(str(value)))
+    if not all(parts):
+        return None
+    return '/'.join(parts)
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.created = 0
+        self.skipped = 0
+        self.deleted = 0  # records of deleted or moved terms or of terms below them, not imported
+        self.invalid = 0
+        self.chunks = 0
+
+
+def import_terms(taxonomy: [Taxonomy, str], records, slug_fields, parent_field=None,
+                 chunk_size=1000, progress=None, session=None):
+    """
+    Imports records as taxonomy terms.
+
+    :param taxonomy: taxonomy or its code
+    :param records: iterable of dicts, the whole record becomes the term's extra data
+    :param slug_fields: names of fields making the slug, one per hierarchy level
+    :param parent_field: name of a field containing the slug of the parent term
+    :param chunk_size: number of terms inserted and committed together
+    :param progress: callable receiving ImportStats after each committed chunk
+    :return: ImportStats. Alive terms that already exist are skipped. Deleted or moved terms are
+             not revived, their records and records of terms below them are counted as deleted.
+             Records with an empty slug field are counted as invalid
+    """
+    stats = ImportStats()
+    return import_slugged_terms(taxonomy, _slugged_records(records, slug_fields, parent_field, stats),
+                                chunk_size=chunk_size, progress=progress, stats=stats, session=session)
+
+
+def _slugged_records(records, slug_fields, parent_field, stats):
+    for record in records:
+        stats.read += 1
+        slug = record_slug(record, slug_fields, parent_field)
+        if not slug:
+            stats.invalid += 1
+            continue
+        yield slug, record
+
+
+def import_slugged_terms(taxonomy: [Taxonomy, str], terms, chunk_size=1000, progress=None,
+                         stats=None, session=None):
+    """
+    Imports (slug, extra_data) pairs, see ``import_terms``.
+    """
+    api = current_flask_taxonomies
+    session = session or api.session
+    if isinstance(taxonomy, str):
+        taxonomy = api.get_taxonomy(taxonomy, session=session)
+    if stats is None:
+        stats = ImportStats()
+    parents = set()  # slugs of intermediate terms known to exist
+    chunk = {}
+
+    def flush():
+        # intermediate terms and terms already in the database are resolved with one query per chunk
+        candidates = _with_parents(chunk, parents)
+        alive, not_alive = _existing_slugs(taxonomy, candidates, session)
+        # the slugs of deleted and moved terms are taken, so nothing can be created in their subtrees
+        blocked = {slug for slug in candidates if in_subtree(slug, not_alive)} if not_alive else set()
+        new_terms = [(slug, chunk.get(slug)) for slug in sorted(candidates - alive - blocked)]
+        api.bulk_create_terms(taxonomy, new_terms, chunk_size=chunk_size, session=session)
+        api.commit(session=session)
+        parents.update(x for x in candidates - blocked if x not in chunk)
+        stats.created += len(new_terms)
+        stats.skipped += len(alive & chunk.keys())
+        stats.deleted += len(blocked & chunk.keys())
+        stats.chunks += 1
+        chunk.clear()
+        if progress:
+            progress(stats)
+
+    for slug, extra_data in terms:
+        if slug in chunk:
+            stats.skipped += 1
+            continue
+        chunk[slug] = extra_data
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    return stats
+
+
+def _with_parents(slugs, known_parents):
+    """Slugs together with slugs of their ancestors not in known_parents."""
+    ret = set(slugs)
+    for slug in slugs:
+        parts = slug.split('/')
+        for i in range(1, len(parts)):
+            parent = '/'.join(parts[:i])
+            if parent not in known_parents:
+                ret.add(parent)
+    return ret
+
+
+def _existing_slugs(taxonomy, slugs, session, chunk_size=1000):
+    """Tuple (slugs of alive terms, slugs of deleted or moved terms) of the given slugs in the database."""
+    slugs = list(slugs)
+    alive = set()
+    not_alive = set()
+    for i in range(0, len(slugs), chunk_size):
+        for slug, status in session.query(TaxonomyTerm.slug, TaxonomyTerm.status).filter(
+                TaxonomyTerm.taxonomy_id == taxonomy.id,
+                TaxonomyTerm.slug.in_(slugs[i:i + chunk_size])):
+            (alive if status == TermStatusEnum.alive else not_alive).add(slug)
+    return alive, not_alive
+
+
+def import_terms_parallel(app, taxonomy: [Taxonomy, str], records, slug_fields, parent_field=None,
+                          processes=None, partitions=None, chunk_size=1000, progress=None, session=None):
+    """
+    Imports records as taxonomy terms in parallel worker processes.
+
+    The records are spooled to temporary per-partition files, each partition containing whole
+    subtrees of top-level terms. Top-level terms are created first, then the partitions are imported
+    by a pool of forked processes using separate database connections. SQLite does not allow
+    concurrent writers, there the partitions are imported one after another in this process.
+
+    :param app: the flask application, used by the worker processes
+    :param processes: number of worker processes, defaults to the number of cpus
+    :param partitions: number of partitions, defaults to 4 * processes
+    :param progress: callable receiving (partition, ImportStats) after each committed chunk
+                     of a partition. Partition None denotes the top-level terms
+    :return: tuple (ImportStats totals, dict partition -> error message of failed partitions)
+    """
+    api = current_flask_taxonomies
+    session = session or api.session
+    if isinstance(taxonomy, str):
+        taxonomy = api.get_taxonomy(taxonomy, session=session)
+    processes = processes or os.cpu_count() or 1
+    partitions = partitions or processes * 4
+
+    stats = ImportStats()
+    with tempfile.TemporaryDirectory(prefix='taxonomy-import-') as tmpdir:
+        paths = [os.path.join(tmpdir, '%s.ndjson' % idx) for idx in range(partitions)]
+        roots, used = _partition_records(_slugged_records(records, slug_fields, parent_field, stats), paths)
+
+        import_slugged_terms(taxonomy, roots.items(), chunk_size=chunk_size, stats=stats,
+                             progress=(lambda st: progress(None, st)) if progress else None,
+                             session=session)
+        api.commit(session=session)
+
+        partition_paths = {idx: paths[idx] for idx in sorted(used)}
+        if _concurrent_writers(session):
+            partition_stats, errors = _import_partitions_in_pool(
+                app, partition_paths, taxonomy.code, processes, chunk_size, progress)
+        else:
+            partition_stats, errors = _import_partitions(partition_paths, taxonomy.code, chunk_size, progress)
+        for partition_result in partition_stats.values():
+            stats.created += partition_result.created
+            stats.skipped += partition_result.skipped
+            stats.deleted += partition_result.deleted
+            stats.chunks += partition_result.chunks
+    return stats, errors
+
+
+def _concurrent_writers(session):
+    # sqlite allows a single writer only
+    return session.bind.dialect.name != 'sqlite'
+
+
+def _partition_records(terms, paths):
+    """
+    Writes (slug, extra_data) of non-root terms to the partition files, all terms below a top-level
+    term go to the same partition.
+
+    :return: tuple (dict top-level slug -> extra_data or None, set of indices of non-empty partitions)
+    """
+    roots = {}
+    files = [None] * len(paths)
+    try:
+        for slug, extra_data in terms:
+            root = slug.split('/', maxsplit=1)[0]
+            if root == slug:
+                roots[root] = extra_data
+                continue
+            roots.setdefault(root, None)
+            idx = zlib.crc32(root.encode('utf-8')) % len(paths)
+            if files[idx] is None:
+                files[idx] = open(paths[idx], 'w', encoding='utf-8')
+            files[idx].write(json.dumps([slug, extra_data]))
+            files[idx].write('\n')
+    finally:
+        for f in files:
+            if f is not None:
+                f.close()
+    return roots, {idx for idx, f in enumerate(files) if f is not None}
+
+
+def _import_partitions(partition_paths, taxonomy_code, chunk_size, progress):
+    """Imports the partitions one by one in this process."""
+    partition_stats = {}
+    errors = {}
+    for idx, path in partition_paths.items():
+        partition_stats[idx], error = _import_partition(idx, path, taxonomy_code, chunk_size, progress)
+        if error:
+            errors[idx] = error
+    return partition_stats, errors
+
+
+def _import_partitions_in_pool(app, partition_paths, taxonomy_code, processes, chunk_size, progress):
+    """Imports the partitions in forked worker processes, progress is reported through a queue."""
+    partition_stats = {}
+    errors = {}
+    ctx = multiprocessing.get_context('fork')
+    messages = ctx.Queue()
+    with ctx.Pool(min(processes, len(partition_paths) or 1), initializer=_init_worker,
+                  initargs=(app, messages)) as pool:
+        pending = {
+            idx: pool.apply_async(_pool_import_partition, (idx, path, taxonomy_code, chunk_size))
+            for idx, path in partition_paths.items()
+        }
+        while pending:
+            _report_progress(messages, progress, timeout=0.1)
+            for idx, res in list(pending.items()):
+                if res.ready():
+                    del pending[idx]
+                    partition_stats[idx], error = res.get()
+                    if error:
+                        errors[idx] = error
+        # progress of the last chunks
+        while _report_progress(messages, progress):
+            pass
+    return partition_stats, errors
+
+
+def _report_progress(messages, progress, timeout=None):
+    try:
+        if timeout:
+            idx, partition_progress = messages.get(timeout=timeout)
+        else:
+            idx, partition_progress = messages.get_nowait()
+    except queue.Empty:
+        return False
+    if progress:
+        progress(idx, partition_progress)
+    return True
+
+
+_worker_app = None
+_worker_messages = None
+
+
+def _init_worker(app, messages):
+    global _worker_app, _worker_messages
+    _worker_app = app
+    _worker_messages = messages
+    db = get_state(app).db
+    # do not touch connections inherited from the parent process, open new ones instead
+    db.engine.dispose(close=False)
+    db.session.registry.clear()
+
+
+def _pool_import_partition(idx, path, taxonomy_code, chunk_size):
+    with _worker_app.app_context():
+        try:
+            return _import_partition(idx, path, taxonomy_code, chunk_size,
+                                     lambda idx, st: _worker_messages.put((idx, st)))
+        finally:
+            current_flask_taxonomies.session.remove()
+
+
+def _import_partition(idx, path, taxonomy_code, chunk_size, report):
+    stats = ImportStats()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            import_slugged_terms(taxonomy_code, (json.loads(line) for line in f),
+                                 chunk_size=chunk_size, stats=stats,
+                                 progress=(lambda st: report(idx, st)) if report else None)
+        return stats, None
+    except Exception as e:
+        log.exception('Import of partition %s failed', idx)
+        current_flask_taxonomies.session.rollback()
+        return stats, '%s: %s' % (type(e).__name__, e)
+
+
+def check_consistency(taxonomy: [Taxonomy, str], session=None):
+    """
+    Checks that parent_id and level of the terms in the taxonomy are consistent.
+
+    :return: list of slugs of terms whose level does not match the level of their parent
+             or whose parent is in another taxonomy
+    """
+    session = session or current_flask_taxonomies.session
+    if isinstance(taxonomy, str):
+        taxonomy = current_flask_taxonomies.get_taxonomy(taxonomy, session=session)
+    parent = aliased(TaxonomyTerm)
+    inconsistent_root = and_(TaxonomyTerm.parent_id.is_(None), TaxonomyTerm.level != 0)
+    inconsistent_child = and_(TaxonomyTerm.parent_id.isnot(None), or_(
+        parent.id.is_(None),
+        TaxonomyTerm.level != parent.level + 1,
+        parent.taxonomy_id != TaxonomyTerm.taxonomy_id
+    ))
+    query = session.query(TaxonomyTerm.slug).outerjoin(parent, TaxonomyTerm.parent_id == parent.id).filter(
+        TaxonomyTerm.taxonomy_id == taxonomy.id,
+        or_(inconsistent_root, inconsistent_child)
+    ).order_by(TaxonomyTerm.slug)
+    return [x[0] for x in query]
@@ -0,0 +1,72 @@
+"""
+Expression indexes serving field queries (``path:value``) of the default query executor
+on PostgreSQL and SQLite.
+
+The indexed paths are taken from FLASK_TAXONOMIES_INDEXED_FIELDS. The helpers are meant
+to be called from a migration, for example in an alembic revision:
+
+    from flask_taxonomies.indexes import create_field_indexes
+
+    def upgrade():
+        create_field_indexes(op.get_bind(), ['CountryCode', 'title.en'])
+"""
+import re
+
+import sqlalchemy
+from flask import current_app
+from sqlalchemy.dialects import postgresql, sqlite
+
+from flask_taxonomies.models import TaxonomyError
+from flask_taxonomies.query import dialect_name, json1_field_text, jsonb_field_text
+
+FIELD_INDEX_PREFIX = 'taxonomy_term_field_'
+
+
+def _indexed_fields(fields):
+    if fields is None:
+        fields = current_app.config.get('FLASK_TAXONOMIES_INDEXED_FIELDS') or []
+    return fields
+
+
+def field_index_name(path):
+    """Name of the expression index serving queries on the given path."""
+    name = FIELD_INDEX_PREFIX + re.sub(r'[^a-z0-9]+', '_', path.lower()).strip('_')
+    return name[:63]  # postgresql identifier length limit
+
+
+def field_index_expression(path, dialect):
+    """
+    SQL text of the indexed expression. It is compiled from the same expression
+    the query executor uses so that the two can never drift apart.
+    """
+    if dialect == 'postgresql':
+        expr = jsonb_field_text(sqlalchemy.column('extra_data'), path)
+        return str(expr.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}))
+    if dialect == 'sqlite':
+        expr = json1_field_text(sqlalchemy.column('extra_data'), path)
+        return str(expr.compile(dialect=sqlite.dialect(), compile_kwargs={'literal_binds': True}))
+    raise TaxonomyError('Field indexes not supported on database %s' % dialect)
+
+
+def create_field_indexes(connection, fields=None):
+    """
+    Creates expression indexes on taxonomy_term for the given json paths.
+
+    :param connection:  sqlalchemy engine, connection or session
+    :param fields:      dot-separated json paths, defaults to FLASK_TAXONOMIES_INDEXED_FIELDS
+    """
+    dialect = dialect_name(connection)
+    for path in _indexed_fields(fields):
+        connection.execute(sqlalchemy.text('CREATE INDEX IF NOT EXISTS %s ON taxonomy_term (%s)' % (
+            field_index_name(path), field_index_expression(path, dialect))))
+
+
+def drop_field_indexes(connection, fields=None):
+    """
+    Drops expression indexes created by ``create_field_indexes``.
+
+    :param connection:  sqlalchemy engine, connection or session
+    :param fields:      dot-separated json paths, defaults to FLASK_TAXONOMIES_INDEXED_FIELDS
+    """
+    for path in _indexed_fields(fields):
+        connection.execute(sqlalchemy.text('DROP INDEX IF EXISTS %s' % field_index_name(path)))
@@ -1,7 +1,7 @@
 import re
 
-from marshmallow import EXCLUDE, Schema, utils
-from marshmallow.fields import Field, Integer, String
+from marshmallow import EXCLUDE, Schema, utils, validate
+from marshmallow.fields import Boolean, Field, Integer, String
 from werkzeug.http import parse_options_header
 
 from flask_taxonomies.models import DEFAULT_REPRESENTATION, Representation
@@ -101,3 +101,26 @@ class PaginatedQuerySchema(QuerySchema):
 
     class Meta:
         unknown = EXCLUDE
+
+
+class SyncQuerySchema(Schema):
+    dry_run = Boolean(missing=False, data_key='dry_run')
+
+    class Meta:
+        unknown = EXCLUDE
+
+
+class ChangesQuerySchema(Schema):
+    since = Integer(missing=0, validate=validate.Range(min=0))
+    limit = Integer(missing=None, validate=validate.Range(min=1))
+
+    class Meta:
+        unknown = EXCLUDE
+
+
+class DeltaQuerySchema(Schema):
+    since = String(required=True)
+    format = String(missing='json', validate=validate.OneOf(('json', 'ndjson')))
+
+    class Meta:
+        unknown = EXCLUDE
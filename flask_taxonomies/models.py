@@ -1,3 +1,4 @@
+import datetime
 import enum
 import logging
 from collections import namedtuple
@@ -7,6 +8,7 @@ from flask import current_app
 from sqlalchemy import (
     JSON,
     Column,
+    DateTime,
     Enum,
     ForeignKey,
     Index,
@@ -15,7 +17,7 @@ from sqlalchemy import (
     UniqueConstraint,
 )
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import foreign, relationship
 from werkzeug.utils import cached_property
 
 from flask_taxonomies.constants import *
@@ -387,3 +389,56 @@ class TaxonomyTerm(Base):
                 links['parent'] = parent
 
         return EnvelopeLinks(envelope=links, headers=all_links)
+
+
+class TermChangeEnum(enum.Enum):
+    created = 'C'
+    """
+    Term has been created (or an already deleted term became alive again)
+    """
+
+    updated = 'U'
+    """
+    Term's extra data or status has been changed
+    """
+
+    deleted = 'D'
+    """
+    Term has been deleted
+    """
+
+    moved = 'M'
+    """
+    Term has been moved or renamed, target_slug contains its new slug
+    """
+
+
+class TaxonomyTermChange(Base):
+    """
+    Append-only log of term changes. Rows are written in the same transaction as the change itself,
+    ``seq`` is a global sequence number - consumers remember the last seen ``seq``
+    and ask for the changes after it.
+    """
+    __tablename__ = 'taxonomy_term_change'
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    timestamp = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    operation = Column(Enum(TermChangeEnum), nullable=False)
+    taxonomy_code = Column(String(256), index=True)
+    slug = Column(SlugType(1024).with_variant(PostgresSlugType(), 'postgresql'))
+    target_slug = Column(SlugType(1024).with_variant(PostgresSlugType(), 'postgresql'), nullable=True)
+    # not a foreign key, the log outlives terms removed from the database
+    term_id = Column(Integer)
+    term = relationship(TaxonomyTerm, primaryjoin=foreign(term_id) == TaxonomyTerm.id)
+
+    def json(self):
+        ret = {
+            'seq': self.seq,
+            'timestamp': self.timestamp.isoformat(),
+            'taxonomy': self.taxonomy_code,
+            'slug': self.slug,
+            'operation': self.operation.name
+        }
+        if self.target_slug:
+            ret['target_slug'] = self.target_slug
+        return ret
@@ -1,3 +1,6 @@
+import copy
+from functools import lru_cache
+
 import sqlalchemy
 from luqum.parser import parser
 from luqum.tree import (
@@ -10,7 +13,7 @@ from luqum.tree import (
     UnknownOperation,
     Word,
 )
-from sqlalchemy import cast, func
+from sqlalchemy import cast, func, literal_column
 from sqlalchemy.orm import Query as SQLAlchemyQuery
 
 
@@ -26,25 +29,34 @@ class TaxonomyQueryNotSupported(Exception):
         super().__init__(message)
 
 
+@lru_cache(maxsize=1024)
+def _parse_query(q):
+    try:
+        parsed_query = parser.parse(q)
+    except Exception as e:
+        raise TaxonomyQueryNotSupported(str(e))
+
+    if isinstance(parsed_query, (Word, UnknownOperation)):
+        return True, q
+    if isinstance(parsed_query, Phrase):
+        return True, q.strip('"').strip("'")
+    return False, parsed_query
+
+
 def default_query_parser(q: str, taxonomy_code=None) -> TaxonomyQuery:
     """
-    A parser for the query language
+    A parser for the query language. Parsed queries are cached, every call returns its own copy.
 
     :param q:   the query in stringified form
     :param taxonomy_code:    set to taxonomy code if terms are searched for.
                             Left None if taxonomies are searched for
     :return:    an instance of TaxonomyQuery
     """
-    try:
-        parsed_query = parser.parse(q)
-    except Exception as e:
-        raise TaxonomyQueryNotSupported(str(e))
-
-    if isinstance(parsed_query, (Word, UnknownOperation)):
-        return TaxonomyQuery(is_simple=True, query=q, taxonomy_code=taxonomy_code)
-    if isinstance(parsed_query, Phrase):
-        return TaxonomyQuery(is_simple=True, query=q.strip('"').strip("'"), taxonomy_code=taxonomy_code)
-    return TaxonomyQuery(is_simple=False, query=parsed_query, taxonomy_code=taxonomy_code)
+    is_simple, query = _parse_query(q)
+    if not is_simple:
+        # the cached tree is shared, callers may modify the returned one
+        query = copy.deepcopy(query)
+    return TaxonomyQuery(is_simple=is_simple, query=query, taxonomy_code=taxonomy_code)
 
 
 def default_query_executor(session, query: SQLAlchemyQuery,
@@ -62,34 +74,78 @@ def default_query_executor(session, query: SQLAlchemyQuery,
         return query.filter(
             func.lower(cast(model.extra_data, sqlalchemy.String)).contains(taxonomy_query.query.lower()))
 
-    if session.bind.dialect.name != 'postgresql':
+    converter = QUERY_CONVERTERS.get(session.bind.dialect.name)
+    if not converter:
         raise TaxonomyQueryNotSupported('Complex query not supported on database %s' % session.bind.dialect.name)
 
-    return query.filter(convert_to_postgresql(model.extra_data, taxonomy_query.query))
+    return query.filter(converter(model.extra_data, taxonomy_query.query))
 
 
-def convert_to_postgresql(column, query):
+def dialect_name(connection):
+    """Name of the database dialect of a sqlalchemy engine, connection or session."""
+    bind = getattr(connection, 'bind', None)
+    if bind is not None:
+        return bind.dialect.name
+    return connection.dialect.name
+
+
+def _path_literals(path):
+    return [x.replace("'", "''") for x in path.split('.')]
+
+
+def jsonb_field_text(column, path):
+    """
+    Lowercased text value at the dot-separated path inside a jsonb column.
+
+    Path elements are rendered as literals, not bind parameters, so that the expression
+    is identical to the expression indexes created by flask_taxonomies.indexes
+    and the planner can use them regardless of the database driver.
+    """
+    elements = [literal_column("'%s'" % x) for x in _path_literals(path)]
+    return func.lower(func.jsonb_extract_path_text(column, *elements))
+
+
+def json1_field_text(column, path):
+    """
+    Lowercased value at the dot-separated path inside a sqlite json column.
+
+    As with ``jsonb_field_text``, the path is rendered literally so that sqlite
+    can match the expression against expression indexes.
+    """
+    json_path = '$.' + '.'.join('"%s"' % x.replace('"', '""') for x in _path_literals(path))
+    return func.lower(func.json_extract(column, literal_column("'%s'" % json_path)))
+
+
+def _convert(column, query, field_text):
     if isinstance(query, SearchField):
         name = query.name
         if isinstance(query.expr, Phrase):
             value = query.expr.value.strip('"')
         else:
             value = query.expr.value
-        field = column
-        for n in name.split('.'):
-            field = field[n]
-        field = func.jsonb_extract_path_text(column, *name.split('.'))
-        return func.lower(field) == value.lower()
+        return field_text(column, name) == value.lower()
     if isinstance(query, OrOperation):
-        return sqlalchemy.or_(convert_to_postgresql(column, query.operands[0]),
-                              convert_to_postgresql(column, query.operands[1]))
+        return sqlalchemy.or_(*[_convert(column, x, field_text) for x in query.operands])
     if isinstance(query, AndOperation):
-        return sqlalchemy.and_(convert_to_postgresql(column, query.operands[0]),
-                               convert_to_postgresql(column, query.operands[1]))
+        return sqlalchemy.and_(*[_convert(column, x, field_text) for x in query.operands])
     if isinstance(query, Group):
-        return convert_to_postgresql(column, query.expr)
+        return _convert(column, query.expr, field_text)
     if isinstance(query, Not):
-        return sqlalchemy.not_(convert_to_postgresql(column, query.a))
+        return sqlalchemy.not_(_convert(column, query.a, field_text))
 
     raise TaxonomyQueryNotSupported(
         'Conversion of `%s` to database query is not yet supported. Please file an issue if needed.' % repr(query))
+
+
+def convert_to_postgresql(column, query):
+    return _convert(column, query, jsonb_field_text)
+
+
+def convert_to_sqlite(column, query):
+    return _convert(column, query, json1_field_text)
+
+
+QUERY_CONVERTERS = {
+    'postgresql': convert_to_postgresql,
+    'sqlite': convert_to_sqlite,
+}
@@ -27,3 +27,10 @@ after_taxonomy_term_deleted = taxonomy_signals.signal('after-taxonomy-term-delet
 
 before_taxonomy_term_moved = taxonomy_signals.signal('before-taxonomy-term-moved')
 after_taxonomy_term_moved = taxonomy_signals.signal('after-taxonomy-term-moved')
+
+# signals emitted by set-based operations that do not send the per-term signals
+before_taxonomy_synced = taxonomy_signals.signal('before-taxonomy-synced')
+after_taxonomy_synced = taxonomy_signals.signal('after-taxonomy-synced')
+
+before_taxonomy_terms_bulk_created = taxonomy_signals.signal('before-taxonomy-terms-bulk-created')
+after_taxonomy_terms_bulk_created = taxonomy_signals.signal('after-taxonomy-terms-bulk-created')
@@ -0,0 +1,123 @@
+"""
+Read-only SQLite snapshots of taxonomies.
+
+``write_snapshot`` copies taxonomies with all their terms from the primary database into
+a self-contained SQLite file with the schema of ``models.Base``, including the indexes and the
+field indexes from FLASK_TAXONOMIES_INDEXED_FIELDS. The file is written next to the target
+and atomically renamed, so readers never see a partially written snapshot.
+
+When FLASK_TAXONOMIES_SNAPSHOT points to such a file, the read methods of ``Api`` serve
+from it through a separate read-only engine (see ``snapshot_engine``), writes stay on the primary database.
+"""
+import os
+import tempfile
+
+import sqlalchemy
+from sqlalchemy.pool import NullPool
+
+from flask_taxonomies.indexes import create_field_indexes
+from flask_taxonomies.models import Base, Taxonomy, TaxonomyError, TaxonomyTerm
+
+SNAPSHOT_MMAP_SIZE = 256 * 1024 * 1024
+
+
+class SnapshotStats:
+    def __init__(self):
+        self.taxonomies = 0
+        self.terms = 0
+
+
+def write_snapshot(path, codes=None, session=None, indexed_fields=None, batch_size=1000):
+    """
+    Writes taxonomies to a new SQLite file, replacing the file at ``path`` if it exists.
+
+    :param path: path of the snapshot file
+    :param codes: codes of the taxonomies to include, all taxonomies if not set
+    :param session: session of the primary database
+    :param indexed_fields: json paths of field indexes, defaults to FLASK_TAXONOMIES_INDEXED_FIELDS
+    :param batch_size: number of rows copied at once
+    :return: SnapshotStats
+    """
+    from flask_taxonomies.proxies import current_flask_taxonomies
+    session = session or current_flask_taxonomies.session
+
+    taxonomies = _select_taxonomies(session, codes)
+
+    stats = SnapshotStats()
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.taxonomy-snapshot-', suffix='.sqlite3', dir=directory)
+    os.close(fd)
+    try:
+        engine = sqlalchemy.create_engine('sqlite:///' + tmp_path, poolclass=NullPool)
+        try:
+            Base.metadata.create_all(engine)
+            with engine.begin() as target:
+                _copy_taxonomies(session, target, taxonomies, stats, batch_size)
+                create_field_indexes(target, indexed_fields)
+            with engine.connect() as target:
+                target.execute(sqlalchemy.text('ANALYZE'))
+                target.execute(sqlalchemy.text('VACUUM'))
+        finally:
+            engine.dispose()
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return stats
+
+
+def _select_taxonomies(session, codes):
+    taxonomy_table = Taxonomy.__table__
+    taxonomy_query = taxonomy_table.select().order_by(taxonomy_table.c.id)
+    if codes:
+        taxonomy_query = taxonomy_query.where(taxonomy_table.c.code.in_(codes))
+    taxonomies = [dict(row._mapping) for row in session.execute(taxonomy_query)]
+    if codes:
+        missing = set(codes) - set(x['code'] for x in taxonomies)
+        if missing:
+            raise TaxonomyError('Taxonomies %s do not exist' % ', '.join(sorted(missing)))
+    return taxonomies
+
+
+def _copy_taxonomies(session, target, taxonomies, stats, batch_size):
+    term_table = TaxonomyTerm.__table__
+    if taxonomies:
+        target.execute(Taxonomy.__table__.insert(), taxonomies)
+    stats.taxonomies = len(taxonomies)
+    # ids are kept, so parent_id and obsoleted_by_id stay valid
+    result = session.execute(
+        term_table.select().where(
+            term_table.c.taxonomy_id.in_([x['id'] for x in taxonomies])
+        ).order_by(term_table.c.id).execution_options(stream_results=True))
+    while True:
+        rows = result.fetchmany(batch_size)
+        if not rows:
+            break
+        target.execute(term_table.insert(), [dict(row._mapping) for row in rows])
+        stats.terms += len(rows)
+
+
+def snapshot_engine(path, mmap_size=SNAPSHOT_MMAP_SIZE):
+    """
+    Read-only engine on a snapshot file.
+
+    The file is opened as immutable, so SQLite does no locking, and memory-mapped.
+    Connections are not pooled - a snapshot replaced by ``write_snapshot`` is picked up
+    by the next opened session.
+    """
+    if not os.path.exists(path):
+        raise TaxonomyError('Taxonomy snapshot %s does not exist' % path)
+    engine = sqlalchemy.create_engine(
+        'sqlite:///file:%s?mode=ro&immutable=1&uri=true' % os.path.abspath(path),
+        poolclass=NullPool)
+
+    @sqlalchemy.event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA mmap_size=%d' % mmap_size)
+        cursor.execute('PRAGMA query_only=1')
+        cursor.close()
+
+    return engine
@@ -0,0 +1,130 @@
+"""
+In-memory diff of a taxonomy against a desired tree, used by ``Api.sync_taxonomy``.
+
+The tree has the shape returned by ``utils.to_json``: a list of nodes, each node being
+the term's extra data with ``slug`` and ``children`` keys. ``level``, ``status`` and
+``obsoleted_by`` are optional - nodes with a status other than ``alive`` are not part of the
+desired state, but if they contain ``obsoleted_by``, the term is moved to that slug.
+"""
+from flask_taxonomies.models import TaxonomyError, TermStatusEnum
+
+RESERVED_KEYS = {'slug', 'level', 'status', 'children', 'obsoleted_by', 'links'}
+
+
+def parse_tree(tree):
+    """
+    Flattens the tree.
+
+    :param tree: list of nodes
+    :return: tuple (desired, moves) - desired is a dict slug -> extra_data of terms that should be alive,
+             moves a list of (old slug, new slug)
+    """
+    desired = {}
+    moves = []
+    stack = [(None, node) for node in reversed(tree)]
+    while stack:
+        parent_slug, node = stack.pop()
+        if not isinstance(node, dict) or not node.get('slug'):
+            raise TaxonomyError('Every node of the tree must be an object with a slug')
+        slug = node['slug'].strip('/')
+        if parent_slug and not slug.startswith(parent_slug + '/'):
+            slug = parent_slug + '/' + slug
+        status = node.get('status', TermStatusEnum.alive.value)
+        if status == TermStatusEnum.alive.value:
+            if slug in desired:
+                raise TaxonomyError('Duplicate slug %s in the tree' % slug)
+            desired[slug] = {k: v for k, v in node.items() if k not in RESERVED_KEYS}
+        elif node.get('obsoleted_by'):
+            moves.append((slug, node['obsoleted_by'].strip('/')))
+        for child in reversed(node.get('children') or []):
+            stack.append((slug, child))
+    for slug in desired:
+        if '/' in slug and slug.rsplit('/', maxsplit=1)[0] not in desired:
+            raise TaxonomyError('Parent of %s is not alive in the tree' % slug)
+    return desired, moves
+
+
+def in_subtree(slug, roots):
+    """True if slug is one of roots or lies below one of them."""
+    while True:
+        if slug in roots:
+            return True
+        if '/' not in slug:
+            return False
+        slug = slug.rsplit('/', maxsplit=1)[0]
+
+
+class TermDiff:
+    """
+    Differences between the terms in the database and the desired terms.
+
+    :param existing: dict slug -> (id, status, extra_data, busy_count) of all terms of the taxonomy
+    :param desired: dict slug -> extra_data of terms that should be alive
+    :param moves: list of (old slug, new slug)
+    """
+
+    def __init__(self, existing, desired, moves=()):
+        alive = {slug for slug, (_, status, _, _) in existing.items() if status == TermStatusEnum.alive}
+        self.moved = self._moves(alive, moves)
+        self.created = []  # slugs
+        self.revived = []  # (id, slug), deleted terms that are alive in the tree
+        self.updated = []  # (id, slug)
+        self._changes(existing, desired)
+        self.deleted = self._deletions(existing, desired, alive)
+        self.busy = self._busy(existing)
+
+    @staticmethod
+    def _moves(alive, moves):
+        # moves whose source is alive and target free; a move of a parent moves the children as well
+        moved = []
+        for old_slug, new_slug in sorted(moves):
+            if old_slug in alive and new_slug not in alive and \
+                    not in_subtree(old_slug, {x[0] for x in moved}):
+                moved.append((old_slug, new_slug))
+        return moved
+
+    def _changes(self, existing, desired):
+        moved_targets = {x[1] for x in self.moved}
+        for slug, extra_data in desired.items():
+            if in_subtree(slug, moved_targets):
+                # will be resolved after the move
+                continue
+            if slug not in existing:
+                self.created.append(slug)
+                continue
+            term_id, status, current_data, _ = existing[slug]
+            if status != TermStatusEnum.alive:
+                self.revived.append((term_id, slug))
+            elif (current_data or {}) != extra_data:
+                self.updated.append((term_id, slug))
+
+    def _deletions(self, existing, desired, alive):
+        moved_sources = {x[0] for x in self.moved}
+        deleted = [(existing[slug][0], slug) for slug in alive
+                   if slug not in desired and not in_subtree(slug, moved_sources)]  # (id, slug)
+        deleted.sort(key=lambda x: x[1])
+        return deleted
+
+    def _busy(self, existing):
+        # changed terms inside a busy subtree (a term being moved or deleted marks its whole subtree busy),
+        # moved subtrees must not contain busy terms and their targets must not be inside a busy subtree
+        busy_terms = {slug for slug, (_, _, _, busy_count) in existing.items() if busy_count}
+        if not busy_terms:
+            return []
+        changed = self.created + [slug for _, slug in self.revived + self.updated + self.deleted]
+        busy = sorted(slug for slug in changed if in_subtree(slug, busy_terms))
+        for old_slug, new_slug in self.moved:
+            if in_subtree(new_slug, busy_terms) or any(in_subtree(x, {old_slug}) for x in busy_terms):
+                busy.append(old_slug)
+        return busy
+
+    def __bool__(self):
+        return bool(self.created or self.revived or self.updated or self.deleted or self.moved)
+
+    def as_dict(self):
+        return {
+            'created': sorted(self.created + [slug for _, slug in self.revived]),
+            'updated': sorted(slug for _, slug in self.updated),
+            'deleted': [slug for _, slug in self.deleted],
+            'moved': [list(x) for x in self.moved]
+        }
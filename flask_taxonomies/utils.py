@@ -1,42 +1,19 @@
-import sqlalchemy
-
-from flask_taxonomies.models import Taxonomy, TaxonomyTerm
-from flask_taxonomies.term_identification import TermIdentification
+from flask_taxonomies.exporter import iter_terms
 
 
 def to_json(api, taxonomy_or_term):
-    if isinstance(taxonomy_or_term, Taxonomy):
-        elements = api.list_taxonomy(
-            taxonomy_or_term,
-            status_cond=sqlalchemy.sql.true()
-        )
-    else:
-        elements = api.descendants_or_self(
-            TermIdentification(term=taxonomy_or_term),
-            status_cond=sqlalchemy.sql.true()
-        )
-    stack = None
-    min_level = None
+    """
+    Returns the terms of a taxonomy (or a term and its descendants) as a nested tree.
 
-    for el in elements:
-        level = len(el.slug.split('/'))
-        if stack is None:
-            stack = [{
-                'children': []
-            }]
-            min_level = level
-        data = {
-            **(el.extra_data or {}),
-            'slug': el.slug,
-            'level': el.level,
-            'status': el.status.value,
-            'children': []
-        }
-        if el.obsoleted_by_id:
-            data['obsoleted_by'] = el.obsoleted_by.slug
-        idx = level - min_level
-        stack[idx]['children'].append(data)
-        if idx + 1 == len(stack):
-            stack.append(None)
-        stack[idx + 1] = data
-    return stack[0]['children']
+    The whole tree is built in memory, use ``flask_taxonomies.exporter.export_terms``
+    to write large taxonomies to a file.
+    """
+    top = []
+    stack = []  # (level, term) of the path to the current term
+    for data in iter_terms(api, taxonomy_or_term):
+        data['children'] = []
+        while stack and stack[-1][0] >= data['level']:
+            stack.pop()
+        (stack[-1][1]['children'] if stack else top).append(data)
+        stack.append((data['level'], data))
+    return top
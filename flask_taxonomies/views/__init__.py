@@ -1,4 +1,9 @@
+from .batch import batch_taxonomy_terms
+from .changes import export_taxonomy_changes, list_changes
 from .common import blueprint
+from .limits import QueryBudgetExceeded, RequestLimits
+from .mget import mget_taxonomy_terms
+from .sync import sync_taxonomy
 from .taxonomy import (
     create_update_taxonomy,
     create_update_taxonomy_post,
@@ -13,3 +18,4 @@ from .taxonomy_term import (
     get_taxonomy_term,
     taxonomy_move_term,
 )
+from .timing import RequestTiming
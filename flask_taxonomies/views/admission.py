@@ -0,0 +1,109 @@
+"""
+Admission control of requests returning trees of terms.
+
+The cost of a request is estimated as the number of returned terms times the cost of a single term,
+which is 1 plus the extra costs of the requested features (FLASK_TAXONOMIES_TREE_COST_FEATURES,
+for example descendant counts or ancestors). The number of terms is counted in the database,
+but never more than needed to decide whether the request fits into the limits.
+
+Requests over the limit of their representation (FLASK_TAXONOMIES_MAX_TREE_COST,
+FLASK_TAXONOMIES_REPRESENTATION_MAX_TREE_COST) are paginated or rejected with 413, depending on
+FLASK_TAXONOMIES_EXPENSIVE_TREE_POLICY. At most FLASK_TAXONOMIES_MAX_HEAVY_REQUESTS requests
+costing at least FLASK_TAXONOMIES_HEAVY_TREE_COST are served by the process at the same time,
+others get 429.
+"""
+import contextlib
+import json
+
+from flask import Response, abort, current_app
+
+from flask_taxonomies.proxies import current_flask_taxonomies
+
+
+def term_cost(representation):
+    """Estimated cost of returning a single term in the representation."""
+    features = current_app.config.get('FLASK_TAXONOMIES_TREE_COST_FEATURES') or {}
+    return 1 + sum(cost for feature, cost in features.items() if feature in representation)
+
+
+def max_tree_cost(representation):
+    """Max cost of a request in the representation, None if not limited."""
+    limits = current_app.config.get('FLASK_TAXONOMIES_REPRESENTATION_MAX_TREE_COST') or {}
+    if representation.representation in limits:
+        return limits[representation.representation]
+    return current_app.config.get('FLASK_TAXONOMIES_MAX_TREE_COST')
+
+
+def count_terms(query, bound):
+    """Returns the number of results of the query, at most ``bound``."""
+    if isinstance(query, (list, tuple)):
+        return min(len(query), bound)
+    return query.order_by(None).limit(bound).count()
+
+
+def admit(query, representation, page, size):
+    """
+    Checks the estimated cost of returning terms from ``query``.
+
+    :param query: query (or list) with the returned terms
+    :param page: requested page, None if not paginated
+    :param size: requested page size, None if not paginated
+    :return: tuple (page, size, cost) - page and size to use, paginated if the whole tree would be
+             too expensive, and the estimated cost of the request
+    """
+    config = current_app.config
+    cost_per_term = term_cost(representation)
+    max_cost = max_tree_cost(representation)
+    heavy_cost = config.get('FLASK_TAXONOMIES_HEAVY_TREE_COST')
+
+    thresholds = [x for x in (max_cost, heavy_cost) if x is not None]
+    if not thresholds:
+        return page, size, None
+    # only count as many terms as are needed to compare the cost with the limits
+    bound = min(size or config['FLASK_TAXONOMIES_MAX_RESULTS_RETURNED'], max(thresholds) // cost_per_term + 1)
+    cost = count_terms(query, bound) * cost_per_term
+
+    if max_cost is not None and cost > max_cost:
+        max_terms = max(max_cost // cost_per_term, 1)
+        if size or config.get('FLASK_TAXONOMIES_EXPENSIVE_TREE_POLICY') == 'reject':
+            _abort(413, {
+                'message': 'The request is too expensive, ask for at most %s terms per page' % max_terms,
+                'reason': 'request-too-expensive',
+                'cost': cost,
+                'max_cost': max_cost,
+                'max_size': max_terms
+            })
+        page, size = 1, max_terms
+        cost = max_terms * cost_per_term
+    return page, size, cost
+
+
+@contextlib.contextmanager
+def heavy_request(cost):
+    """
+    Holds one of FLASK_TAXONOMIES_MAX_HEAVY_REQUESTS slots while a heavy request (see ``admit``) is served,
+    aborts with 429 if all slots are taken for FLASK_TAXONOMIES_HEAVY_REQUEST_WAIT seconds.
+    """
+    config = current_app.config
+    heavy_cost = config.get('FLASK_TAXONOMIES_HEAVY_TREE_COST')
+    slots = current_flask_taxonomies.heavy_request_slots
+    if slots is None or cost is None or heavy_cost is None or cost < heavy_cost:
+        yield
+        return
+    if not slots.acquire(timeout=config.get('FLASK_TAXONOMIES_HEAVY_REQUEST_WAIT') or 0):
+        _abort(429, {
+            'message': 'Too many expensive requests are being served, try again later',
+            'reason': 'too-many-heavy-requests'
+        }, headers={'Retry-After': '1'})
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+def _abort(status_code, detail, headers=None):
+    resp = Response(json.dumps(detail, indent=4, ensure_ascii=False),
+                    status=status_code,
+                    headers=headers,
+                    mimetype='application/json; charset=utf-8')
+    abort(status_code, response=resp)
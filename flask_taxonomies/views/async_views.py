@@ -0,0 +1,416 @@
+"""
+Coroutine implementations of the read endpoints (list taxonomies, get taxonomy, get term with descendants)
+backed by ``current_flask_taxonomies.async_api``.
+
+Queries are the same as in the synchronous views, they are executed on the ``AsyncSession``,
+so a request waiting for the database does not block a worker thread. Serialization (which may lazy load
+relationships and query missing ancestors) runs in the session's greenlet via ``AsyncSession.run_sync``.
+
+``async_blueprint`` contains only the GET routes. Register it with the same url prefix before ``blueprint``,
+the GET requests are then served by the coroutines and everything else by the synchronous views::
+
+    app.register_blueprint(async_blueprint, url_prefix=app.config['FLASK_TAXONOMIES_URL_PREFIX'])
+    app.register_blueprint(blueprint, url_prefix=app.config['FLASK_TAXONOMIES_URL_PREFIX'])
+
+The request hooks of ``blueprint`` (statement timeouts and query budgets, server timing, read copies)
+are registered on ``async_blueprint`` as well and trees of terms go through the same admission control
+and coalescing of concurrent requests as in the synchronous views.
+"""
+import asyncio
+import functools
+
+import sqlalchemy
+from flask import Blueprint, Flask, Response, g, request
+from flask.globals import _app_ctx_stack, _request_ctx_stack
+from sqlalchemy.orm.exc import NoResultFound
+from webargs.flaskparser import use_kwargs
+from werkzeug.exceptions import HTTPException
+
+from flask_taxonomies.constants import (
+    INCLUDE_DELETED,
+    INCLUDE_DESCENDANTS,
+    INCLUDE_DESCENDANTS_COUNT,
+    INCLUDE_SELF,
+    INCLUDE_STATUS,
+)
+from flask_taxonomies.marshmallow import HeaderSchema, PaginatedQuerySchema
+from flask_taxonomies.models import EnvelopeLinks, TaxonomyTerm, TermStatusEnum
+from flask_taxonomies.proxies import current_flask_taxonomies
+from flask_taxonomies.term_identification import TermIdentification
+
+from .admission import admit, heavy_request
+from .common import (
+    build_descendants,
+    clear_read_copy,
+    coalescing_enabled,
+    encode_response,
+    enrich_data_with_computed,
+    json_abort,
+    request_globals,
+    request_key,
+    use_primary_for_writes,
+    with_prefer,
+)
+from .limits import (
+    QueryBudgetExceeded,
+    clear_request_limits,
+    query_budget_exceeded,
+    set_request_limits,
+    statement_timeout,
+)
+from .paginator import Paginator
+from .taxonomy_term import (
+    _abort_does_not_exist,
+    _term_not_found,
+    _term_with_redirect_query,
+)
+from .timing import (
+    LOOKUP,
+    PERMISSIONS,
+    clear_timing,
+    phase,
+    report_timing,
+    start_timing,
+)
+
+async_blueprint = Blueprint('flask_taxonomies_async', __name__)
+
+# the same request hooks as on blueprint
+async_blueprint.before_request(use_primary_for_writes)
+async_blueprint.before_request(set_request_limits)
+async_blueprint.before_request(start_timing)
+async_blueprint.after_request(report_timing)
+async_blueprint.teardown_request(clear_read_copy)
+async_blueprint.teardown_request(clear_request_limits)
+async_blueprint.teardown_request(clear_timing)
+async_blueprint.register_error_handler(QueryBudgetExceeded, query_budget_exceeded)
+async_blueprint.register_error_handler(sqlalchemy.exc.OperationalError, statement_timeout)
+
+
+def async_view(func):
+    """
+    Turns a coroutine view into a view usable in Flask. Flask with async support (``flask[async]``)
+    awaits the returned coroutine, older versions get a view that runs it in a new event loop.
+    The async session of the request is removed when the view is finished.
+    """
+
+    async def run(*args, **kwargs):
+        # statements of the async session run in greenlets without the request context
+        token = request_globals.set(g._get_current_object())
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            await current_flask_taxonomies.async_api.remove_session()
+            request_globals.reset(token)
+
+    if hasattr(Flask, 'ensure_sync'):
+        @functools.wraps(func)
+        async def wrapped(*args, **kwargs):
+            return await run(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapped(*args, **kwargs):
+            async def run_in_loop():
+                try:
+                    return await run(*args, **kwargs)
+                finally:
+                    # pooled connections are bound to the event loop that is about to be closed
+                    await current_flask_taxonomies.async_api.engine.dispose()
+
+            return asyncio.run(run_in_loop())
+
+    return wrapped
+
+
+def in_flask_context(func):
+    """
+    Makes the app and request context of the caller available to ``func`` running in another greenlet
+    (``AsyncSession.run_sync``) - werkzeug locals are bound to the greenlet if greenlet is installed.
+    """
+    app_ctx = _app_ctx_stack.top
+    request_ctx = _request_ctx_stack.top
+
+    @functools.wraps(func)
+    def wrapped(*args, **kwargs):
+        if _app_ctx_stack.top is app_ctx:
+            return func(*args, **kwargs)
+        _app_ctx_stack.push(app_ctx)
+        _request_ctx_stack.push(request_ctx)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _request_ctx_stack.pop()
+            _app_ctx_stack.pop()
+
+    return wrapped
+
+
+class AsyncPaginator(Paginator):
+    """
+    Paginator over a query executed on an ``AsyncSession``. ``load`` must be awaited before
+    the paginated data or headers are used.
+    """
+
+    async def load(self, async_api, session):
+        data = self.data
+        if isinstance(data, (list, tuple)):
+            if self.size:
+                self.count = len(data)
+            start, stop = self.bounds
+            rows = list(data[start:stop])
+        else:
+            if self.size:
+                self.count = await async_api.count(data, session=session)
+            start, stop = self.bounds
+            rows = await async_api.all(data.slice(start, stop), session=session)
+        self.__dict__['_data'] = await session.run_sync(
+            in_flask_context(lambda sync_session: self.convert(rows)))
+        return self
+
+
+async def async_admit(session, query, representation, page, size):
+    """``admission.admit`` counting the terms on the async session."""
+    return await session.run_sync(in_flask_context(
+        lambda sync_session: admit(query, representation, page, size)))
+
+
+async def async_coalesce_response(key, build_response):
+    """``common.coalesce_response`` for a coroutine function ``build_response``."""
+    if not coalescing_enabled():
+        return await build_response()
+
+    async def build():
+        try:
+            resp = await build_response()
+        except HTTPException as e:
+            resp = e.get_response()
+        return encode_response(resp)
+
+    data, status_code, headers = await current_flask_taxonomies.single_flight.do_async(key, build)
+    return Response(data, status=status_code, headers=headers)
+
+
+@async_blueprint.route('/')
+@async_view
+@use_kwargs(HeaderSchema, locations=("headers",))
+@use_kwargs(PaginatedQuerySchema, locations=("query",))
+@with_prefer
+async def list_taxonomies(prefer=None, page=None, size=None, q=None):
+    async_api = current_flask_taxonomies.async_api
+    session = async_api.session()
+    with phase(PERMISSIONS):
+        current_flask_taxonomies.permissions.taxonomy_list.enforce(request=request)
+    taxonomies = current_flask_taxonomies.list_taxonomies(
+        session=session.sync_session,
+        return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
+        return_descendants_busy_count=INCLUDE_STATUS in prefer)
+    if q:
+        taxonomies = current_flask_taxonomies.apply_taxonomy_query(taxonomies, q, session=session.sync_session)
+    paginator = AsyncPaginator(
+        prefer, taxonomies, page, size,
+        json_converter=lambda data: [x.json(representation=prefer) for x in data],
+        envelope_links=EnvelopeLinks(
+            envelope={'self': request.url},
+            headers={'self': request.url}
+        )
+    )
+    await paginator.load(async_api, session)
+    return paginator.jsonify()
+
+
+@async_blueprint.route('/<code>', strict_slashes=False)
+@async_view
+@use_kwargs(HeaderSchema, locations=("headers",))
+@use_kwargs(PaginatedQuerySchema, locations=("query",))
+@with_prefer
+async def get_taxonomy(code=None, prefer=None, page=None, size=None, q=None):
+    async_api = current_flask_taxonomies.async_api
+    session = async_api.session()
+    with phase(LOOKUP):
+        taxonomy = await async_api.get_taxonomy(
+            code, fail=False, session=session,
+            return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
+            return_descendants_busy_count=INCLUDE_STATUS in prefer)
+    if taxonomy is None:
+        json_abort(404, {})
+    taxonomy = enrich_data_with_computed(taxonomy)
+
+    with phase(PERMISSIONS):
+        current_flask_taxonomies.permissions.taxonomy_read.enforce(request=request, status_code=404)
+
+    prefer = taxonomy.merge_select(prefer)
+
+    if INCLUDE_DESCENDANTS in prefer:
+        return await async_coalesce_response(
+            request_key(prefer, code, page, size, q),
+            lambda: _get_taxonomy_response(session, taxonomy, code, prefer, page, size, q))
+    return await _get_taxonomy_response(session, taxonomy, code, prefer, page, size, q)
+
+
+async def _get_taxonomy_response(session, taxonomy, code, prefer, page, size, q):
+    async_api = current_flask_taxonomies.async_api
+    try:
+        if INCLUDE_SELF in prefer:
+            paginator = AsyncPaginator(
+                prefer, [taxonomy], page=0, size=0,
+                json_converter=lambda data: [x.json(prefer) for x in data],
+                envelope_links=lambda prefer, data, original_data: original_data[0].links(
+                    prefer) if original_data else EnvelopeLinks({}, {}),
+                single_result=True, allow_empty=False)
+            await paginator.load(async_api, session)
+
+            if INCLUDE_DESCENDANTS not in prefer:
+                return paginator.jsonify()
+        else:
+            paginator = None
+
+        if INCLUDE_DESCENDANTS in prefer:
+            if INCLUDE_DELETED in prefer:
+                status_cond = sqlalchemy.sql.true()
+            else:
+                status_cond = TaxonomyTerm.status == TermStatusEnum.alive
+
+            descendants = current_flask_taxonomies.list_taxonomy(
+                taxonomy,
+                levels=prefer.options.get('levels', None),
+                status_cond=status_cond,
+                session=session.sync_session,
+                return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
+                return_descendants_busy_count=INCLUDE_STATUS in prefer
+            )
+            if q:
+                descendants = current_flask_taxonomies.apply_term_query(descendants, q, code,
+                                                                        session=session.sync_session)
+
+            page, size, cost = await async_admit(session, descendants, prefer, page, size)
+
+            child_exclude = set(prefer.exclude)
+            child_exclude.discard(INCLUDE_SELF)
+            child_prefer = prefer.copy(exclude=child_exclude).extend(include=[INCLUDE_SELF])
+
+            with heavy_request(cost):
+                child_paginator = AsyncPaginator(
+                    child_prefer, descendants, page, size,
+                    json_converter=lambda data: build_descendants(data, prefer, root_slug=None,
+                                                                  session=session.sync_session)
+                )
+                await child_paginator.load(async_api, session)
+
+                if INCLUDE_SELF in prefer:
+                    paginator.set_children(child_paginator.paginated_data_without_envelope)
+                    # reset page, size, count from the child paginator
+                    paginator.page = page
+                    paginator.size = size
+                    paginator.count = child_paginator.count
+                else:
+                    paginator = child_paginator
+
+                return paginator.jsonify()
+
+        return paginator.jsonify()
+
+    except NoResultFound:
+        json_abort(404, {})
+
+
+@async_blueprint.route('/<code>/<path:slug>', strict_slashes=False)
+@async_view
+@use_kwargs(HeaderSchema, locations=("headers",))
+@use_kwargs(PaginatedQuerySchema, locations=("query",))
+@with_prefer
+async def get_taxonomy_term(code=None, slug=None, prefer=None, page=None, size=None, q=None):
+    async_api = current_flask_taxonomies.async_api
+    session = async_api.session()
+    try:
+        with phase(LOOKUP):
+            taxonomy = await async_api.get_taxonomy(code, session=session)
+        prefer = taxonomy.merge_select(prefer)
+
+        with phase(PERMISSIONS):
+            current_flask_taxonomies.permissions.taxonomy_term_read.enforce(request=request,
+                                                                            taxonomy=taxonomy,
+                                                                            slug=slug)
+
+        if (code, slug) in current_flask_taxonomies.negative_cache:
+            _abort_does_not_exist()
+    except NoResultFound:
+        return await _async_redirect_or_not_found(session, code, slug, prefer)
+
+    if INCLUDE_DESCENDANTS in prefer:
+        return await async_coalesce_response(
+            request_key(prefer, code, slug, page, size, q),
+            lambda: _get_taxonomy_term_response(session, code, slug, prefer, page, size, q))
+    return await _get_taxonomy_term_response(session, code, slug, prefer, page, size, q)
+
+
+async def _get_taxonomy_term_response(session, code, slug, prefer, page, size, q):
+    async_api = current_flask_taxonomies.async_api
+    try:
+        if INCLUDE_DELETED in prefer:
+            status_cond = sqlalchemy.sql.true()
+        else:
+            status_cond = TaxonomyTerm.status == TermStatusEnum.alive
+
+        return_descendants = INCLUDE_DESCENDANTS in prefer
+
+        if return_descendants:
+            query = current_flask_taxonomies.descendants_or_self(
+                TermIdentification(taxonomy=code, slug=slug),
+                levels=prefer.options.get('levels', None),
+                status_cond=status_cond,
+                session=session.sync_session,
+                return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
+                return_descendants_busy_count=INCLUDE_STATUS in prefer
+            )
+        elif q:
+            query = current_flask_taxonomies.filter_term(
+                TermIdentification(taxonomy=code, slug=slug),
+                status_cond=status_cond,
+                session=session.sync_session,
+                return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
+                return_descendants_busy_count=INCLUDE_STATUS in prefer
+            )
+        else:
+            res = await async_api.all(_term_with_redirect_query(
+                code, slug,
+                session=session.sync_session,
+                return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
+                return_descendants_busy_count=INCLUDE_STATUS in prefer
+            ), session=session)
+            res = res[0] if res else None
+            term = enrich_data_with_computed(res)
+            if term is None or (INCLUDE_DELETED not in prefer and term.status != TermStatusEnum.alive):
+                return await _async_term_not_found(session, code, slug, term, prefer)
+            query = [res]
+        if q:
+            query = current_flask_taxonomies.apply_term_query(query, q, code, session=session.sync_session)
+        cost = None
+        if return_descendants:
+            page, size, cost = await async_admit(session, query, prefer, page, size)
+        with heavy_request(cost):
+            paginator = AsyncPaginator(
+                prefer,
+                query, page if return_descendants else None,
+                size if return_descendants else None,
+                json_converter=lambda data:
+                build_descendants(data, prefer, root_slug=None, session=session.sync_session),
+                allow_empty=INCLUDE_SELF not in prefer, single_result=INCLUDE_SELF in prefer,
+                has_query=q is not None
+            )
+            await paginator.load(async_api, session)
+
+            return paginator.jsonify()
+
+    except NoResultFound:
+        return await _async_redirect_or_not_found(session, code, slug, prefer)
+
+
+async def _async_redirect_or_not_found(session, code, slug, prefer):
+    res = await current_flask_taxonomies.async_api.all(
+        _term_with_redirect_query(code, slug, session=session.sync_session), session=session)
+    return await _async_term_not_found(session, code, slug, res[0] if res else None, prefer)
+
+
+async def _async_term_not_found(session, code, slug, term, prefer):
+    return await session.run_sync(in_flask_context(
+        lambda sync_session: _term_not_found(code, slug, term, prefer, session=sync_session)))
@@ -0,0 +1,250 @@
+import jsonpatch
+import jsonpointer
+import sqlalchemy
+from flask import current_app, jsonify, request
+from slugify import slugify
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import NoResultFound
+from webargs.flaskparser import use_kwargs
+from werkzeug.exceptions import HTTPException
+
+from flask_taxonomies.constants import INCLUDE_DELETED, RETURN_NONE
+from flask_taxonomies.marshmallow import HeaderSchema, QuerySchema
+from flask_taxonomies.models import (
+    TaxonomyError,
+    TaxonomyTerm,
+    TaxonomyTermBusyError,
+    TermStatusEnum,
+)
+from flask_taxonomies.proxies import current_flask_taxonomies
+from flask_taxonomies.term_identification import TermIdentification
+
+from .common import blueprint, json_abort, with_prefer
+
+
+class BatchOperationError(Exception):
+    def __init__(self, status, reason, message=None):
+        super().__init__(message or reason)
+        self.status = status
+        self.reason = reason
+        self.message = message
+
+
+@blueprint.route('/_batch', methods=['POST'], strict_slashes=False)
+@blueprint.route('/<code>/_batch', methods=['POST'], strict_slashes=False)
+@use_kwargs(HeaderSchema, locations=("headers",))
+@use_kwargs(QuerySchema, locations=("query",))
+@with_prefer
+def batch_taxonomy_terms(code=None, prefer=None, q=None):
+    """
+    Executes a list of term operations in one transaction.
+
+    The payload is either a list of operations or ``{"operations": [...], "atomic": bool}``.
+    Each operation is a dict with ``op`` (one of create, update, patch, delete, move),
+    ``term`` (term url, or slug when called on /<code>/_batch) and the operation
+    arguments (``data`` for create and update, ``patch`` for patch,
+    ``destination`` or ``rename`` for move).
+
+    In the atomic mode (default) the first failed operation rolls back the whole batch,
+    otherwise each operation runs in its own savepoint and failed operations are skipped.
+    All successful operations are committed at once.
+    """
+    if q:
+        json_abort(422, {
+            'message': 'Query not appropriate when modifying terms',
+            'reason': 'search-query-not-allowed'
+        })
+    payload, atomic = _batch_payload()
+
+    session = current_flask_taxonomies.session
+    # the whole batch runs in a savepoint that is rolled back on failure - pysqlite does not
+    # emit BEGIN before SAVEPOINT, so session.rollback() would not undo already released savepoints
+    batch_transaction = session.begin_nested()
+    results = []
+    failed = False
+    for operation in payload:
+        if failed:
+            results.append(_result(operation, 424, reason='not-executed'))
+            continue
+        try:
+            if atomic:
+                results.append(_execute(operation, code, prefer))
+            else:
+                with session.begin_nested():
+                    results.append(_execute(operation, code, prefer))
+        except BatchOperationError as e:
+            results.append(_result(operation, e.status, reason=e.reason, message=e.message))
+            failed = atomic
+
+    if failed:
+        batch_transaction.rollback()
+        results = [
+            _result(res, 424, reason='rolled-back') if res['status'] < 300 else res
+            for res in results
+        ]
+        resp = jsonify(results)
+        resp.status_code = 409
+        return resp
+
+    batch_transaction.commit()
+    current_flask_taxonomies.commit()
+    return jsonify(results)
+
+
+def _batch_payload():
+    payload = request.json
+    atomic = True
+    if isinstance(payload, dict):
+        atomic = payload.get('atomic', True)
+        payload = payload.get('operations')
+    if not isinstance(payload, list) or not all(isinstance(x, dict) for x in payload):
+        json_abort(400, {
+            'message': 'Expected a list of operations',
+            'reason': 'invalid-payload'
+        })
+    if len(payload) > current_app.config['FLASK_TAXONOMIES_BATCH_MAX_OPERATIONS']:
+        json_abort(400, {
+            'message': 'Too many operations, at most FLASK_TAXONOMIES_BATCH_MAX_OPERATIONS are allowed',
+            'reason': 'too-many-operations'
+        })
+    return payload, atomic
+
+
+def _result(operation, status, **kwargs):
+    ret = {
+        'op': operation.get('op'),
+        'term': operation.get('term'),
+        'status': status
+    }
+    ret.update({k: v for k, v in kwargs.items() if v is not None})
+    return ret
+
+
+def _execute(operation, code, prefer):
+    try:
+        term, status = _dispatch(operation, code, prefer)
+    except HTTPException as e:
+        # permission denied
+        raise BatchOperationError(e.code, 'forbidden' if e.code == 403 else 'http-error')
+    except NoResultFound:
+        raise BatchOperationError(404, 'does-not-exist', 'Term does not exist')
+    except TaxonomyTermBusyError as e:
+        raise BatchOperationError(412, 'term-busy', str(e))
+    except TaxonomyError as e:
+        raise BatchOperationError(400, 'invalid-operation', str(e))
+    except IntegrityError:
+        raise BatchOperationError(409, 'term-exists', 'Term already exists')
+    except (jsonpatch.JsonPatchException, jsonpointer.JsonPointerException) as e:
+        raise BatchOperationError(400, 'invalid-patch', str(e))
+
+    if prefer.representation == RETURN_NONE:
+        return _result(operation, status, location=current_flask_taxonomies.taxonomy_term_url(term))
+    # serialize right away, later operations might expire the term
+    return _result(operation, status, data=term.json(representation=prefer))
+
+
+def _dispatch(operation, code, prefer):
+    op = operation.get('op')
+    handler = OPERATIONS.get(op)
+    if not handler:
+        raise BatchOperationError(400, 'unknown-operation', 'Unknown operation %s' % op)
+    ref = operation.get('term')
+    if not isinstance(ref, str):
+        raise BatchOperationError(400, 'invalid-reference', 'Missing term reference')
+    tax_code, slug = current_flask_taxonomies.parse_term_url(ref, taxonomy_code=code)
+    taxonomy = current_flask_taxonomies.get_taxonomy(tax_code, fail=False)
+    if not taxonomy:
+        raise BatchOperationError(404, 'does-not-exist', 'Taxonomy %s does not exist' % tax_code)
+    return handler(taxonomy, slug, operation, taxonomy.merge_select(prefer))
+
+
+def _status_cond(prefer):
+    if INCLUDE_DELETED in prefer:
+        return sqlalchemy.sql.true()
+    return TaxonomyTerm.status == TermStatusEnum.alive
+
+
+def _data(operation, key, expected_type):
+    value = operation.get(key)
+    if not isinstance(value, expected_type):
+        raise BatchOperationError(400, 'invalid-operation', 'Operation needs `%s`' % key)
+    return value
+
+
+def _create(taxonomy, slug, operation, prefer):
+    extra_data = _data(operation, 'data', dict)
+    slug = '/'.join(slugify(x) for x in slug.split('/'))
+    current_flask_taxonomies.permissions.taxonomy_term_create.enforce(request=request,
+                                                                      taxonomy=taxonomy,
+                                                                      slug=slug)
+    ti = TermIdentification(taxonomy=taxonomy, slug=slug)
+    if current_flask_taxonomies.filter_term(ti, status_cond=sqlalchemy.sql.true()).count():
+        raise BatchOperationError(409, 'term-exists', 'Term %s/%s already exists' % (taxonomy.code, slug))
+    return current_flask_taxonomies.create_term(ti, extra_data=extra_data), 201
+
+
+def _update(taxonomy, slug, operation, prefer):
+    extra_data = _data(operation, 'data', dict)
+    term = current_flask_taxonomies.filter_term(TermIdentification(taxonomy=taxonomy, slug=slug),
+                                                status_cond=_status_cond(prefer)).one()
+    current_flask_taxonomies.permissions.taxonomy_term_update.enforce(request=request,
+                                                                      taxonomy=taxonomy, term=term)
+    return current_flask_taxonomies.update_term(term, reload=False, extra_data=extra_data), 200
+
+
+def _patch(taxonomy, slug, operation, prefer):
+    patch = _data(operation, 'patch', list)
+    term = current_flask_taxonomies.filter_term(TermIdentification(taxonomy=taxonomy, slug=slug),
+                                                status_cond=_status_cond(prefer)).one()
+    current_flask_taxonomies.permissions.taxonomy_term_update.enforce(request=request,
+                                                                      taxonomy=taxonomy, term=term)
+    return current_flask_taxonomies.update_term(term, reload=False, extra_data=patch, patch=True,
+                                                status=TermStatusEnum.alive), 200
+
+
+def _delete(taxonomy, slug, operation, prefer):
+    ti = TermIdentification(taxonomy=taxonomy, slug=slug)
+    term = current_flask_taxonomies.filter_term(ti).one()
+    current_flask_taxonomies.permissions.taxonomy_term_delete.enforce(request=request,
+                                                                      taxonomy=taxonomy, term=term)
+    return current_flask_taxonomies.delete_term(ti, remove_after_delete=False), 200
+
+
+def _move(taxonomy, slug, operation, prefer):
+    destination = operation.get('destination')
+    rename = operation.get('rename')
+    ti = TermIdentification(taxonomy=taxonomy, slug=slug)
+    term = current_flask_taxonomies.filter_term(ti).one()
+    current_flask_taxonomies.permissions.taxonomy_term_move.enforce(
+        request=request, taxonomy=taxonomy, term=term,
+        destination=destination or '', rename=rename or '')
+
+    if isinstance(destination, str):
+        if destination.strip('/'):
+            dest_code, dest_slug = current_flask_taxonomies.parse_term_url(destination,
+                                                                           taxonomy_code=taxonomy.code)
+            new_parent = TermIdentification(taxonomy=dest_code, slug=dest_slug)
+        else:
+            new_parent = ''
+        old_term, new_term = current_flask_taxonomies.move_term(ti, new_parent=new_parent,
+                                                                remove_after_delete=False)
+    elif isinstance(rename, str) and rename:
+        new_slug = slug.rstrip('/')
+        if '/' in new_slug:
+            new_slug = new_slug.rsplit('/', maxsplit=1)[0] + '/' + rename
+        else:
+            new_slug = rename
+        old_term, new_term = current_flask_taxonomies.rename_term(ti, new_slug=new_slug,
+                                                                  remove_after_delete=False)
+    else:
+        raise BatchOperationError(400, 'invalid-operation', 'Pass either `destination` or `rename`')
+    return new_term, 200
+
+
+OPERATIONS = {
+    'create': _create,
+    'update': _update,
+    'patch': _patch,
+    'delete': _delete,
+    'move': _move,
+}
@@ -0,0 +1,93 @@
+from flask import Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy.orm.exc import NoResultFound
+from webargs.flaskparser import use_kwargs
+
+from flask_taxonomies.exporter import (
+    changed_slugs,
+    encode_changes,
+    iter_changed_terms,
+    resolve_since,
+)
+from flask_taxonomies.marshmallow import ChangesQuerySchema, DeltaQuerySchema
+from flask_taxonomies.models import TaxonomyError
+from flask_taxonomies.proxies import current_flask_taxonomies
+
+from .common import blueprint, json_abort
+
+
+@blueprint.route('/_changes', strict_slashes=False)
+@blueprint.route('/<code>/_changes', strict_slashes=False)
+@use_kwargs(ChangesQuerySchema, locations=("query",))
+def list_changes(code=None, since=0, limit=None):
+    """
+    Returns term changes with seq greater than ``since`` from the change log, oldest first.
+    ``next`` in the response is the seq to pass as ``since`` to get the following changes.
+    Without a code, only changes of the taxonomies the caller is allowed to read are returned.
+    """
+    if code:
+        try:
+            taxonomy = current_flask_taxonomies.get_taxonomy(code)
+        except NoResultFound:
+            json_abort(404, {})
+            return  # make pycharm happy
+        current_flask_taxonomies.permissions.taxonomy_read.enforce(request=request, taxonomy=taxonomy)
+    else:
+        current_flask_taxonomies.permissions.taxonomy_list.enforce(request=request)
+        taxonomy = _readable_taxonomies()
+
+    max_limit = current_app.config['FLASK_TAXONOMIES_CHANGES_MAX_LIMIT']
+    limit = min(limit or max_limit, max_limit)
+    # one more row tells if there are more changes
+    changes = list(current_flask_taxonomies.list_changes(since, taxonomy=taxonomy, limit=limit + 1))
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    return jsonify({
+        'changes': [x.json() for x in changes],
+        'next': changes[-1].seq if changes else since,
+        'has_more': has_more
+    })
+
+
+def _readable_taxonomies():
+    """
+    None if the caller can read all taxonomies, otherwise codes of the readable ones
+    (changes of removed taxonomies are then not returned either)
+    """
+    taxonomies = current_flask_taxonomies.list_taxonomies().all()
+    read = current_flask_taxonomies.permissions.taxonomy_read
+    codes = [t.code for t in taxonomies if read.allows(request=request, taxonomy=t)]
+    if len(codes) == len(taxonomies):
+        return None
+    return codes
+
+
+@blueprint.route('/<code>/_delta', strict_slashes=False)
+@use_kwargs(DeltaQuerySchema, locations=("query",))
+def export_taxonomy_changes(code=None, since=None, format='json'):
+    """
+    Streams the current state of terms created, changed, moved or deleted after ``since``
+    (a change log seq or an ISO 8601 timestamp), see ``exporter.export_changes``.
+    The seq to use as ``since`` of the next delta is returned in the ``X-Changes-Until`` header.
+    """
+    try:
+        taxonomy = current_flask_taxonomies.get_taxonomy(code)
+    except NoResultFound:
+        json_abort(404, {})
+        return  # make pycharm happy
+    current_flask_taxonomies.permissions.taxonomy_read.enforce(request=request, taxonomy=taxonomy)
+
+    try:
+        since = resolve_since(since, current_flask_taxonomies.session)
+        slugs, until = changed_slugs(current_flask_taxonomies, taxonomy, since)
+    except TaxonomyError as e:
+        json_abort(400, {
+            'message': str(e),
+            'reason': 'invalid-since'
+        })
+        return  # make pycharm happy
+    terms = iter_changed_terms(current_flask_taxonomies, taxonomy, slugs)
+    return Response(
+        stream_with_context(encode_changes(terms, since, until, format=format)),
+        mimetype='application/x-ndjson' if format == 'ndjson' else 'application/json',
+        headers={'X-Changes-Until': str(until)}
+    )
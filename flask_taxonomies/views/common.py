@@ -1,8 +1,18 @@
+import contextvars
 import functools
 import json
 
 import sqlalchemy
-from flask import Blueprint, Response, abort
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    g,
+    has_request_context,
+    request,
+)
+from werkzeug.exceptions import HTTPException
 
 from flask_taxonomies.constants import (
     INCLUDE_ANCESTOR_LIST,
@@ -18,6 +28,38 @@ from flask_taxonomies.term_identification import TermIdentification
 
 blueprint = Blueprint('flask_taxonomies', __name__)
 
+# POST endpoints that only read
+READ_ONLY_ENDPOINTS = {'flask_taxonomies.mget_taxonomy_terms'}
+
+# ``g`` of the request served by a coroutine view, for code running in greenlets
+# that do not see the request context (statements executed by an AsyncSession), see async_views.async_view
+request_globals = contextvars.ContextVar('flask_taxonomies_request_globals', default=None)
+
+
+def request_global(name):
+    """Returns ``g.<name>`` of the current request, None outside of requests."""
+    if has_request_context():
+        return g.get(name)
+    request_g = request_globals.get()
+    if request_g is None:
+        return None
+    return request_g.get(name)
+
+
+@blueprint.before_request
+def use_primary_for_writes():
+    # only reads are served by a read-only snapshot or replica,
+    # writes and the reads of written data must go to the primary database
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and request.endpoint not in READ_ONLY_ENDPOINTS:
+        current_flask_taxonomies.use_primary()
+    else:
+        current_flask_taxonomies.use_read_copy()
+
+
+@blueprint.teardown_request
+def clear_read_copy(exc):
+    g.pop('flask_taxonomies_read_copy', None)
+
 
 def enrich_data_with_computed(res):
     if not hasattr(res, '_asdict'):
@@ -48,21 +90,62 @@ def with_prefer(func):
     return wrapped
 
 
-def build_ancestors(term, tops, stack, representation, root_slug, transformers=None):
-    if INCLUDE_DELETED in representation:
-        status_cond = sqlalchemy.sql.true()
-    else:
-        status_cond = TaxonomyTerm.status == TermStatusEnum.alive
-
-    ancestors = current_flask_taxonomies.ancestors(
-        TermIdentification(term=term), status_cond=status_cond,
-        return_descendants_count=INCLUDE_DESCENDANTS_COUNT in representation,
-        return_descendants_busy_count=INCLUDE_STATUS in representation
+def request_key(prefer, *args):
+    """
+    Key of a read request for ``coalesce_response``: the endpoint, the effective representation
+    and ``args`` - the parameters of the view that select the returned data.
+    """
+    return (
+        request.endpoint,
+        request.host,
+        bool(g.get('flask_taxonomies_primary')),
+        prefer.representation,
+        tuple(sorted(x for x in prefer.include if x not in prefer.exclude)),
+        tuple(sorted(prefer.select)) if prefer.select is not None else None,
+        tuple(sorted(prefer.options.items())),
+        *args
     )
-    if root_slug is not None:
-        ancestors = ancestors.filter(TaxonomyTerm.slug > root_slug)
-    ancestors = ancestors.order_by(TaxonomyTerm.slug)
-    ancestors = [enrich_data_with_computed(anc) for anc in ancestors]
+
+
+def coalesce_response(key, build_response):
+    """
+    Returns the response of ``build_response``. With FLASK_TAXONOMIES_COALESCE_READS, concurrent
+    requests with the same key (see ``request_key``) wait for the first of them and get a copy
+    of its encoded response instead of building it again.
+    """
+    if not coalescing_enabled():
+        return build_response()
+
+    def build():
+        try:
+            resp = build_response()
+        except HTTPException as e:
+            # error responses (404, 410, ...) are shared as well, the waiters do not look the term up again
+            resp = e.get_response()
+        return encode_response(resp)
+
+    data, status_code, headers = current_flask_taxonomies.single_flight.do(key, build)
+    return Response(data, status=status_code, headers=headers)
+
+
+def coalescing_enabled():
+    return request.method == 'GET' and current_app.config.get('FLASK_TAXONOMIES_COALESCE_READS')
+
+
+def encode_response(resp):
+    return resp.get_data(), resp.status_code, list(resp.headers)
+
+
+def build_ancestors(term, tops, stack, representation, root_slug, transformers=None, session=None,
+                    load_ancestors=None):
+    """
+    :param load_ancestors: callable returning the ancestors of a term ordered by slug,
+                           used instead of querying them (for example when they are already loaded)
+    """
+    if load_ancestors:
+        ancestors = load_ancestors(term)
+    else:
+        ancestors = _query_ancestors(term, representation, root_slug, session)
     if INCLUDE_ANCESTORS in representation and INCLUDE_ANCESTORS_HIERARCHY not in representation:
         ret = []
         for anc in ancestors:
@@ -83,10 +166,30 @@ def build_ancestors(term, tops, stack, representation, root_slug, transformers=N
             return json
 
         transformers = [*transformers, transformer]
-        build_descendants(ancestors, representation, root_slug, stack=stack, tops=tops, transformers=transformers)
+        build_descendants(ancestors, representation, root_slug, stack=stack, tops=tops, transformers=transformers,
+                          session=session)
+
+
+def _query_ancestors(term, representation, root_slug, session):
+    if INCLUDE_DELETED in representation:
+        status_cond = sqlalchemy.sql.true()
+    else:
+        status_cond = TaxonomyTerm.status == TermStatusEnum.alive
+
+    ancestors = current_flask_taxonomies.ancestors(
+        TermIdentification(term=term), status_cond=status_cond,
+        return_descendants_count=INCLUDE_DESCENDANTS_COUNT in representation,
+        return_descendants_busy_count=INCLUDE_STATUS in representation,
+        session=session
+    )
+    if root_slug is not None:
+        ancestors = ancestors.filter(TaxonomyTerm.slug > root_slug)
+    ancestors = ancestors.order_by(TaxonomyTerm.slug)
+    return [enrich_data_with_computed(anc) for anc in ancestors]
 
 
-def build_descendants(descendants, representation, root_slug, stack=None, tops=None, transformers=None):
+def build_descendants(descendants, representation, root_slug, stack=None, tops=None, transformers=None,
+                      session=None, load_ancestors=None):
     if stack is None:
         stack = []
     if tops is None:
@@ -100,11 +203,14 @@ def build_descendants(descendants, representation, root_slug, stack=None, tops=N
         if not stack and desc.parent_slug != root_slug:
             # ancestors are missing, serialize them before this element
             if INCLUDE_ANCESTORS_HIERARCHY in representation:
-                build_ancestors(desc, tops, stack, representation, root_slug, transformers)
+                build_ancestors(desc, tops, stack, representation, root_slug, transformers, session,
+                                load_ancestors)
             elif INCLUDE_ANCESTOR_LIST in representation:
-                ancestor_list = build_ancestors(desc, tops, stack, representation, root_slug, transformers)
+                ancestor_list = build_ancestors(desc, tops, stack, representation, root_slug, transformers, session,
+                                                load_ancestors)
             elif INCLUDE_ANCESTORS in representation:
-                ancestors = build_ancestors(desc, tops, stack, representation, root_slug, transformers)
+                ancestors = build_ancestors(desc, tops, stack, representation, root_slug, transformers, session,
+                                            load_ancestors)
 
         desc_repr = desc.json(representation)
         if ancestors and 'ancestors' not in desc_repr:
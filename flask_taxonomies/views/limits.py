@@ -0,0 +1,144 @@
+"""
+Per-request limits of SQL statements issued by the taxonomy endpoints.
+
+* statement timeout (FLASK_TAXONOMIES_STATEMENT_TIMEOUT, FLASK_TAXONOMIES_ENDPOINT_STATEMENT_TIMEOUTS) -
+  ``SET LOCAL statement_timeout`` on PostgreSQL, a progress handler interrupting the statement on SQLite
+* query budget (FLASK_TAXONOMIES_QUERY_BUDGET, FLASK_TAXONOMIES_ENDPOINT_QUERY_BUDGETS) - max number
+  of statements executed by a single request
+
+A request over a limit is aborted with 503, so that a pathological request fails fast and releases
+its database connection. The limits apply to statements executed in the request's thread (greenlet).
+"""
+import json
+import time
+
+import sqlalchemy
+from flask import Response, current_app, g, request
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+from flask_taxonomies.models import TaxonomyError
+
+from .common import blueprint, request_global
+
+# number of SQLite virtual machine instructions between checks of the statement timeout
+SQLITE_PROGRESS_STEPS = 1000
+
+POSTGRESQL_QUERY_CANCELED = '57014'
+
+
+class QueryBudgetExceeded(TaxonomyError):
+    pass
+
+
+class RequestLimits:
+    """
+    :param statement_timeout: timeout of a single statement in milliseconds, None for no timeout
+    :param query_budget: max number of statements, None for no limit
+    """
+
+    def __init__(self, statement_timeout=None, query_budget=None):
+        self.statement_timeout = statement_timeout
+        self.query_budget = query_budget
+        self.statements = 0
+        self.interrupted = False
+
+    def statement_executed(self):
+        self.statements += 1
+        if self.query_budget is not None and self.statements > self.query_budget:
+            raise QueryBudgetExceeded('Request needs more than %s SQL statements' % self.query_budget)
+
+
+def endpoint_limit(config_key, endpoint_config_key):
+    """Returns the limit for the current endpoint, configured by its view name or globally."""
+    endpoint_limits = current_app.config.get(endpoint_config_key) or {}
+    view = (request.endpoint or '').rsplit('.', 1)[-1]
+    if view in endpoint_limits:
+        return endpoint_limits[view]
+    return current_app.config.get(config_key)
+
+
+def current_limits():
+    return request_global('flask_taxonomies_limits')
+
+
+@blueprint.before_request
+def set_request_limits():
+    statement_timeout = endpoint_limit('FLASK_TAXONOMIES_STATEMENT_TIMEOUT',
+                                       'FLASK_TAXONOMIES_ENDPOINT_STATEMENT_TIMEOUTS')
+    query_budget = endpoint_limit('FLASK_TAXONOMIES_QUERY_BUDGET', 'FLASK_TAXONOMIES_ENDPOINT_QUERY_BUDGETS')
+    if statement_timeout is not None or query_budget is not None:
+        g.flask_taxonomies_limits = RequestLimits(statement_timeout, query_budget)
+
+
+@blueprint.teardown_request
+def clear_request_limits(exc):
+    g.pop('flask_taxonomies_limits', None)
+
+
+@sqlalchemy.event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    limits = current_limits()
+    if limits is None:
+        return
+    limits.statement_executed()
+    if limits.statement_timeout is None:
+        return
+    dialect = conn.dialect.name
+    if dialect == 'postgresql':
+        # the setting lasts until the end of the transaction, set it once per transaction
+        transaction = conn.get_transaction()
+        if transaction is None or conn.info.get('flask_taxonomies_timeout') != (transaction, limits.statement_timeout):
+            cursor.execute('SET LOCAL statement_timeout = %d' % limits.statement_timeout)
+            conn.info['flask_taxonomies_timeout'] = (transaction, limits.statement_timeout)
+    elif dialect == 'sqlite':
+        dbapi_connection = conn.connection.dbapi_connection
+        if not hasattr(dbapi_connection, 'set_progress_handler'):
+            return  # asyncio driver
+        deadline = time.monotonic() + limits.statement_timeout / 1000
+
+        def progress_handler():
+            if time.monotonic() > deadline:
+                limits.interrupted = True
+                return 1
+            return 0
+
+        dbapi_connection.set_progress_handler(progress_handler, SQLITE_PROGRESS_STEPS)
+
+
+@sqlalchemy.event.listens_for(Pool, 'checkin')
+def remove_progress_handler(dbapi_connection, connection_record):
+    connection_record.info.pop('flask_taxonomies_timeout', None)
+    if dbapi_connection is not None and hasattr(dbapi_connection, 'set_progress_handler'):
+        dbapi_connection.set_progress_handler(None, SQLITE_PROGRESS_STEPS)
+
+
+def is_statement_timeout(exc):
+    limits = current_limits()
+    if limits is None or limits.statement_timeout is None:
+        return False
+    return limits.interrupted or getattr(exc.orig, 'pgcode', None) == POSTGRESQL_QUERY_CANCELED
+
+
+@blueprint.errorhandler(QueryBudgetExceeded)
+def query_budget_exceeded(exc):
+    return _service_unavailable({
+        'message': str(exc),
+        'reason': 'query-budget-exceeded'
+    })
+
+
+@blueprint.errorhandler(sqlalchemy.exc.OperationalError)
+def statement_timeout(exc):
+    if not is_statement_timeout(exc):
+        raise exc
+    return _service_unavailable({
+        'message': 'SQL statement took more than %s ms' % current_limits().statement_timeout,
+        'reason': 'statement-timeout'
+    })
+
+
+def _service_unavailable(detail):
+    return Response(json.dumps(detail, indent=4, ensure_ascii=False),
+                    status=503,
+                    mimetype='application/json; charset=utf-8')
@@ -0,0 +1,181 @@
+from collections import defaultdict
+
+import sqlalchemy
+from flask import current_app, jsonify, request
+from webargs.flaskparser import use_kwargs
+from werkzeug.exceptions import HTTPException
+
+from flask_taxonomies.constants import (
+    INCLUDE_ANCESTOR_LIST,
+    INCLUDE_ANCESTORS,
+    INCLUDE_ANCESTORS_HIERARCHY,
+    INCLUDE_DELETED,
+    INCLUDE_DESCENDANTS_COUNT,
+    INCLUDE_STATUS,
+)
+from flask_taxonomies.marshmallow import HeaderSchema, QuerySchema
+from flask_taxonomies.models import TaxonomyError, TaxonomyTerm, TermStatusEnum
+from flask_taxonomies.proxies import current_flask_taxonomies
+
+from .common import (
+    blueprint,
+    build_descendants,
+    enrich_data_with_computed,
+    json_abort,
+    with_prefer,
+)
+
+
+@blueprint.route('/_mget', methods=['POST'], strict_slashes=False)
+@blueprint.route('/<code>/_mget', methods=['POST'], strict_slashes=False)
+@use_kwargs(HeaderSchema, locations=("headers",))
+@use_kwargs(QuerySchema, locations=("query",))
+@with_prefer
+def mget_taxonomy_terms(code=None, prefer=None, q=None):
+    """
+    Returns representations of many terms at once.
+
+    The payload is a list of term urls (or slugs when called on /<code>/_mget).
+    The response contains an entry for each of them, in the same order,
+    with the http status the term would have been returned with by GET
+    and either the term representation or links to the alive term that obsoletes it.
+    """
+    if q:
+        json_abort(422, {
+            'message': 'Query not appropriate when retrieving multiple terms',
+            'reason': 'search-query-not-allowed'
+        })
+    refs = _mget_refs()
+
+    results = [None] * len(refs)
+    requested = _mget_requested(code, refs, results)
+
+    for tax_code, slugs in requested.items():
+        for slug, entries in _mget_taxonomy(tax_code, slugs, prefer).items():
+            for idx in slugs[slug]:
+                results[idx] = {'ref': refs[idx], **entries}
+
+    return jsonify(results)
+
+
+def _mget_refs():
+    refs = request.json
+    if isinstance(refs, dict):
+        refs = refs.get('terms')
+    if not isinstance(refs, list) or not all(isinstance(x, str) for x in refs):
+        json_abort(400, {
+            'message': 'Expected a list of term urls or slugs',
+            'reason': 'invalid-payload'
+        })
+    if len(refs) > current_app.config['FLASK_TAXONOMIES_MAX_RESULTS_RETURNED']:
+        json_abort(400, {
+            'message': 'Too many terms requested, at most FLASK_TAXONOMIES_MAX_RESULTS_RETURNED are allowed',
+            'reason': 'too-many-terms'
+        })
+    return refs
+
+
+def _mget_requested(code, refs, results):
+    """Groups the refs by taxonomy code and slug, invalid refs are reported directly into results."""
+    requested = defaultdict(lambda: defaultdict(list))  # taxonomy code -> slug -> indices into results
+    for idx, ref in enumerate(refs):
+        try:
+            tax_code, slug = current_flask_taxonomies.parse_term_url(ref, taxonomy_code=code)
+            requested[tax_code][slug].append(idx)
+        except TaxonomyError as e:
+            results[idx] = {
+                'ref': ref,
+                'status': 400,
+                'message': str(e),
+                'reason': 'invalid-reference'
+            }
+    return requested
+
+
+def _mget_taxonomy(code, slugs, prefer):
+    taxonomy = current_flask_taxonomies.get_taxonomy(code, fail=False)
+    if not taxonomy:
+        return {slug: {'status': 404, 'reason': 'does-not-exist'} for slug in slugs}
+    prefer = taxonomy.merge_select(prefer)
+
+    ret = {}
+    allowed = []
+    for slug in slugs:
+        try:
+            current_flask_taxonomies.permissions.taxonomy_term_read.enforce(request=request,
+                                                                            taxonomy=taxonomy,
+                                                                            slug=slug)
+            allowed.append(slug)
+        except HTTPException as e:
+            ret[slug] = {'status': e.code}
+
+    terms = current_flask_taxonomies.filter_terms(
+        taxonomy, allowed,
+        status_cond=sqlalchemy.sql.true(),
+        return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
+        return_descendants_busy_count=INCLUDE_STATUS in prefer
+    )
+    terms = {term.slug: term for term in (enrich_data_with_computed(x) for x in terms)}
+    final_terms = current_flask_taxonomies.resolve_obsoleted(
+        set(term.obsoleted_by_id for term in terms.values()
+            if term.obsoleted_by_id and term.status != TermStatusEnum.alive))
+
+    returned = [
+        term for term in terms.values()
+        if term.status == TermStatusEnum.alive or INCLUDE_DELETED in prefer
+    ]
+    ancestors = _mget_ancestors(taxonomy, returned, prefer)
+
+    for slug in allowed:
+        term = terms.get(slug)
+        if term is None:
+            ret[slug] = {'status': 404, 'reason': 'does-not-exist'}
+        elif term.status == TermStatusEnum.alive or INCLUDE_DELETED in prefer:
+            ret[slug] = {'status': 200, 'data': _mget_term_data(term, ancestors, prefer)}
+        elif term.obsoleted_by_id in final_terms:
+            ret[slug] = {
+                'status': 301,
+                'links': {
+                    'self': current_flask_taxonomies.taxonomy_term_url(term),
+                    'obsoleted_by': current_flask_taxonomies.taxonomy_term_url(final_terms[term.obsoleted_by_id])
+                }
+            }
+        else:
+            ret[slug] = {'status': 410, 'reason': 'deleted'}
+    return ret
+
+
+def _mget_term_data(term, ancestors, prefer):
+    """The term in the same shape as returned by GET, with the ancestors taken from the preloaded ones."""
+    data = build_descendants(
+        [term], prefer, root_slug=None,
+        load_ancestors=lambda t: [ancestors[x] for x in _ancestor_slugs(t.slug) if x in ancestors])
+    if INCLUDE_ANCESTOR_LIST not in prefer and len(data) == 1:
+        return data[0]
+    return data
+
+
+def _ancestor_slugs(slug):
+    parts = slug.split('/')
+    return ['/'.join(parts[:i]) for i in range(1, len(parts))]
+
+
+def _mget_ancestors(taxonomy, terms, prefer):
+    """Loads ancestors of all the terms with one query, returns dict slug -> ancestor."""
+    if not any(x in prefer for x in (INCLUDE_ANCESTORS, INCLUDE_ANCESTOR_LIST, INCLUDE_ANCESTORS_HIERARCHY)):
+        return {}
+    slugs = set()
+    for term in terms:
+        slugs.update(_ancestor_slugs(term.slug))
+    if not slugs:
+        return {}
+    if INCLUDE_DELETED in prefer:
+        status_cond = sqlalchemy.sql.true()
+    else:
+        status_cond = TaxonomyTerm.status == TermStatusEnum.alive
+    ancestors = current_flask_taxonomies.filter_terms(
+        taxonomy, slugs, status_cond=status_cond,
+        return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
+        return_descendants_busy_count=INCLUDE_STATUS in prefer
+    )
+    return {anc.slug: anc for anc in (enrich_data_with_computed(x) for x in ancestors)}
@@ -13,6 +13,7 @@ from flask_taxonomies.constants import (
 from flask_taxonomies.models import EnvelopeLinks
 
 from .common import enrich_data_with_computed
+from .timing import BUILD, COUNT, ENCODE, QUERY, phase
 
 
 class Paginator:
@@ -33,32 +34,42 @@ class Paginator:
 
     @cached_property
     def _data(self):
-        if not self.has_query:
-            self_offset = 0 if INCLUDE_SELF in self.representation else 1
-        else:
-            self_offset = 0
         if self.size:
             data = self.data
             if isinstance(data, (list, tuple)):
                 self.count = len(data)
             else:
-                self.count = self.data.count()
+                with phase(COUNT):
+                    self.count = self.data.count()
+        start, stop = self.bounds
+        with phase(QUERY):
+            data = list(self.data[start:stop])
+        return self.convert(data)
 
+    @property
+    def bounds(self):
+        """Start and stop index of the returned part of the data (``self.count`` must be already set)"""
+        if not self.has_query:
+            self_offset = 0 if INCLUDE_SELF in self.representation else 1
+        else:
+            self_offset = 0
+        if self.size:
             if self.page > 1 and INCLUDE_ANCESTORS_HIERARCHY in self.representation:
                 # second page should have one element less
                 size_offset = 1 if self.size > 1 else 0
                 # -size_offset is to remove the parent that will get added automatically
-                data = list(data[self_offset + (self.page - 1) * self.size:
-                                 self_offset + self.page * self.size - size_offset])
-            else:
-                data = list(data[self_offset + (self.page - 1) * self.size: self_offset + self.page * self.size])
-        else:
-            max_items = current_app.config['FLASK_TAXONOMIES_MAX_RESULTS_RETURNED']
-            data = list(self.data[self_offset:max_items])
+                return (self_offset + (self.page - 1) * self.size,
+                        self_offset + self.page * self.size - size_offset)
+            return self_offset + (self.page - 1) * self.size, self_offset + self.page * self.size
+        return self_offset, current_app.config['FLASK_TAXONOMIES_MAX_RESULTS_RETURNED']
+
+    def convert(self, data):
+        """Converts the returned part of the data to json, returns a tuple (json, original data)"""
         data = [enrich_data_with_computed(x) for x in data]
         if not self.allow_empty and not data:
             raise NoResultFound()
-        return self.json_converter(data), data
+        with phase(BUILD):
+            return self.json_converter(data), data
 
     def set_children(self, children):
         self._data[0][0]['children'] = children
@@ -129,7 +140,9 @@ class Paginator:
         return not self.size
 
     def jsonify(self, status_code=200):
-        ret = jsonify(self.paginated_data)
+        data = self.paginated_data
+        with phase(ENCODE):
+            ret = jsonify(data)
         headers, links = self.headers
         ret.headers.extend(headers)
         ret.status_code = status_code
@@ -13,7 +13,7 @@ class OperationPermsEnforcer:
     def __init__(self, factory):
         self.factory = factory
 
-    def enforce(self, status_code=403, **kwargs):
+    def allows(self, **kwargs):
         try:
             if not self.factory:
                 return True
@@ -26,7 +26,11 @@ class OperationPermsEnforcer:
         except:
             log.exception('Exception occurred in permission testing')
             traceback.print_exc()
+        return False
 
+    def enforce(self, status_code=403, **kwargs):
+        if self.allows(**kwargs):
+            return True
         json_abort(status_code, {})
 
 
@@ -0,0 +1,84 @@
+from flask import jsonify, request
+from sqlalchemy.orm.exc import NoResultFound
+from webargs.flaskparser import use_kwargs
+
+from flask_taxonomies.marshmallow import SyncQuerySchema
+from flask_taxonomies.models import TaxonomyError, TaxonomyTerm, TaxonomyTermBusyError
+from flask_taxonomies.proxies import current_flask_taxonomies
+
+from .common import blueprint, json_abort
+
+
+@blueprint.route('/<code>/_sync', methods=['POST'], strict_slashes=False)
+@use_kwargs(SyncQuerySchema, locations=("query",))
+def sync_taxonomy(code=None, dry_run=False):
+    """
+    Makes the terms of the taxonomy match the tree in the payload (in the format of ``utils.to_json``)
+    and returns the created, updated, deleted and moved slugs.
+    With ``?dry_run=true`` only the differences are returned.
+    Besides ``taxonomy_update``, the term permissions are enforced for each created, updated,
+    deleted and moved term.
+    """
+    try:
+        taxonomy = current_flask_taxonomies.get_taxonomy(code)
+    except NoResultFound:
+        json_abort(404, {})
+        return  # make pycharm happy
+
+    current_flask_taxonomies.permissions.taxonomy_update.enforce(request=request, taxonomy=taxonomy)
+
+    tree = request.json
+    if isinstance(tree, dict):
+        tree = tree.get('children')
+    if not isinstance(tree, list):
+        json_abort(400, {
+            'message': 'Expected a list of terms',
+            'reason': 'invalid-payload'
+        })
+    try:
+        diff = current_flask_taxonomies.sync_taxonomy(taxonomy, tree, dry_run=dry_run,
+                                                      check=_enforce_term_permissions)
+    except TaxonomyTermBusyError as e:
+        json_abort(412, {
+            'message': str(e),
+            'reason': 'term-busy'
+        })
+    except TaxonomyError as e:
+        json_abort(400, {
+            'message': str(e),
+            'reason': 'invalid-tree'
+        })
+    if not dry_run:
+        current_flask_taxonomies.commit()
+    return jsonify(diff)
+
+
+def _enforce_term_permissions(taxonomy, diff):
+    permissions = current_flask_taxonomies.permissions
+    for slug in diff.created:
+        permissions.taxonomy_term_create.enforce(request=request, taxonomy=taxonomy, slug=slug)
+
+    # revived terms are made alive by an update, as in PATCH
+    update = permissions.taxonomy_term_update
+    for term in _terms(update, taxonomy, [slug for _, slug in diff.revived + diff.updated]):
+        update.enforce(request=request, taxonomy=taxonomy, term=term)
+
+    delete = permissions.taxonomy_term_delete
+    for term in _terms(delete, taxonomy, [slug for _, slug in diff.deleted]):
+        delete.enforce(request=request, taxonomy=taxonomy, term=term)
+
+    move = permissions.taxonomy_term_move
+    targets = dict(diff.moved)
+    for term in _terms(move, taxonomy, list(targets)):
+        destination, _, rename = targets[term.slug].rpartition('/')
+        move.enforce(request=request, taxonomy=taxonomy, term=term, destination=destination, rename=rename)
+
+
+def _terms(permission, taxonomy, slugs, chunk_size=1000):
+    # terms are loaded only if their permission is restricted
+    if permission.factory is None:
+        return
+    for i in range(0, len(slugs), chunk_size):
+        yield from current_flask_taxonomies.session.query(TaxonomyTerm).filter(
+            TaxonomyTerm.taxonomy_id == taxonomy.id,
+            TaxonomyTerm.slug.in_(slugs[i:i + chunk_size]))
@@ -12,19 +12,24 @@ from flask_taxonomies.constants import (
     INCLUDE_DESCENDANTS_COUNT,
     INCLUDE_SELF,
     INCLUDE_STATUS,
+    RETURN_NONE,
 )
 from flask_taxonomies.marshmallow import HeaderSchema, PaginatedQuerySchema, QuerySchema
 from flask_taxonomies.models import EnvelopeLinks, TaxonomyTerm, TermStatusEnum
 from flask_taxonomies.proxies import current_flask_taxonomies
 
+from .admission import admit, heavy_request
 from .common import (
     blueprint,
     build_descendants,
+    coalesce_response,
     enrich_data_with_computed,
     json_abort,
+    request_key,
     with_prefer,
 )
 from .paginator import Paginator
+from .timing import LOOKUP, PERMISSIONS, phase
 
 
 @blueprint.route('/')
@@ -32,7 +37,8 @@ from .paginator import Paginator
 @use_kwargs(PaginatedQuerySchema, locations=("query",))
 @with_prefer
 def list_taxonomies(prefer=None, page=None, size=None, q=None):
-    current_flask_taxonomies.permissions.taxonomy_list.enforce(request=request)
+    with phase(PERMISSIONS):
+        current_flask_taxonomies.permissions.taxonomy_list.enforce(request=request)
     taxonomies = current_flask_taxonomies.list_taxonomies(
         return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
         return_descendants_busy_count=INCLUDE_STATUS in prefer)
@@ -55,20 +61,30 @@ def list_taxonomies(prefer=None, page=None, size=None, q=None):
 @with_prefer
 def get_taxonomy(code=None, prefer=None, page=None, size=None, status_code=200, q=None):
     try:
-        taxonomies = current_flask_taxonomies.filter_taxonomy(
-            code, return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
-            return_descendants_busy_count=INCLUDE_STATUS in prefer
-        )
-        taxonomy = taxonomies.one()
-        taxonomy = enrich_data_with_computed(taxonomy)
+        with phase(LOOKUP):
+            taxonomies = current_flask_taxonomies.filter_taxonomy(
+                code, return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
+                return_descendants_busy_count=INCLUDE_STATUS in prefer
+            )
+            taxonomy = taxonomies.one()
+            taxonomy = enrich_data_with_computed(taxonomy)
     except NoResultFound:
         json_abort(404, {})
         return  # make pycharm happy
 
-    current_flask_taxonomies.permissions.taxonomy_read.enforce(request=request, status_code=404)
+    with phase(PERMISSIONS):
+        current_flask_taxonomies.permissions.taxonomy_read.enforce(request=request, status_code=404)
 
     prefer = taxonomy.merge_select(prefer)
 
+    if INCLUDE_DESCENDANTS in prefer:
+        return coalesce_response(
+            request_key(prefer, code, page, size, q, status_code),
+            lambda: _get_taxonomy_response(taxonomy, code, prefer, page, size, status_code, q))
+    return _get_taxonomy_response(taxonomy, code, prefer, page, size, status_code, q)
+
+
+def _get_taxonomy_response(taxonomy, code, prefer, page, size, status_code, q):
     try:
         if INCLUDE_SELF in prefer:
             paginator = Paginator(
@@ -99,23 +115,28 @@ def get_taxonomy(code=None, prefer=None, page=None, size=None, status_code=200,
             if q:
                 descendants = current_flask_taxonomies.apply_term_query(descendants, q, code)
 
+            page, size, cost = admit(descendants, prefer, page, size)
+
             child_exclude = set(prefer.exclude)
             child_exclude.discard(INCLUDE_SELF)
             child_prefer = prefer.copy(exclude=child_exclude).extend(include=[INCLUDE_SELF])
 
-            child_paginator = Paginator(
-                child_prefer, descendants, page, size,
-                json_converter=lambda data: build_descendants(data, prefer, root_slug=None)
-            )
+            with heavy_request(cost):
+                child_paginator = Paginator(
+                    child_prefer, descendants, page, size,
+                    json_converter=lambda data: build_descendants(data, prefer, root_slug=None)
+                )
+
+                if INCLUDE_SELF in prefer:
+                    paginator.set_children(child_paginator.paginated_data_without_envelope)
+                    # reset page, size, count from the child paginator
+                    paginator.page = page
+                    paginator.size = size
+                    paginator.count = child_paginator.count
+                else:
+                    paginator = child_paginator
 
-            if INCLUDE_SELF in prefer:
-                paginator.set_children(child_paginator.paginated_data_without_envelope)
-                # reset page, size, count from the child paginator
-                paginator.page = page
-                paginator.size = size
-                paginator.count = child_paginator.count
-            else:
-                paginator = child_paginator
+                return paginator.jsonify(status_code=status_code)
 
         return paginator.jsonify(status_code=status_code)
 
@@ -147,13 +168,14 @@ def create_update_taxonomy(code=None, prefer=None, page=None, size=None, q=None)
     url = data.pop('url', None)
     select = data.pop('select', None)
     if not tax:
-        current_flask_taxonomies.create_taxonomy(code=code, extra_data=request.json, url=url, select=select)
+        tax = current_flask_taxonomies.create_taxonomy(code=code, extra_data=request.json, url=url, select=select)
         status_code = 201
     else:
-        current_flask_taxonomies.update_taxonomy(tax, extra_data=request.json, url=url, select=select)
+        tax = current_flask_taxonomies.update_taxonomy(tax, extra_data=request.json, url=url, select=select)
         status_code = 200
+    resp = _written_taxonomy_response(tax, prefer, page, size, status_code=status_code)
     current_flask_taxonomies.commit()
-    return get_taxonomy(code, prefer=prefer, page=page, size=size, status_code=status_code)
+    return resp
 
 
 @blueprint.route('/<code>', methods=['PATCH'], strict_slashes=False)
@@ -181,11 +203,10 @@ def patch_taxonomy(code=None, prefer=None, page=None, size=None, q=None):
     data = jsonpatch.apply_patch(data, request.json)
     url = data.pop('url', None)
     select = data.pop('select', None)
-    current_flask_taxonomies.update_taxonomy(tax, extra_data=data, url=url, select=select)
-    status_code = 200
+    tax = current_flask_taxonomies.update_taxonomy(tax, extra_data=data, url=url, select=select)
+    resp = _written_taxonomy_response(tax, prefer, page, size)
     current_flask_taxonomies.commit()
-
-    return get_taxonomy(code, prefer=prefer, page=page, size=size, status_code=status_code)
+    return resp
 
 
 @blueprint.route('/', methods=['POST'], strict_slashes=False)
@@ -207,15 +228,37 @@ def create_update_taxonomy_post(prefer=None, q=None):
     tax = current_flask_taxonomies.get_taxonomy(code=code, fail=False)
     if not tax:
         current_flask_taxonomies.permissions.taxonomy_create.enforce(request=request, code=code)
-        current_flask_taxonomies.create_taxonomy(code=code, extra_data=data, url=url, select=select)
+        tax = current_flask_taxonomies.create_taxonomy(code=code, extra_data=data, url=url, select=select)
         status_code = 201
     else:
         current_flask_taxonomies.permissions.taxonomy_update.enforce(request=request, taxonomy=tax)
-        current_flask_taxonomies.update_taxonomy(tax, extra_data=data, url=url, select=select)
+        tax = current_flask_taxonomies.update_taxonomy(tax, extra_data=data, url=url, select=select)
         status_code = 200
+    resp = _written_taxonomy_response(tax, prefer, None, None, status_code=status_code)
     current_flask_taxonomies.commit()
+    return resp
+
+
+def _written_taxonomy_response(taxonomy, prefer, page, size, status_code=200):
+    """
+    Response of a write operation, serialized from the taxonomy in the session without reading it again.
 
-    return get_taxonomy(code, prefer=prefer, status_code=status_code)
+    Representations containing terms or counts are delegated to get_taxonomy.
+    """
+    if prefer.representation == RETURN_NONE:
+        return Response(status=201 if status_code == 201 else 204, headers={
+            'Location': current_flask_taxonomies.taxonomy_url(taxonomy)
+        })
+    prefer = taxonomy.merge_select(prefer)
+    if INCLUDE_SELF not in prefer or any(
+            x in prefer for x in (INCLUDE_DESCENDANTS, INCLUDE_DESCENDANTS_COUNT, INCLUDE_STATUS)):
+        return get_taxonomy(taxonomy.code, prefer=prefer, page=page, size=size, status_code=status_code)
+    paginator = Paginator(
+        prefer, [taxonomy], page=0, size=0,
+        json_converter=lambda data: [x.json(prefer) for x in data],
+        envelope_links=lambda prefer, data, original_data: original_data[0].links(prefer),
+        single_result=True, allow_empty=False)
+    return paginator.jsonify(status_code=status_code)
 
 
 @blueprint.route('/<code>', methods=['DELETE'], strict_slashes=False)
@@ -6,6 +6,7 @@ import sqlalchemy
 from flask import Response, abort, current_app, jsonify, request
 from link_header import Link, LinkHeader
 from slugify import slugify
+from sqlalchemy.orm import joinedload
 from sqlalchemy.orm.exc import NoResultFound
 from webargs.flaskparser import use_kwargs
 
@@ -15,6 +16,7 @@ from flask_taxonomies.constants import (
     INCLUDE_DESCENDANTS_COUNT,
     INCLUDE_SELF,
     INCLUDE_STATUS,
+    RETURN_NONE,
 )
 from flask_taxonomies.marshmallow import (
     HeaderSchema,
@@ -26,8 +28,18 @@ from flask_taxonomies.proxies import current_flask_taxonomies
 from flask_taxonomies.routing import accept_fallback
 from flask_taxonomies.term_identification import TermIdentification
 
-from .common import blueprint, build_descendants, json_abort, with_prefer
+from .admission import admit, heavy_request
+from .common import (
+    blueprint,
+    build_descendants,
+    coalesce_response,
+    enrich_data_with_computed,
+    json_abort,
+    request_key,
+    with_prefer,
+)
 from .paginator import Paginator
+from .timing import LOOKUP, PERMISSIONS, QUERY, phase
 
 
 @blueprint.route('/<code>/<path:slug>', strict_slashes=False)
@@ -37,13 +49,30 @@ from .paginator import Paginator
 def get_taxonomy_term(code=None, slug=None, prefer=None, page=None, size=None, status_code=200,
                       q=None):
     try:
-        taxonomy = current_flask_taxonomies.get_taxonomy(code)
+        with phase(LOOKUP):
+            taxonomy = current_flask_taxonomies.get_taxonomy(code)
         prefer = taxonomy.merge_select(prefer)
 
-        current_flask_taxonomies.permissions.taxonomy_term_read.enforce(request=request,
-                                                                        taxonomy=taxonomy,
-                                                                        slug=slug)
+        with phase(PERMISSIONS):
+            current_flask_taxonomies.permissions.taxonomy_term_read.enforce(request=request,
+                                                                            taxonomy=taxonomy,
+                                                                            slug=slug)
+
+        if (code, slug) in current_flask_taxonomies.negative_cache:
+            _abort_does_not_exist()
+    except NoResultFound:
+        term = _term_with_redirect_query(code, slug).one_or_none()
+        return _term_not_found(code, slug, term, prefer)
+
+    if INCLUDE_DESCENDANTS in prefer:
+        return coalesce_response(
+            request_key(prefer, code, slug, page, size, q, status_code),
+            lambda: _get_taxonomy_term_response(code, slug, prefer, page, size, status_code, q))
+    return _get_taxonomy_term_response(code, slug, prefer, page, size, status_code, q)
+
 
+def _get_taxonomy_term_response(code, slug, prefer, page, size, status_code, q):
+    try:
         if INCLUDE_DELETED in prefer:
             status_cond = sqlalchemy.sql.true()
         else:
@@ -59,56 +88,101 @@ def get_taxonomy_term(code=None, slug=None, prefer=None, page=None, size=None, s
                 return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
                 return_descendants_busy_count=INCLUDE_STATUS in prefer
             )
-        else:
+        elif q:
             query = current_flask_taxonomies.filter_term(
                 TermIdentification(taxonomy=code, slug=slug),
                 status_cond=status_cond,
                 return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
                 return_descendants_busy_count=INCLUDE_STATUS in prefer
             )
+        else:
+            # fetch the term regardless of its status together with the term it has been
+            # moved to, so that both hits and misses are decided with a single query
+            with phase(QUERY):
+                res = _term_with_redirect_query(
+                    code, slug,
+                    return_descendants_count=INCLUDE_DESCENDANTS_COUNT in prefer,
+                    return_descendants_busy_count=INCLUDE_STATUS in prefer
+                ).one_or_none()
+            term = enrich_data_with_computed(res)
+            if term is None or (INCLUDE_DELETED not in prefer and term.status != TermStatusEnum.alive):
+                return _term_not_found(code, slug, term, prefer)
+            query = [res]
         if q:
             query = current_flask_taxonomies.apply_term_query(query, q, code)
-        paginator = Paginator(
-            prefer,
-            query, page if return_descendants else None,
-            size if return_descendants else None,
-            json_converter=lambda data:
-            build_descendants(data, prefer, root_slug=None),
-            allow_empty=INCLUDE_SELF not in prefer, single_result=INCLUDE_SELF in prefer,
-            has_query=q is not None
-        )
-
-        return paginator.jsonify(status_code=status_code)
+        cost = None
+        if return_descendants:
+            page, size, cost = admit(query, prefer, page, size)
+        with heavy_request(cost):
+            paginator = Paginator(
+                prefer,
+                query, page if return_descendants else None,
+                size if return_descendants else None,
+                json_converter=lambda data:
+                build_descendants(data, prefer, root_slug=None),
+                allow_empty=INCLUDE_SELF not in prefer, single_result=INCLUDE_SELF in prefer,
+                has_query=q is not None
+            )
+
+            return paginator.jsonify(status_code=status_code)
 
     except NoResultFound:
-        term = current_flask_taxonomies.filter_term(
-            TermIdentification(taxonomy=code, slug=slug),
-            status_cond=sqlalchemy.sql.true()
-        ).one_or_none()
-        if not term:
-            json_abort(404, {
-                "message": "%s was not found on the server" % request.url,
-                "reason": "does-not-exist"
-            })
-        elif term.obsoleted_by_id:
-            obsoleted_by = term.obsoleted_by
-            obsoleted_by_links = obsoleted_by.links()
-            return Response(json.dumps({
-                'links': term.links(representation=prefer).envelope,
-                'status': 'moved'
-            }), status=301, headers={
-                'Location': obsoleted_by_links.headers['self'],
-                'Link': str(LinkHeader([Link(v, rel=k) for k, v in
-                                        term.links(representation=prefer).envelope.items()]))
-            }, content_type='application/json')
-        else:
+        term = _term_with_redirect_query(code, slug).one_or_none()
+        return _term_not_found(code, slug, term, prefer)
+    except:
+        traceback.print_exc()
+        raise
+
+
+def _term_with_redirect_query(code, slug, **kwargs):
+    return current_flask_taxonomies.filter_term(
+        TermIdentification(taxonomy=code, slug=slug),
+        status_cond=sqlalchemy.sql.true(),
+        **kwargs
+    ).options(joinedload(TaxonomyTerm.obsoleted_by))
+
+
+def _abort_does_not_exist():
+    json_abort(404, {
+        "message": "%s was not found on the server" % request.url,
+        "reason": "does-not-exist"
+    })
+
+
+def _term_not_found(code, slug, term, prefer, session=None):
+    """Returns 404, 410 or 301 for a term that does not exist, is deleted or has been moved."""
+    if not term:
+        current_flask_taxonomies.negative_cache.add(
+            (code, slug), current_app.config.get('FLASK_TAXONOMIES_NEGATIVE_CACHE_TTL'))
+        _abort_does_not_exist()
+    elif term.obsoleted_by_id:
+        final_term = term.obsoleted_by
+        if final_term.status != TermStatusEnum.alive:
+            # redirect straight to the final term if the term has been moved several times
+            final_term = current_flask_taxonomies.resolve_obsoleted(
+                [term.obsoleted_by_id], session=session).get(term.obsoleted_by_id)
+        if not final_term:
             json_abort(410, {
                 "message": "%s was not found on the server" % request.url,
                 "reason": "deleted"
             })
-    except:
-        traceback.print_exc()
-        raise
+        location = current_flask_taxonomies.taxonomy_term_url(final_term)
+        links = term.links(representation=prefer).envelope
+        if 'obsoleted_by' in links:
+            # clients following the link get to the final term in one step as well
+            links = {**links, 'obsoleted_by': location}
+        return Response(json.dumps({
+            'links': links,
+            'status': 'moved'
+        }), status=301, headers={
+            'Location': location,
+            'Link': str(LinkHeader([Link(v, rel=k) for k, v in links.items()]))
+        }, content_type='application/json')
+    else:
+        json_abort(410, {
+            "message": "%s was not found on the server" % request.url,
+            "reason": "deleted"
+        })
 
 
 @blueprint.route('/<code>/<path:slug>', methods=['PUT'], strict_slashes=False)
@@ -135,14 +209,9 @@ def _create_update_taxonomy_term_internal(code, slug, prefer, page, size, extra_
         taxonomy = current_flask_taxonomies.get_taxonomy(code)
         prefer = taxonomy.merge_select(prefer)
 
-        if INCLUDE_DELETED in prefer:
-            status_cond = sqlalchemy.sql.true()
-        else:
-            status_cond = TaxonomyTerm.status == TermStatusEnum.alive
-
         slug = '/'.join(slugify(x) for x in slug.split('/'))
 
-        ti = TermIdentification(taxonomy=code, slug=slug)
+        ti = TermIdentification(taxonomy=taxonomy, slug=slug)
         term = original_term = current_flask_taxonomies.filter_term(ti,
                                                                     status_cond=sqlalchemy.sql.true()).one_or_none()
 
@@ -168,9 +237,9 @@ def _create_update_taxonomy_term_internal(code, slug, prefer, page, size, extra_
             current_flask_taxonomies.permissions.taxonomy_term_update.enforce(request=request,
                                                                               taxonomy=taxonomy,
                                                                               term=term)
-            current_flask_taxonomies.update_term(
+            term = current_flask_taxonomies.update_term(
                 term,
-                status_cond=status_cond,
+                reload=False,  # status already checked above
                 extra_data=extra_data
             )
             status_code = 200
@@ -187,16 +256,15 @@ def _create_update_taxonomy_term_internal(code, slug, prefer, page, size, extra_
             current_flask_taxonomies.permissions.taxonomy_term_create.enforce(request=request,
                                                                               taxonomy=taxonomy,
                                                                               slug=slug)
-            current_flask_taxonomies.create_term(
+            term = current_flask_taxonomies.create_term(
                 ti,
                 extra_data=extra_data
             )
             status_code = 201
 
+        resp = _written_term_response(term, prefer, page, size, status_code=status_code)
         current_flask_taxonomies.commit()
-
-        return get_taxonomy_term(code=code, slug=slug, prefer=prefer, page=page, size=size,
-                                 status_code=status_code)
+        return resp
 
     except NoResultFound:
         json_abort(404, {})
@@ -266,7 +334,7 @@ def patch_taxonomy_term(code=None, slug=None, prefer=None, page=None, size=None,
     else:
         status_cond = TaxonomyTerm.status == TermStatusEnum.alive
 
-    ti = TermIdentification(taxonomy=code, slug=slug)
+    ti = TermIdentification(taxonomy=taxonomy, slug=slug)
     term = current_flask_taxonomies.filter_term(ti, status_cond=status_cond).one_or_none()
 
     if not term:
@@ -275,16 +343,17 @@ def patch_taxonomy_term(code=None, slug=None, prefer=None, page=None, size=None,
     current_flask_taxonomies.permissions.taxonomy_term_update.enforce(request=request,
                                                                       taxonomy=taxonomy, term=term)
 
-    current_flask_taxonomies.update_term(
+    term = current_flask_taxonomies.update_term(
         term,
-        status_cond=status_cond,
+        reload=False,  # term has been looked up with status_cond
         extra_data=request.json,
         patch=True,
         status=TermStatusEnum.alive  # make it alive if it  was deleted
     )
-    current_flask_taxonomies.commit()
 
-    return get_taxonomy_term(code=code, slug=slug, prefer=prefer, page=page, size=size)
+    resp = _written_term_response(term, prefer, page, size)
+    current_flask_taxonomies.commit()
+    return resp
 
 
 @blueprint.route('/<code>/<path:slug>', methods=['DELETE'], strict_slashes=False)
@@ -403,7 +472,28 @@ def taxonomy_move_term(code=None, slug=None, prefer=None, page=None, size=None,
         abort(400, 'Pass either `destination` or `rename` parameters ')
         return  # just to make pycharm happy
 
+    resp = _written_term_response(new_term, prefer, page, size)
     current_flask_taxonomies.commit()
+    return resp
+
+
+def _written_term_response(term, prefer, page, size, status_code=200):
+    """
+    Response of a write operation, serialized from the term in the session without reading it again.
 
-    return get_taxonomy_term(code=destination_taxonomy, slug=new_term.slug,
-                             prefer=prefer, page=page, size=size)
+    Representations that need data computed by the database (descendants, counts)
+    are delegated to get_taxonomy_term.
+    """
+    if prefer.representation == RETURN_NONE:
+        return Response(status=201 if status_code == 201 else 204, headers={
+            'Location': current_flask_taxonomies.taxonomy_term_url(term)
+        })
+    if any(x in prefer for x in (INCLUDE_DESCENDANTS, INCLUDE_DESCENDANTS_COUNT, INCLUDE_STATUS)):
+        return get_taxonomy_term(code=term.taxonomy_code, slug=term.slug, prefer=prefer,
+                                 page=page, size=size, status_code=status_code)
+    paginator = Paginator(
+        prefer, [term], None, None,
+        json_converter=lambda data: build_descendants(data, prefer, root_slug=None),
+        allow_empty=INCLUDE_SELF not in prefer, single_result=INCLUDE_SELF in prefer
+    )
+    return paginator.jsonify(status_code=status_code)
@@ -0,0 +1,112 @@
+"""
+Opt-in timing of the requests to the taxonomy endpoints (FLASK_TAXONOMIES_SERVER_TIMING).
+
+Views wrap their phases in ``phase(name)`` - taxonomy lookup, permission check, term query, count,
+building the tree (``build_descendants``) and json encoding - and SQL statements are timed by engine events.
+The durations are returned in the ``Server-Timing`` response header and logged by the
+``flask_taxonomies.timing`` logger, so that it is visible whether a slow response waits for the database
+or for serialization.
+"""
+import contextlib
+import logging
+import time
+
+import sqlalchemy
+from flask import current_app, g, request
+from sqlalchemy.engine import Engine
+
+from .common import blueprint, request_global
+
+log = logging.getLogger('flask_taxonomies.timing')
+
+LOOKUP = 'lookup'
+PERMISSIONS = 'perm'
+QUERY = 'query'
+COUNT = 'count'
+BUILD = 'build'
+ENCODE = 'encode'
+SQL = 'sql'
+TOTAL = 'total'
+
+
+class RequestTiming:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}  # name -> [seconds, number of calls]
+        self.sql_time = 0
+        self.sql_statements = 0
+
+    def add(self, name, duration):
+        phase = self.phases.setdefault(name, [0, 0])
+        phase[0] += duration
+        phase[1] += 1
+
+    def metrics(self):
+        """Returns a list of (name, milliseconds, description)."""
+        ret = [(name, duration * 1000, '%d calls' % count if count > 1 else None)
+               for name, (duration, count) in self.phases.items()]
+        ret.append((SQL, self.sql_time * 1000, '%d statements' % self.sql_statements))
+        ret.append((TOTAL, (time.perf_counter() - self.started) * 1000, None))
+        return ret
+
+    def server_timing(self):
+        return ', '.join(
+            '%s;dur=%.1f' % (name, duration) + (';desc="%s"' % desc if desc else '')
+            for name, duration, desc in self.metrics())
+
+
+def current_timing():
+    return request_global('flask_taxonomies_timing')
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Measures the duration of the enclosed code as a phase of the request, if timing is enabled."""
+    timing = current_timing()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.add(name, time.perf_counter() - start)
+
+
+@blueprint.before_request
+def start_timing():
+    if current_app.config.get('FLASK_TAXONOMIES_SERVER_TIMING'):
+        g.flask_taxonomies_timing = RequestTiming()
+
+
+@blueprint.after_request
+def report_timing(response):
+    timing = g.pop('flask_taxonomies_timing', None)
+    if timing is None:
+        return response
+    response.headers['Server-Timing'] = timing.server_timing()
+    log.info('%s %s %s %s', request.method, request.full_path, response.status_code,
+             ' '.join('%s=%.1fms' % (name, duration) + (' (%s)' % desc if desc else '')
+                      for name, duration, desc in timing.metrics()))
+    return response
+
+
+@blueprint.teardown_request
+def clear_timing(exc):
+    g.pop('flask_taxonomies_timing', None)
+
+
+@sqlalchemy.event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_timing() is not None:
+        conn.info['flask_taxonomies_statement_start'] = time.perf_counter()
+
+
+@sqlalchemy.event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = current_timing()
+    start = conn.info.pop('flask_taxonomies_statement_start', None)
+    if timing is None or start is None:
+        return
+    timing.sql_time += time.perf_counter() - start
+    timing.sql_statements += 1
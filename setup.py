@@ -3,6 +3,7 @@ from setuptools import setup
 requires = [
     'flask',
     'flask-sqlalchemy',
+    'sqlalchemy>=1.4',
     'blinker',
     'sqlalchemy-utils',
     'python-slugify',
@@ -22,7 +23,8 @@ tests_require = [
     'isort',
     'check-manifest',
     'pytest-coverage',
-    'pytest-pep8'
+    'pytest-pep8',
+    'aiosqlite'
 ]
 
 setup(
@@ -35,6 +37,9 @@ setup(
         'tests': tests_require,
         'postgresql': ['psycopg2'],
         'sqlite': [],
+        'async': ['greenlet'],
+        'async-postgresql': ['greenlet', 'asyncpg'],
+        'async-sqlite': ['greenlet', 'aiosqlite'],
         'migrate': ['flask-migrate']
     },
     license='Creative Commons Attribution-Noncommercial-Share Alike license',
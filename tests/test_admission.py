@@ -0,0 +1,86 @@
+import pytest
+
+
+@pytest.mark.parametrize('app', [
+    {
+        # the default representation includes ancestors, so a term costs 2
+        'FLASK_TAXONOMIES_MAX_TREE_COST': 10,
+        'FLASK_TAXONOMIES_REPRESENTATION_MAX_TREE_COST': {'minimal': None}
+    }
+], indirect=['app'])
+def expensive_tree_paginated_test(api, client, deep_taxonomy):
+    resp = client.get('/api/2.0/taxonomies/deep?representation:include=dsc')
+    assert resp.status_code == 200
+    assert (resp.headers['X-Page'], resp.headers['X-PageSize'], resp.headers['X-Total']) == ('1', '5', '9')
+
+    # descendant counts add to the cost of a term
+    resp = client.get('/api/2.0/taxonomies/deep/b?representation:include=dsc')
+    assert resp.status_code == 200
+    assert 'X-Total' not in resp.headers
+    resp = client.get('/api/2.0/taxonomies/deep/b?representation:include=dsc,dcn')
+    assert resp.status_code == 200
+    assert (resp.headers['X-PageSize'], resp.headers['X-Total']) == ('3', '5')
+
+    # a page that fits into the limit
+    resp = client.get('/api/2.0/taxonomies/deep?representation:include=dsc&size=3&page=2')
+    assert resp.status_code == 200
+    assert resp.headers['X-PageSize'] == '3'
+
+    resp = client.get('/api/2.0/taxonomies/deep?representation:include=dsc&size=10')
+    assert resp.status_code == 413
+    assert resp.json['reason'] == 'request-too-expensive'
+    assert resp.json['max_size'] == 5
+
+    # smaller subtrees are not limited
+    resp = client.get('/api/2.0/taxonomies/deep/a/aa?representation:include=dsc')
+    assert resp.status_code == 200
+    assert 'X-Total' not in resp.headers
+
+    # representation without a limit
+    resp = client.get('/api/2.0/taxonomies/deep?representation:include=dsc',
+                      headers={'prefer': 'return=minimal'})
+    assert resp.status_code == 200
+    assert 'X-Total' not in resp.headers
+
+
+@pytest.mark.parametrize('app', [
+    {
+        'FLASK_TAXONOMIES_MAX_TREE_COST': 10,
+        'FLASK_TAXONOMIES_EXPENSIVE_TREE_POLICY': 'reject'
+    }
+], indirect=['app'])
+def expensive_tree_rejected_test(api, client, deep_taxonomy):
+    resp = client.get('/api/2.0/taxonomies/deep?representation:include=dsc')
+    assert resp.status_code == 413
+    assert resp.json['cost'] == 12  # counting stops at the limit
+
+    resp = client.get('/api/2.0/taxonomies/deep?representation:include=dsc&representation:exclude=anc')
+    assert resp.status_code == 200
+
+
+@pytest.mark.parametrize('app', [
+    {
+        'FLASK_TAXONOMIES_HEAVY_TREE_COST': 10,
+        'FLASK_TAXONOMIES_MAX_HEAVY_REQUESTS': 1
+    }
+], indirect=['app'])
+def heavy_requests_limit_test(api, client, deep_taxonomy):
+    slots = api.heavy_request_slots
+    assert slots.acquire(blocking=False)
+    try:
+        resp = client.get('/api/2.0/taxonomies/deep?representation:include=dsc')
+        assert resp.status_code == 429
+        assert resp.headers['Retry-After'] == '1'
+        assert resp.json['reason'] == 'too-many-heavy-requests'
+
+        # light requests do not need a slot
+        resp = client.get('/api/2.0/taxonomies/deep/a/aa?representation:include=dsc')
+        assert resp.status_code == 200
+    finally:
+        slots.release()
+
+    resp = client.get('/api/2.0/taxonomies/deep?representation:include=dsc')
+    assert resp.status_code == 200
+    # the slot has been released
+    assert slots.acquire(blocking=False)
+    slots.release()
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from flask_taxonomies.async_api import async_database_uri
+from flask_taxonomies.models import TaxonomyTerm, TermStatusEnum
+from flask_taxonomies.term_identification import TermIdentification
+
+pytest.importorskip('aiosqlite')
+
+
+def _run(async_api, coro):
+    async def run():
+        try:
+            return await coro
+        finally:
+            await async_api.remove_session()
+            await async_api.engine.dispose()
+
+    return asyncio.run(run())
+
+
+def async_database_uri_test():
+    assert async_database_uri('sqlite:///test.sqlite3') == 'sqlite+aiosqlite:///test.sqlite3'
+    assert async_database_uri('postgresql+psycopg2://u:p@localhost/db') == 'postgresql+asyncpg://u:p@localhost/db'
+    with pytest.raises(ValueError):
+        async_database_uri('oracle://localhost/db')
+
+
+def async_reads_test(api, deep_taxonomy):
+    api.commit()
+    async_api = api.async_api
+
+    async def reads():
+        taxonomies = await async_api.list_taxonomies()
+        assert [x.code for x in taxonomies] == ['deep']
+        taxonomy = await async_api.get_taxonomy('deep')
+        assert taxonomy.extra_data == {'title': 'Test deep taxonomy'}
+        assert await async_api.get_taxonomy('unknown', fail=False) is None
+
+        terms = await async_api.list_taxonomy('deep', levels=1)
+        assert [t.slug for t in terms] == ['a', 'b']
+        term = await async_api.filter_term(TermIdentification(taxonomy='deep', slug='a/aa'))
+        assert term.slug == 'a/aa'
+        assert await async_api.filter_term(TermIdentification(taxonomy='deep', slug='x')) is None
+
+        row = await async_api.filter_term(TermIdentification(taxonomy='deep', slug='b'),
+                                          return_descendants_count=True)
+        assert (row[0].slug, row.descendants_count) == ('b', 4)
+
+        descendants = await async_api.descendants(TermIdentification(taxonomy=taxonomy, slug='b'), levels=1)
+        assert [t.slug for t in descendants] == ['b/b1', 'b/b2']
+        descendants = await async_api.descendants_or_self(TermIdentification(term=term))
+        assert [t.slug for t in descendants] == ['a/aa', 'a/aa/aaa', 'a/aa/aaa/aaaa']
+        ancestors = await async_api.ancestors(TermIdentification(taxonomy='deep', slug='a/aa/aaa'))
+        assert [t.slug for t in ancestors] == ['a', 'a/aa']
+        ancestors = await async_api.ancestors_or_self(TermIdentification(taxonomy='deep', slug='a/aa'))
+        assert [t.slug for t in ancestors] == ['a', 'a/aa']
+
+    _run(async_api, reads())
+
+
+def async_writes_test(api, sample_taxonomy):
+    api.commit()
+    async_api = api.async_api
+
+    async def writes():
+        term = await async_api.create_term(TermIdentification(taxonomy='test', slug='a/ab'),
+                                           extra_data={'title': 'AB'})
+        assert term.level == 1
+        await async_api.update_term(TermIdentification(taxonomy='test', slug='a/ab'),
+                                    extra_data=[{'op': 'add', 'path': '/code', 'value': 'ab'}], patch=True)
+        old, new = await async_api.move_term(TermIdentification(taxonomy='test', slug='a/ab'),
+                                             new_parent=TermIdentification(taxonomy='test', slug='b'),
+                                             remove_after_delete=False)
+        assert new.slug == 'b/ab'
+        await async_api.rename_term(TermIdentification(taxonomy='test', slug='b'), new_slug='c',
+                                    remove_after_delete=False)
+        await async_api.delete_term(TermIdentification(taxonomy='test', slug='a/aa'))
+        await async_api.commit()
+
+    _run(async_api, writes())
+
+    api.session.expire_all()
+    terms = {t.slug: t for t in api.session.query(TaxonomyTerm)}
+    assert set(terms) == {'a', 'a/ab', 'b', 'b/ab', 'c', 'c/ab'}
+    assert terms['c/ab'].extra_data == {'title': 'AB', 'code': 'ab'}
+    assert terms['a/ab'].status == TermStatusEnum.deleted
+    assert terms['a/ab'].obsoleted_by.slug == 'b/ab'
+    assert terms['b/ab'].obsoleted_by.slug == 'c/ab'
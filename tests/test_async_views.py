@@ -0,0 +1,139 @@
+import pytest
+from flask import request
+
+from flask_taxonomies.ext import FlaskTaxonomies
+from flask_taxonomies.proxies import current_flask_taxonomies
+from flask_taxonomies.term_identification import TermIdentification
+from flask_taxonomies.views.async_views import async_blueprint
+from flask_taxonomies.views.common import blueprint
+
+pytest.importorskip('aiosqlite')
+
+PREFIX = '/api/2.0/taxonomies'
+
+
+@pytest.fixture
+def api(app, db):
+    FlaskTaxonomies(app)
+    app.register_blueprint(async_blueprint, url_prefix='/async')
+    app.register_blueprint(blueprint, url_prefix=app.config['FLASK_TAXONOMIES_URL_PREFIX'])
+    yield current_flask_taxonomies
+
+
+def _compare(client, url, **kwargs):
+    sync_resp = client.get(PREFIX + url, **kwargs)
+    async_resp = client.get('/async' + url, **kwargs)
+    assert async_resp.status_code == sync_resp.status_code, async_resp.data
+    # links of the list of taxonomies and error messages contain the request url
+    assert async_resp.data.decode('utf-8').replace('/async/', PREFIX + '/') == sync_resp.data.decode('utf-8')
+    for header in ('X-Total', 'X-Page', 'X-PageSize', 'Link', 'Location'):
+        assert (async_resp.headers.get(header) or '').replace('/async/', PREFIX + '/') == \
+            (sync_resp.headers.get(header) or '')
+    return async_resp
+
+
+@pytest.mark.parametrize('url,prefer', [
+    ('/', None),
+    ('/?q=code:deep', None),
+    ('/deep', None),
+    ('/deep', 'return=representation; include=dsc dcn sta'),
+    ('/deep?size=2&page=2', 'return=representation; include=dsc env'),
+    ('/deep?representation:include=dsc&representation:levels=1', None),
+    ('/deep/a/aa', None),
+    ('/deep/a/aa?representation:include=dsc,anh', None),
+    ('/deep/a/aa?representation:include=dsc,anc&size=1&page=2', None),
+    ('/deep/b?representation:include=dsc,dcn&representation:exclude=self', None),
+    ('/deep/b?q=title:B21&representation:include=dsc', None),
+    ('/deep/unknown', None),
+    ('/unknown', None),
+])
+def async_views_test(api, client, deep_taxonomy, url, prefer):
+    api.commit()
+    resp = _compare(client, url, headers={'prefer': prefer} if prefer else {})
+    assert resp.status_code in (200, 404)
+
+
+def async_views_moved_test(api, client, deep_taxonomy):
+    api.move_term(TermIdentification(taxonomy='deep', slug='a/aa'),
+                  new_parent=TermIdentification(taxonomy='deep', slug='b'), remove_after_delete=False)
+    api.delete_term(TermIdentification(taxonomy='deep', slug='b/b1'), remove_after_delete=False)
+    api.commit()
+    assert _compare(client, '/deep/a/aa').status_code == 301
+    assert _compare(client, '/deep/b/b1').status_code == 410
+    assert _compare(client, '/deep/b/aa?representation:include=dsc').json['children'][0]['links'] == {
+        'self': 'http://localhost/api/2.0/taxonomies/deep/b/aa/aaa'
+    }
+
+
+def async_views_shadow_sync_views_test(app, db):
+    FlaskTaxonomies(app)
+    prefix = app.config['FLASK_TAXONOMIES_URL_PREFIX']
+    app.register_blueprint(async_blueprint, url_prefix=prefix)
+    app.register_blueprint(blueprint, url_prefix=prefix)
+    current_flask_taxonomies.create_taxonomy('test')
+    current_flask_taxonomies.commit()
+
+    with app.test_client() as client:
+        resp = client.get(PREFIX + '/test')
+        assert resp.status_code == 200
+        assert request.endpoint == 'flask_taxonomies_async.get_taxonomy'
+
+        # writes are still handled by the synchronous views
+        resp = client.put(PREFIX + '/test/a', json={'title': 'A'})
+        assert resp.status_code == 201
+        assert request.endpoint == 'flask_taxonomies.create_update_taxonomy_term'
+
+        resp = client.get(PREFIX + '/test/a')
+        assert resp.json['title'] == 'A'
+        assert request.endpoint == 'flask_taxonomies_async.get_taxonomy_term'
+
+
+@pytest.mark.parametrize('app', [
+    {
+        'FLASK_TAXONOMIES_MAX_TREE_COST': 10,
+        'FLASK_TAXONOMIES_ENDPOINT_QUERY_BUDGETS': {'get_taxonomy_term': 1},
+        'FLASK_TAXONOMIES_SERVER_TIMING': True
+    }
+], indirect=['app'])
+def async_views_request_hooks_test(api, client, deep_taxonomy):
+    api.commit()
+    # admission control
+    resp = client.get('/async/deep?representation:include=dsc')
+    assert resp.status_code == 200
+    assert (resp.headers['X-Page'], resp.headers['X-PageSize'], resp.headers['X-Total']) == ('1', '5', '9')
+    resp = client.get('/async/deep?representation:include=dsc&size=10')
+    assert resp.status_code == 413
+    assert resp.json['reason'] == 'request-too-expensive'
+
+    # statements executed on the async session are timed and count against the query budget
+    resp = client.get('/async/deep')
+    assert resp.status_code == 200
+    assert 'sql;dur=' in resp.headers['Server-Timing']
+    assert 'desc="0 statements"' not in resp.headers['Server-Timing']
+    resp = client.get('/async/deep/a/aa')
+    assert resp.status_code == 503
+    assert resp.json['reason'] == 'query-budget-exceeded'
+
+
+@pytest.mark.parametrize('app', [
+    {
+        'FLASK_TAXONOMIES_COALESCE_READS': True
+    }
+], indirect=['app'])
+def async_views_coalesced_test(api, client, deep_taxonomy, monkeypatch):
+    api.commit()
+    keys = []
+    do_async = api.single_flight.do_async
+
+    async def recording_do_async(key, func):
+        keys.append(key)
+        return await do_async(key, func)
+
+    monkeypatch.setattr(api.single_flight, 'do_async', recording_do_async)
+
+    assert _compare(client, '/deep?representation:include=dsc').status_code == 200
+    assert _compare(client, '/deep/b?representation:include=dsc').status_code == 200
+    assert _compare(client, '/deep/unknown?representation:include=dsc').status_code == 404
+    assert _compare(client, '/deep/b').status_code == 200
+    assert [key[0] for key in keys] == ['flask_taxonomies_async.get_taxonomy'] + \
+        ['flask_taxonomies_async.get_taxonomy_term'] * 2
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from flask_taxonomies.binary_snapshot import (
+    SnapshotRegistry,
+    TaxonomySnapshot,
+    read_snapshot_version,
+    write_binary_snapshot,
+)
+from flask_taxonomies.models import TaxonomyError, TermStatusEnum
+from flask_taxonomies.term_identification import TermIdentification
+
+
+@pytest.mark.parametrize('app', [{'FLASK_TAXONOMIES_CHANGE_LOG': True}], indirect=['app'])
+def binary_snapshot_test(api, deep_taxonomy, tmpdir):
+    api.update_term(TermIdentification(taxonomy=deep_taxonomy, slug='b/b1'), extra_data={'title': 'B1 ✓'})
+    api.create_term(TermIdentification(taxonomy=deep_taxonomy, slug='a-b'))
+    api.move_term(TermIdentification(taxonomy=deep_taxonomy, slug='b/b2'),
+                  new_parent=TermIdentification(taxonomy=deep_taxonomy, slug='a/aa'),
+                  remove_after_delete=False)
+    api.commit()
+    path = str(tmpdir.join('deep.taxsnap'))
+    version = write_binary_snapshot(deep_taxonomy, path)
+    assert version > 0 and read_snapshot_version(path) == version
+
+    snapshot = TaxonomySnapshot(path)
+    assert snapshot.code == 'deep'
+    assert len(snapshot) == deep_taxonomy.terms.count()
+
+    term = snapshot.filter_term('b/b1')
+    db_term = api.filter_term(TermIdentification(taxonomy=deep_taxonomy, slug='b/b1')).one()
+    assert (term.id, term.slug, term.level, term.status) == (db_term.id, 'b/b1', 1, TermStatusEnum.alive)
+    assert term.extra_data == {'title': 'B1 ✓'}
+    assert term.parent.slug == 'b'
+    assert snapshot.filter_term('x') is None
+    assert snapshot.filter_term('a-b').extra_data is None
+
+    # tombstones of moved terms point to the new terms
+    assert snapshot.filter_term('b/b2') is None
+    moved = snapshot.filter_term('b/b2', status=None)
+    assert moved.status == TermStatusEnum.deleted and moved.obsoleted_by.slug == 'a/aa/b2'
+
+    for slug, levels in (('a', None), ('a', 1), ('a/aa', 1), ('b', None), ('a-b', None)):
+        expected = [t.slug for t in api.descendants(TermIdentification(taxonomy=deep_taxonomy, slug=slug),
+                                                    levels=levels)]
+        assert [t.slug for t in snapshot.descendants(slug, levels=levels)] == expected
+    assert [t.slug for t in snapshot.descendants_or_self('b', status=None)] == [
+        'b', 'b/b1', 'b/b2', 'b/b2/b21', 'b/b2/b22']
+    assert [t.slug for t in snapshot.ancestors_or_self('a/aa/b2/b21')] == ['a', 'a/aa', 'a/aa/b2', 'a/aa/b2/b21']
+    assert snapshot.ancestors('a') == []
+
+
+@pytest.mark.parametrize('app', [{'FLASK_TAXONOMIES_CHANGE_LOG': True}], indirect=['app'])
+def binary_snapshot_reload_test(app, api, sample_taxonomy, tmpdir):
+    app.config['FLASK_TAXONOMIES_BINARY_SNAPSHOT_DIR'] = str(tmpdir)
+    app.config['FLASK_TAXONOMIES_BINARY_SNAPSHOT_CHECK_INTERVAL'] = 0
+    assert api.binary_snapshot('test') is None
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['taxonomies', 'binary-snapshot'])
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith('test: written version')
+    snapshot = api.binary_snapshot('test')
+    assert snapshot.filter_term('a').extra_data == {'title': 'A'}
+    assert api.binary_snapshot('test') is snapshot
+
+    # unchanged taxonomy is not written again
+    assert runner.invoke(args=['taxonomies', 'binary-snapshot', 'test']).output == 'test: up to date\n'
+
+    api.update_term(TermIdentification(taxonomy='test', slug='a'), extra_data={'title': 'A changed'})
+    api.commit()
+    result = runner.invoke(args=['taxonomies', 'binary-snapshot', 'test'])
+    assert 'written' in result.output
+    new_snapshot = api.binary_snapshot('test')
+    assert new_snapshot is not snapshot and new_snapshot.version > snapshot.version
+    assert new_snapshot.filter_term('a').extra_data == {'title': 'A changed'}
+    # the old snapshot stays usable
+    assert snapshot.filter_term('a').extra_data == {'title': 'A'}
+    assert sorted(os.listdir(str(tmpdir))) == ['test.taxsnap']
+
+    assert runner.invoke(args=['taxonomies', 'binary-snapshot', 'unknown']).exit_code == 2
+
+
+def binary_snapshot_invalid_file_test(tmpdir):
+    path = tmpdir.join('broken.taxsnap')
+    path.write('not a snapshot at all, but long enough to contain a header' * 3)
+    with pytest.raises(TaxonomyError):
+        TaxonomySnapshot(str(path))
+    assert SnapshotRegistry(str(tmpdir)).get('missing') is None
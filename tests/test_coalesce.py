@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from flask_taxonomies.cache import SingleFlight
+
+
+def single_flight_test():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    threads = [threading.Thread(target=lambda: results.append(single_flight.do('key', compute)))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    # wait until all the other threads wait for the first one
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        call = single_flight._calls.get('key')
+        if call is not None and call.waiters == 4:
+            break
+        time.sleep(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(results) == 5 and all(r is results[0] for r in results)
+    assert single_flight._calls == {}
+
+    # finished computations are not remembered
+    assert single_flight.do('key', lambda: 1) == 1
+
+
+def single_flight_failure_test():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def fail():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        raise ValueError()
+
+    def run():
+        try:
+            single_flight.do('key', fail)
+        except ValueError as e:
+            results.append(e)
+
+    leader = threading.Thread(target=run)
+    leader.start()
+    started.wait(5)
+    waiters = [threading.Thread(target=run) for _ in range(3)]
+    for t in waiters:
+        t.start()
+    while single_flight._calls['key'].waiters < 3:
+        time.sleep(0.01)
+    release.set()
+    leader.join()
+    for t in waiters:
+        t.join()
+    # the waiting callers get the exception of the first one without running the computation again
+    assert len(calls) == 1
+    assert len(results) == 4 and all(r is results[0] for r in results)
+    assert single_flight._calls == {}
+
+
+@pytest.mark.parametrize('app', [
+    {
+        'FLASK_TAXONOMIES_COALESCE_READS': True
+    }
+], indirect=['app'])
+def coalesced_views_test(api, client, deep_taxonomy, monkeypatch):
+    keys = []
+    do = api.single_flight.do
+
+    def recording_do(key, func):
+        keys.append(key)
+        return do(key, func)
+
+    monkeypatch.setattr(api.single_flight, 'do', recording_do)
+
+    resp = client.get('/api/2.0/taxonomies/deep?representation:include=dsc&size=2&page=1')
+    assert resp.status_code == 200
+    assert resp.headers['X-Total'] == '9'
+    assert resp.json['children'][0]['children'][0]['title'] == 'AA'
+
+    resp = client.get('/api/2.0/taxonomies/deep/b?representation:include=dsc')
+    assert resp.status_code == 200
+    assert resp.json['children'][1]['children'][0]['title'] == 'B21'
+
+    resp = client.get('/api/2.0/taxonomies/deep/b?representation:include=dsc,id&representation:exclude=id')
+    assert resp.status_code == 200
+
+    resp = client.get('/api/2.0/taxonomies/deep/unknown?representation:include=dsc')
+    assert resp.status_code == 404
+
+    # requests without descendants are not coalesced
+    resp = client.get('/api/2.0/taxonomies/deep/b')
+    assert resp.status_code == 200
+
+    assert len(keys) == 4
+    assert keys[0][0] == 'flask_taxonomies.get_taxonomy'
+    assert keys[1][0] == 'flask_taxonomies.get_taxonomy_term'
+    # the effective representation is a part of the key
+    assert keys[1] == keys[2]
+    assert keys[1] != keys[3]
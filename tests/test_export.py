@@ -0,0 +1,138 @@
+import datetime
+import io
+import json
+
+import pytest
+
+from flask_taxonomies.exporter import export_changes, export_terms, iter_terms
+from flask_taxonomies.term_identification import TermIdentification
+from flask_taxonomies.utils import to_json
+
+
+def export_json_test(api, deep_taxonomy):
+    api.move_term(TermIdentification(taxonomy=deep_taxonomy, slug='b/b2'),
+                  new_parent=TermIdentification(taxonomy=deep_taxonomy, slug='a'),
+                  remove_after_delete=False)
+    api.commit()
+    expected = to_json(api, deep_taxonomy)
+
+    for batch_size in (1, 3, 1000):
+        out = io.StringIO()
+        count = export_terms(api, deep_taxonomy, out, batch_size=batch_size)
+        assert json.loads(out.getvalue()) == expected
+        assert count == len(list(iter_terms(api, deep_taxonomy)))
+
+    moved = [x for x in iter_terms(api, deep_taxonomy, batch_size=2) if x['slug'] == 'b/b2/b21']
+    assert moved[0]['obsoleted_by'] == 'a/b2/b21'
+    assert moved[0]['status'] == 'D'
+
+
+def export_json_children_in_data_test(api, test_taxonomy):
+    api.create_term(TermIdentification(taxonomy=test_taxonomy, slug='a'),
+                    extra_data={'children': ['x', 'y'], 'title': 'A'})
+    api.create_term(TermIdentification(taxonomy=test_taxonomy, slug='a/aa'), extra_data={'children': {}})
+    api.commit()
+    out = io.StringIO()
+    assert export_terms(api, test_taxonomy, out) == 2
+    assert json.loads(out.getvalue()) == [
+        {'title': 'A', 'slug': 'a', 'level': 0, 'status': 'A', 'children': [
+            {'slug': 'a/aa', 'level': 1, 'status': 'A', 'children': []}
+        ]}
+    ]
+
+
+def export_ndjson_test(api, sample_taxonomy):
+    out = io.StringIO()
+    assert export_terms(api, sample_taxonomy, out, format='ndjson') == 3
+    assert [json.loads(x) for x in out.getvalue().splitlines()] == [
+        {'title': 'A', 'slug': 'a', 'level': 0, 'status': 'A'},
+        {'title': 'AA', 'slug': 'a/aa', 'level': 1, 'status': 'A'},
+        {'title': 'B', 'slug': 'b', 'level': 0, 'status': 'A'},
+    ]
+
+
+def export_empty_test(api, test_taxonomy):
+    out = io.StringIO()
+    assert export_terms(api, test_taxonomy, out) == 0
+    assert out.getvalue() == '[]'
+
+
+def export_cli_test(app, api, sample_taxonomy, tmpdir):
+    api.delete_term(TermIdentification(taxonomy='test', slug='b'), remove_after_delete=False)
+    api.commit()
+    output = tmpdir.join('out.json')
+    result = app.test_cli_runner(mix_stderr=False).invoke(
+        args=['taxonomies', 'export', 'test', str(output), '--alive-only'])
+    assert result.exit_code == 0, result.output
+    assert json.loads(output.read()) == [
+        {'title': 'A', 'slug': 'a', 'level': 0, 'status': 'A', 'children': [
+            {'title': 'AA', 'slug': 'a/aa', 'level': 1, 'status': 'A', 'children': []}
+        ]}
+    ]
+    assert 'Exported 2 terms' in result.stderr
+
+
+def _last_seq(api, taxonomy):
+    return export_changes(api, taxonomy, io.StringIO(), 0)[1]
+
+
+@pytest.mark.parametrize('app', [{'FLASK_TAXONOMIES_CHANGE_LOG': True}], indirect=['app'])
+def export_changes_test(api, deep_taxonomy):
+    since = _last_seq(api, deep_taxonomy)
+    assert since > 0
+    api.update_term(TermIdentification(taxonomy=deep_taxonomy, slug='a'), extra_data={'title': 'A changed'})
+    api.move_term(TermIdentification(taxonomy=deep_taxonomy, slug='b/b2'),
+                  new_parent=TermIdentification(taxonomy=deep_taxonomy, slug='a'),
+                  remove_after_delete=False)
+    api.delete_term(TermIdentification(taxonomy=deep_taxonomy, slug='a/aa/aaa'))
+    api.commit()
+
+    out = io.StringIO()
+    count, until = export_changes(api, deep_taxonomy, out, since)
+    terms = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert count == len(terms) and until > since
+    assert [(t['slug'], t['status'], t.get('obsoleted_by')) for t in terms] == [
+        ('a', 'A', None),
+        ('a/aa/aaa', 'D', None),  # removed from the database, a tombstone
+        ('a/aa/aaa/aaaa', 'D', None),
+        ('a/b2', 'A', None),
+        ('a/b2/b21', 'A', None),
+        ('a/b2/b22', 'A', None),
+        ('b/b2', 'D', 'a/b2'),
+        ('b/b2/b21', 'D', 'a/b2/b21'),
+        ('b/b2/b22', 'D', 'a/b2/b22'),
+    ]
+    assert terms[0]['title'] == 'A changed'
+
+    out = io.StringIO()
+    assert export_changes(api, deep_taxonomy, out, until, format='json') == (0, until)
+    assert json.loads(out.getvalue()) == {'since': until, 'until': until, 'terms': []}
+
+    # a timestamp in the future selects no changes, one in the past all of them
+    future = (datetime.datetime.utcnow() + datetime.timedelta(hours=1)).isoformat()
+    assert export_changes(api, deep_taxonomy, io.StringIO(), future)[0] == 0
+    assert export_changes(api, deep_taxonomy, io.StringIO(), '2000-01-01T00:00:00+00:00')[0] == 12
+
+
+@pytest.mark.parametrize('app', [{'FLASK_TAXONOMIES_CHANGE_LOG': True}], indirect=['app'])
+def export_changes_cli_and_rest_test(app, api, client, sample_taxonomy):
+    since = _last_seq(api, sample_taxonomy)
+    api.create_term(TermIdentification(taxonomy=sample_taxonomy, slug='c'), extra_data={'title': 'C'})
+    api.commit()
+
+    result = app.test_cli_runner(mix_stderr=False).invoke(
+        args=['taxonomies', 'export', 'test', '--since', str(since), '--format', 'ndjson'])
+    assert result.exit_code == 0, result.output
+    assert [json.loads(x) for x in result.stdout.splitlines()] == [
+        {'slug': 'c', 'level': 0, 'status': 'A', 'title': 'C'}
+    ]
+    assert 'next export --since %s' % (since + 1) in result.stderr
+
+    resp = client.get('/api/2.0/taxonomies/test/_delta?since=%s' % since)
+    assert resp.status_code == 200
+    assert resp.headers['X-Changes-Until'] == str(since + 1)
+    assert resp.json == {'since': since, 'until': since + 1, 'terms': [
+        {'slug': 'c', 'level': 0, 'status': 'A', 'title': 'C'}
+    ]}
+    assert client.get('/api/2.0/taxonomies/test/_delta?since=yesterday').status_code == 400
+    assert client.get('/api/2.0/taxonomies/test/_delta').status_code == 422
@@ -0,0 +1,95 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import mysql, postgresql
+
+from flask_taxonomies.api import TermIdentification
+from flask_taxonomies.fulltext import (
+    create_fulltext_index,
+    drop_fulltext_index,
+    fulltext_query_executor,
+)
+from flask_taxonomies.models import TaxonomyError, TaxonomyTerm
+from flask_taxonomies.query import default_query_parser
+
+
+@pytest.fixture
+def fulltext_index(api, country_taxonomy):
+    create_fulltext_index(api.session)
+    yield
+    api.session.rollback()
+    drop_fulltext_index(api.session)
+    api.session.commit()
+
+
+@pytest.mark.parametrize('app', [
+    {
+        'FLASK_TAXONOMIES_QUERY_EXECUTOR': 'flask_taxonomies.fulltext.fulltext_query_executor'
+    }
+], indirect=['app'])
+def fulltext_query_test(api, fulltext_index):
+    sqlalchemy_query = api.list_taxonomy('country')
+    sqlalchemy_query = api.apply_term_query(sqlalchemy_query, 'Prague', 'country')
+    assert [x.slug for x in sqlalchemy_query] == ['europe/cz']
+
+    # json keys are not indexed
+    sqlalchemy_query = api.list_taxonomy('country')
+    sqlalchemy_query = api.apply_term_query(sqlalchemy_query, 'CapitalName', 'country')
+    assert [x.slug for x in sqlalchemy_query] == []
+
+    # index is kept in sync with term writes
+    api.create_term(TermIdentification(taxonomy='country', slug='europe/xx'),
+                    extra_data={'CountryName': 'Praguestan'})
+    api.update_term(TermIdentification(taxonomy='country', slug='europe/cz'),
+                    extra_data={'CountryName': 'Czechia'})
+    api.session.flush()
+
+    sqlalchemy_query = api.list_taxonomy('country')
+    sqlalchemy_query = api.apply_term_query(sqlalchemy_query, 'Prague', 'country')
+    assert [x.slug for x in sqlalchemy_query] == ['europe/xx']
+
+
+@pytest.mark.parametrize('app', [
+    {
+        'FLASK_TAXONOMIES_QUERY_EXECUTOR': 'flask_taxonomies.fulltext.fulltext_query_executor',
+        'FLASK_TAXONOMIES_FULLTEXT_PATHS': ['CountryName'],
+        'FLASK_TAXONOMIES_FULLTEXT_RANK': True
+    }
+], indirect=['app'])
+def fulltext_paths_test(api, fulltext_index):
+    sqlalchemy_query = api.list_taxonomy('country')
+    sqlalchemy_query = api.apply_term_query(sqlalchemy_query, 'Prague', 'country')
+    assert [x.slug for x in sqlalchemy_query] == []
+
+    sqlalchemy_query = api.list_taxonomy('country')
+    sqlalchemy_query = api.apply_term_query(sqlalchemy_query, 'czech republic', 'country')
+    assert [x.slug for x in sqlalchemy_query] == ['europe/cz']
+
+
+@pytest.mark.parametrize('app', [
+    {
+        'FLASK_TAXONOMIES_QUERY_EXECUTOR': 'flask_taxonomies.fulltext.fulltext_query_executor'
+    }
+], indirect=['app'])
+def fulltext_rest_query_test(client, fulltext_index):
+    terms = client.get('/api/2.0/taxonomies/country/europe?q=Prague',
+                       headers={
+                           'prefer': 'return=minimal; include=dsc; exclude=self'
+                       })
+    assert terms.status_code == 200
+    assert terms.json == [{'slug': 'europe/cz'}]
+
+
+def fulltext_unsupported_database_test(app):
+    with pytest.raises(TaxonomyError):
+        create_fulltext_index(SimpleNamespace(dialect=mysql.dialect()), paths=[], language='simple')
+
+
+def fulltext_postgresql_query_test(app, db):
+    session = SimpleNamespace(bind=SimpleNamespace(dialect=postgresql.dialect()))
+    app.config['FLASK_TAXONOMIES_FULLTEXT_RANK'] = True
+    query = fulltext_query_executor(session, db.session.query(TaxonomyTerm), TaxonomyTerm,
+                                    default_query_parser('prague'))
+    sql = str(query.statement.compile(dialect=postgresql.dialect()))
+    assert 'taxonomy_term.fulltext @@ plainto_tsquery' in sql
+    assert 'ts_rank(taxonomy_term.fulltext, plainto_tsquery' in sql
@@ -0,0 +1,126 @@
+import io
+import json
+
+from flask_taxonomies import importer
+from flask_taxonomies.importer import (
+    check_consistency,
+    import_terms,
+    import_terms_parallel,
+    read_records,
+)
+from flask_taxonomies.models import TaxonomyTerm, TermStatusEnum
+from flask_taxonomies.term_identification import TermIdentification
+
+
+def _terms(api):
+    return {t.slug: t.extra_data for t in api.session.query(TaxonomyTerm)}
+
+
+def import_cli_test(app, api, tmpdir):
+    data = tmpdir.join('countries.csv')
+    data.write('Country,Code,Continent\n'
+               'Czechia,CZ,Europe\n'
+               'Slovakia,SK,Europe\n'
+               'Kenya,KE,Africa\n'
+               'Unknown,,Africa\n')
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['taxonomies', 'import', 'country', str(data),
+                                 '--slug', 'Continent', '--slug', 'Code',
+                                 '--chunk-size', '2', '--title', 'Countries'])
+    assert result.exit_code == 0, result.output
+    assert len(result.output.splitlines()) == 3  # two chunks and the summary
+    assert 'terms/s' in result.output
+    assert api.get_taxonomy('country').extra_data == {'title': 'Countries'}
+    assert _terms(api) == {
+        'europe': None,
+        'europe/cz': {'Country': 'Czechia', 'Code': 'CZ', 'Continent': 'Europe'},
+        'europe/sk': {'Country': 'Slovakia', 'Code': 'SK', 'Continent': 'Europe'},
+        'africa': None,
+        'africa/ke': {'Country': 'Kenya', 'Code': 'KE', 'Continent': 'Africa'},
+    }
+    assert api.session.query(TaxonomyTerm).filter(TaxonomyTerm.slug == 'africa/ke').one().level == 1
+
+    # existing terms are skipped
+    result = runner.invoke(args=['taxonomies', 'import', 'country', str(data),
+                                 '--slug', 'Continent', '--slug', 'Code'])
+    assert result.exit_code == 0, result.output
+    assert 'Done: 0 terms created, 3 skipped, 1 invalid records' in result.output
+
+
+def import_parent_field_test(api, test_taxonomy):
+    records = [
+        {'slug': 'a', 'title': 'A'},
+        {'slug': 'b', 'parent': 'a', 'title': 'B'},
+        {'slug': 'c', 'parent': 'a/b', 'title': 'C'},
+    ]
+    stats = import_terms(test_taxonomy, read_records(io.StringIO(json.dumps(records)), 'json'), ['slug'],
+                         parent_field='parent', chunk_size=1)
+    assert (stats.read, stats.created, stats.chunks) == (3, 3, 3)
+    assert set(_terms(api)) == {'a', 'a/b', 'a/b/c'}
+
+
+def import_ndjson_nested_field_test(api, test_taxonomy):
+    data = io.StringIO('{"id": {"code": "X"}, "title": "x"}\n\n{"id": {"code": "Y"}, "title": "y"}\n')
+    stats = import_terms('test', read_records(data, 'ndjson'), ['id.code'])
+    assert stats.created == 2
+    assert _terms(api) == {'x': {'id': {'code': 'X'}, 'title': 'x'}, 'y': {'id': {'code': 'Y'}, 'title': 'y'}}
+
+
+def import_parallel_test(app, api, test_taxonomy):
+    records = [{'continent': c, 'code': '%s%s' % (c, i)} for c in ('Europe', 'Asia', 'Africa') for i in range(5)]
+    records.append({'continent': 'Asia', 'code': ''})
+    progress = []
+    stats, errors = import_terms_parallel(app, 'test', records, ['continent', 'code'], processes=2,
+                                          chunk_size=2, progress=lambda p, st: progress.append(p))
+    assert errors == {}
+    assert (stats.read, stats.created, stats.invalid) == (16, 18, 1)
+    assert None in progress and len(set(progress)) > 1
+    terms = _terms(api)
+    assert len(terms) == 18
+    assert terms['asia/asia3'] == {'continent': 'Asia', 'code': 'Asia3'}
+    assert check_consistency(test_taxonomy) == []
+
+    term = api.session.query(TaxonomyTerm).filter(TaxonomyTerm.slug == 'asia/asia3').one()
+    term.level = 2
+    api.session.commit()
+    assert check_consistency(test_taxonomy) == ['asia/asia3']
+
+
+def import_parallel_pool_test(app, api, test_taxonomy, monkeypatch):
+    # the test database is a sqlite file, a single worker process does not compete with other writers
+    monkeypatch.setattr(importer, '_concurrent_writers', lambda session: True)
+    monkeypatch.setattr(importer, '_import_partitions', None)  # must not be used
+    records = [{'continent': c, 'code': '%s%s' % (c, i)} for c in ('Europe', 'Asia', 'Africa') for i in range(5)]
+    progress = []
+    stats, errors = import_terms_parallel(app, 'test', records, ['continent', 'code'], processes=1,
+                                          chunk_size=2, progress=lambda p, st: progress.append((p, st.created)))
+    assert errors == {}
+    assert (stats.read, stats.created) == (15, 18)
+    # progress of the worker processes is reported in this process
+    assert len({p for p, _ in progress if p is not None}) > 1
+    api.session.expire_all()
+    terms = _terms(api)
+    assert len(terms) == 18
+    assert terms['africa/africa4'] == {'continent': 'Africa', 'code': 'Africa4'}
+    assert check_consistency(test_taxonomy) == []
+
+
+def import_deleted_terms_test(api, sample_taxonomy):
+    api.delete_term(TermIdentification(taxonomy='test', slug='a'), remove_after_delete=False)
+    api.rename_term(TermIdentification(taxonomy='test', slug='b'), new_slug='renamed', remove_after_delete=False)
+    api.commit()
+    records = [
+        {'slug': 'a', 'title': 'A again'},
+        {'slug': 'ab', 'parent': 'a', 'title': 'AB'},
+        {'slug': 'bb', 'parent': 'b', 'title': 'BB'},
+        {'slug': 'ca', 'parent': 'c', 'title': 'CA'},
+    ]
+    stats = import_terms('test', records, ['slug'], parent_field='parent', chunk_size=2)
+    # deleted terms are not revived and nothing is created below them
+    assert (stats.read, stats.created, stats.skipped, stats.deleted) == (4, 2, 0, 3)
+    terms = api.session.query(TaxonomyTerm).filter(TaxonomyTerm.taxonomy_id == sample_taxonomy.id)
+    assert {t.slug: t.status for t in terms} == {
+        'a': TermStatusEnum.deleted, 'a/aa': TermStatusEnum.deleted,
+        'b': TermStatusEnum.deleted, 'renamed': TermStatusEnum.alive,
+        'c': TermStatusEnum.alive, 'c/ca': TermStatusEnum.alive,
+    }
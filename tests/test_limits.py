@@ -0,0 +1,66 @@
+import pytest
+import sqlalchemy
+from flask import g
+
+from flask_taxonomies.views.limits import RequestLimits
+
+SLOW_QUERY = sqlalchemy.text(
+    'WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000000) '
+    'SELECT count(*) FROM c')
+
+
+def sqlite_statement_timeout_test(app, api):
+    if api.session.bind.dialect.name != 'sqlite':
+        pytest.skip('sqlite only')
+    with app.test_request_context():
+        g.flask_taxonomies_limits = limits = RequestLimits(statement_timeout=200)
+        with pytest.raises(sqlalchemy.exc.OperationalError):
+            api.session.execute(SLOW_QUERY)
+        assert limits.interrupted
+        api.session.rollback()
+        g.pop('flask_taxonomies_limits')
+    # the connection is usable without the timeout
+    assert api.session.execute(sqlalchemy.text('SELECT 1')).scalar() == 1
+
+
+@pytest.mark.parametrize('app', [
+    {
+        'FLASK_TAXONOMIES_ENDPOINT_STATEMENT_TIMEOUTS': {'list_taxonomies': 200}
+    }
+], indirect=['app'])
+def rest_statement_timeout_test(api, client, sample_taxonomy, monkeypatch):
+    list_taxonomies = api.list_taxonomies
+
+    def slow_list_taxonomies(**kwargs):
+        api.read_session.execute(SLOW_QUERY)
+        return list_taxonomies(**kwargs)
+
+    monkeypatch.setattr(api, 'list_taxonomies', slow_list_taxonomies)
+    resp = client.get('/api/2.0/taxonomies/')
+    assert resp.status_code == 503
+    assert resp.json['reason'] == 'statement-timeout'
+    api.read_session.rollback()
+    monkeypatch.undo()
+
+    resp = client.get('/api/2.0/taxonomies/')
+    assert resp.status_code == 200
+
+
+@pytest.mark.parametrize('app', [
+    {
+        'FLASK_TAXONOMIES_ENDPOINT_QUERY_BUDGETS': {'get_taxonomy': 2}
+    }
+], indirect=['app'])
+def rest_query_budget_test(api, client, sample_taxonomy):
+    # taxonomy, descendants and ancestors of a term in the middle of the tree
+    resp = client.get('/api/2.0/taxonomies/test?representation:include=dsc,anh&size=1&page=3')
+    assert resp.status_code == 503
+    assert resp.json['reason'] == 'query-budget-exceeded'
+    assert 'more than 2 SQL statements' in resp.json['message']
+
+    resp = client.get('/api/2.0/taxonomies/test?representation:include=dsc&representation:exclude=anc')
+    assert resp.status_code == 200, resp.data
+    # other endpoints have no budget
+    resp = client.get('/api/2.0/taxonomies/test/a?representation:include=dsc,anh')
+    assert resp.status_code == 200
+    assert 'flask_taxonomies_limits' not in g
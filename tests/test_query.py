@@ -1,6 +1,21 @@
-import pytest
+import warnings
 
-from flask_taxonomies.query import TaxonomyQueryNotSupported
+import pytest
+import sqlalchemy
+from sqlalchemy.dialects import postgresql
+
+from flask_taxonomies.indexes import (
+    create_field_indexes,
+    drop_field_indexes,
+    field_index_expression,
+    field_index_name,
+)
+from flask_taxonomies.models import TaxonomyError, TaxonomyTerm
+from flask_taxonomies.query import (
+    TaxonomyQueryNotSupported,
+    convert_to_postgresql,
+    default_query_parser,
+)
 
 
 def taxonomy_string_query_test(api, sample_taxonomy):
@@ -60,8 +75,8 @@ def term_title_query_test(api, country_taxonomy):
         assert set([x.slug for x in sqlalchemy_query]) == {'europe/cz'}
 
     except TaxonomyQueryNotSupported:
-        # databases other than postgres are not supported for complex query
-        if api.session.bind.dialect.name == 'postgresql':
+        # databases other than postgres and sqlite are not supported for complex query
+        if api.session.bind.dialect.name in ('postgresql', 'sqlite'):
             raise
 
 
@@ -76,3 +91,62 @@ def rest_query_test(client, country_taxonomy):
         'ContinentName': 'Europe',
         'CountryCode': 'CZ', 'CountryName': 'Czech Republic', 'slug': 'europe/cz'
     }]
+
+
+def postgresql_field_expression_test():
+    query = default_query_parser('title.en:Prague').query
+    compiled = str(convert_to_postgresql(TaxonomyTerm.extra_data, query).compile(dialect=postgresql.dialect()))
+    # path is rendered literally so that the expression index can be used
+    assert compiled == "lower(jsonb_extract_path_text(taxonomy_term.extra_data, 'title', 'en')) = %(lower_1)s"
+    assert field_index_expression('title.en', 'postgresql') == \
+           "lower(jsonb_extract_path_text(extra_data, 'title', 'en'))"
+    assert field_index_name('title.en') == 'taxonomy_term_field_title_en'
+    with pytest.raises(TaxonomyError):
+        field_index_expression('title.en', 'mysql')
+
+
+def sqlite_field_index_test(api, country_taxonomy):
+    if api.session.bind.dialect.name != 'sqlite':
+        return
+
+    create_field_indexes(api.session, ['CountryCode'])
+    try:
+        sqlalchemy_query = api.list_taxonomy('country')
+        sqlalchemy_query = api.apply_term_query(sqlalchemy_query, 'CountryCode:cz', 'country')
+        assert [x.slug for x in sqlalchemy_query] == ['europe/cz']
+
+        # without the taxonomy filter, the expression index is the only usable one
+        sqlalchemy_query = api.apply_term_query(api.session.query(TaxonomyTerm), 'CountryCode:cz', 'country')
+        statement = sqlalchemy_query.statement.compile(
+            dialect=api.session.bind.dialect, compile_kwargs={'literal_binds': True})
+        plan = api.session.execute('EXPLAIN QUERY PLAN %s' % statement).fetchall()
+        assert 'taxonomy_term_field_countrycode' in str(plan)
+    finally:
+        drop_field_indexes(api.session, ['CountryCode'])
+
+
+def parsed_query_cache_test():
+    parsed = default_query_parser('CountryCode:CZ', taxonomy_code='country')
+    again = default_query_parser('CountryCode:CZ', taxonomy_code='country')
+    assert again is not parsed and again.query is not parsed.query
+    assert str(again.query) == str(parsed.query)
+    assert default_query_parser('CountryCode:CZ', taxonomy_code='other').taxonomy_code == 'other'
+
+    # modifying a returned query does not change the cached one
+    parsed.query.expr.value = 'SK'
+    assert str(default_query_parser('CountryCode:CZ').query) == 'CountryCode:CZ'
+
+
+def slug_comparison_compiled_cache_test(api, sample_taxonomy):
+    compiled_cache = {}
+    results = []
+    with warnings.catch_warnings():
+        # sqlalchemy warns when an element can not be part of the cache key
+        warnings.simplefilter('error', sqlalchemy.exc.SAWarning)
+        for slug in ('a', 'b'):
+            stmt = sqlalchemy.select(TaxonomyTerm.slug).where(TaxonomyTerm.slug.descendant_of(slug))
+            results.append([x for x, in api.session.execute(
+                stmt, execution_options={'compiled_cache': compiled_cache})])
+    assert results == [['a', 'a/aa'], ['b']]
+    # the second statement has been served from the compiled cache
+    assert len(compiled_cache) == 1
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+from flask import g
+from flask_sqlalchemy import get_state
+
+from flask_taxonomies.models import Base, Taxonomy, TaxonomyTerm
+from flask_taxonomies.term_identification import TermIdentification
+
+
+@pytest.fixture
+def replica(app, api, tmpdir):
+    app.config['SQLALCHEMY_BINDS'] = {'replica': 'sqlite:///' + str(tmpdir.join('replica.sqlite3'))}
+    app.config['FLASK_TAXONOMIES_READ_BIND'] = 'replica'
+    engine = get_state(app).db.get_engine(app, bind='replica')
+    Base.metadata.create_all(engine)
+    yield api.read_bind_session
+    api.remove_read_sessions()
+    engine.dispose()
+
+
+def read_bind_test(app, api, client, sample_taxonomy, replica):
+    api.use_read_copy()
+    assert api.read_session is replica
+    taxonomy = Taxonomy(code='test', extra_data={'title': 'Replica'})
+    replica.add(taxonomy)
+    replica.flush()
+    replica.add(TaxonomyTerm(slug='r', level=0, taxonomy_id=taxonomy.id, taxonomy_code='test',
+                             extra_data={'title': 'R'}))
+    replica.commit()
+
+    # reads are served by the replica
+    assert [x.code for x in api.list_taxonomies()] == ['test']
+    assert client.get('/api/2.0/taxonomies/test').json['title'] == 'Replica'
+    assert client.get('/api/2.0/taxonomies/test/r').json['title'] == 'R'
+    assert client.get('/api/2.0/taxonomies/test/a').status_code == 404
+
+    # writes and the reads they make use the primary database
+    resp = client.put('/api/2.0/taxonomies/test/c', data=json.dumps({'title': 'C'}),
+                      content_type='application/json')
+    assert resp.status_code == 201
+    assert resp.json['title'] == 'C'
+    assert api.session.query(TaxonomyTerm).filter(TaxonomyTerm.slug == 'c').one().extra_data == {'title': 'C'}
+    assert api.read_session is api.session
+
+    g.pop('flask_taxonomies_primary')  # tests share the application context among requests
+    assert client.get('/api/2.0/taxonomies/test/c').status_code == 404
+
+
+def read_bind_not_used_by_default_test(app, api, sample_taxonomy, replica):
+    # outside of read requests, reads see the writes made before and return terms usable for writes
+    assert api.read_session is api.session
+    term = api.filter_term(TermIdentification(taxonomy='test', slug='a')).one()
+    api.update_term(term, extra_data={'title': 'A changed'})
+    assert api.filter_term(TermIdentification(taxonomy='test', slug='a')).one().extra_data == {'title': 'A changed'}
+    api.commit()
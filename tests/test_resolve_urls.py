@@ -0,0 +1,26 @@
+from flask_taxonomies.term_identification import TermIdentification
+
+
+def resolve_urls_test(api, sample_taxonomy):
+    api.create_term(TermIdentification(taxonomy='test', slug='c'))
+    api.delete_term(TermIdentification(taxonomy='test', slug='c'), remove_after_delete=False)
+    api.rename_term(TermIdentification(taxonomy='test', slug='b'), new_slug='bb', remove_after_delete=False)
+    api.rename_term(TermIdentification(taxonomy='test', slug='bb'), new_slug='bbb', remove_after_delete=False)
+
+    urls = [
+        'http://localhost/api/2.0/taxonomies/test/a/aa',
+        'http://localhost/api/2.0/taxonomies/test/b',
+        'http://localhost/api/2.0/taxonomies/test/c',
+        'http://localhost/api/2.0/taxonomies/test/unknown',
+        'http://localhost/api/2.0/taxonomies/unknown/a',
+        'http://localhost/not-a-taxonomy/a',
+    ]
+    resolved = api.resolve_urls(urls, chunk_size=1)
+    assert {k: v.slug if v else None for k, v in resolved.items()} == {
+        'http://localhost/api/2.0/taxonomies/test/a/aa': 'a/aa',
+        'http://localhost/api/2.0/taxonomies/test/b': 'bbb',
+        'http://localhost/api/2.0/taxonomies/test/c': None,
+        'http://localhost/api/2.0/taxonomies/test/unknown': None,
+        'http://localhost/api/2.0/taxonomies/unknown/a': None,
+        'http://localhost/not-a-taxonomy/a': None,
+    }
@@ -0,0 +1,70 @@
+import json
+
+from flask_taxonomies.models import TaxonomyTerm, TermStatusEnum
+from flask_taxonomies.term_identification import TermIdentification
+
+
+def _batch(client, payload, url='/api/2.0/taxonomies/_batch', prefer='return=minimal'):
+    return client.post(url, data=json.dumps(payload), content_type='application/json',
+                       headers={'prefer': prefer})
+
+
+def batch_test(api, client, sample_taxonomy):
+    resp = _batch(client, [
+        {'op': 'create', 'term': 'test/c', 'data': {'title': 'C'}},
+        {'op': 'create', 'term': 'http://localhost/api/2.0/taxonomies/test/c/ca', 'data': {}},
+        {'op': 'update', 'term': 'test/a', 'data': {'title': 'A'}},
+        {'op': 'patch', 'term': 'test/c', 'patch': [{'op': 'add', 'path': '/code', 'value': 'c'}]},
+        {'op': 'move', 'term': 'test/c', 'destination': 'b'},
+        {'op': 'delete', 'term': 'test/a/aa'},
+    ])
+    assert resp.status_code == 200
+    assert [(x['op'], x['status']) for x in resp.json] == [
+        ('create', 201), ('create', 201), ('update', 200), ('patch', 200), ('move', 200), ('delete', 200)
+    ]
+    assert resp.json[4]['data'] == {'slug': 'b/c'}
+
+    terms = {t.slug: t for t in api.session.query(TaxonomyTerm)}
+    assert terms['b/c'].status == TermStatusEnum.alive
+    assert terms['b/c'].extra_data == {'title': 'C', 'code': 'c'}
+    assert terms['b/c/ca'].status == TermStatusEnum.alive
+    assert terms['c'].status == TermStatusEnum.deleted
+    assert terms['a'].extra_data == {'title': 'A'}
+    assert terms['a/aa'].status == TermStatusEnum.deleted
+
+
+def batch_atomic_test(api, client, sample_taxonomy):
+    resp = _batch(client, [
+        {'op': 'create', 'term': 'c', 'data': {}},
+        {'op': 'create', 'term': 'a', 'data': {}},
+        {'op': 'delete', 'term': 'b'},
+    ], url='/api/2.0/taxonomies/test/_batch')
+    assert resp.status_code == 409
+    assert [(x['status'], x['reason']) for x in resp.json] == [
+        (424, 'rolled-back'), (409, 'term-exists'), (424, 'not-executed')
+    ]
+    assert api.filter_term(TermIdentification(taxonomy='test', slug='c')).count() == 0
+    assert api.filter_term(TermIdentification(taxonomy='test', slug='b')).count() == 1
+
+    resp = _batch(client, {
+        'atomic': False,
+        'operations': [
+            {'op': 'create', 'term': 'c', 'data': {}},
+            {'op': 'patch', 'term': 'unknown', 'patch': []},
+            {'op': 'create', 'term': 'c/ca', 'data': {}},
+        ]
+    }, url='/api/2.0/taxonomies/test/_batch', prefer='return=none')
+    assert resp.status_code == 200
+    assert [x['status'] for x in resp.json] == [201, 404, 201]
+    assert resp.json[2]['location'] == 'http://localhost/api/2.0/taxonomies/test/c/ca'
+    assert api.filter_term(TermIdentification(taxonomy='test', slug='c/ca')).count() == 1
+
+
+def batch_invalid_payload_test(api, client, sample_taxonomy):
+    resp = _batch(client, {'op': 'create'})
+    assert resp.status_code == 400
+    assert resp.json['reason'] == 'invalid-payload'
+
+    resp = _batch(client, [{'op': 'unknown', 'term': 'test/a'}])
+    assert resp.status_code == 409
+    assert resp.json[0]['reason'] == 'unknown-operation'
@@ -0,0 +1,106 @@
+import pytest
+from flask_principal import Permission, UserNeed
+
+from flask_taxonomies.models import TaxonomyTerm
+from flask_taxonomies.term_identification import TermIdentification
+
+
+def _changes(client, url='/api/2.0/taxonomies/_changes', **params):
+    resp = client.get(url, query_string=params)
+    assert resp.status_code == 200
+    return resp.json
+
+
+def _ops(changes):
+    return [(x['taxonomy'], x['slug'], x['operation'], x.get('target_slug')) for x in changes['changes']]
+
+
+@pytest.mark.parametrize('app', [{'FLASK_TAXONOMIES_CHANGE_LOG': True}], indirect=['app'])
+def changes_test(api, client, sample_taxonomy):
+    resp = _changes(client)
+    assert _ops(resp) == [('test', 'b', 'created', None), ('test', 'a', 'created', None),
+                          ('test', 'a/aa', 'created', None)]
+    assert resp['has_more'] is False
+    since = resp['next']
+    assert since == resp['changes'][-1]['seq']
+
+    ti = TermIdentification(taxonomy='test', slug='a')
+    api.update_term(ti, extra_data={'title': 'A'})
+    api.move_term(ti, new_parent=TermIdentification(taxonomy='test', slug='b'), remove_after_delete=False)
+    api.delete_term(TermIdentification(taxonomy='test', slug='b/a/aa'))
+    api.commit()
+
+    resp = _changes(client, since=since)
+    assert _ops(resp) == [
+        ('test', 'a', 'updated', None),
+        ('test', 'a', 'moved', 'b/a'),
+        ('test', 'a/aa', 'moved', 'b/a/aa'),
+        ('test', 'b/a/aa', 'deleted', None),
+    ]
+    seqs = [x['seq'] for x in resp['changes']]
+    assert seqs == sorted(seqs) and seqs[0] > since
+
+    # terms removed from the database stay in the log
+    assert api.session.query(TaxonomyTerm).filter(TaxonomyTerm.slug == 'b/a/aa').count() == 0
+    assert _changes(client, since=resp['next']) == {'changes': [], 'next': resp['next'], 'has_more': False}
+
+
+@pytest.mark.parametrize('app', [{'FLASK_TAXONOMIES_CHANGE_LOG': True}], indirect=['app'])
+def changes_limit_test(api, client, sample_taxonomy):
+    api.create_taxonomy('other')
+    api.create_term(TermIdentification(taxonomy='other', slug='x'))
+    api.commit()
+
+    resp = _changes(client, limit=2)
+    assert len(resp['changes']) == 2 and resp['has_more'] is True
+    resp = _changes(client, since=resp['next'], limit=2)
+    assert _ops(resp) == [('test', 'a/aa', 'created', None), ('other', 'x', 'created', None)]
+    assert resp['has_more'] is False
+
+    assert _ops(_changes(client, url='/api/2.0/taxonomies/other/_changes')) == [('other', 'x', 'created', None)]
+    assert client.get('/api/2.0/taxonomies/unknown/_changes').status_code == 404
+    assert client.get('/api/2.0/taxonomies/_changes?since=-1').status_code == 422
+
+
+@pytest.mark.parametrize('app', [{'FLASK_TAXONOMIES_CHANGE_LOG': True}], indirect=['app'])
+def changes_bulk_and_sync_test(api, client, sample_taxonomy):
+    api.bulk_create_terms('test', [('c', {}), ('c/ca', {})])
+    api.sync_taxonomy('test', [{'slug': 'a', 'title': 'A', 'children': [{'slug': 'aa'}]}, {'slug': 'c'}])
+    api.commit()
+    assert _ops(_changes(client))[3:] == [
+        ('test', 'c', 'created', None),
+        ('test', 'c/ca', 'created', None),
+        ('test', 'a/aa', 'updated', None),
+        ('test', 'b', 'deleted', None),
+        ('test', 'c/ca', 'deleted', None),
+    ]
+
+
+@pytest.mark.parametrize('app', [{'FLASK_TAXONOMIES_CHANGE_LOG': False}], indirect=['app'])
+def changes_disabled_test(api, client, sample_taxonomy):
+    assert _changes(client)['changes'] == []
+
+
+def _read_test_taxonomy(request, taxonomy):
+    if taxonomy.code == 'test':
+        return [Permission(UserNeed('admin'))]
+    return []
+
+
+@pytest.mark.parametrize('app', [{
+    'FLASK_TAXONOMIES_CHANGE_LOG': True,
+    'FLASK_TAXONOMIES_PERMISSION_FACTORIES': {
+        'taxonomy_read': _read_test_taxonomy
+    }
+}], indirect=['app'])
+def changes_permissions_test(api, client, sample_taxonomy):
+    api.create_taxonomy('other')
+    api.create_term(TermIdentification(taxonomy='other', slug='x'))
+    api.commit()
+
+    # changes of taxonomies the caller can not read are left out
+    assert _ops(_changes(client)) == [('other', 'x', 'created', None)]
+    assert client.get('/api/2.0/taxonomies/test/_changes').status_code == 403
+
+    client.post('/login', json={'username': 'admin'})
+    assert len(_changes(client)['changes']) == 4
@@ -0,0 +1,83 @@
+from flask_taxonomies.term_identification import TermIdentification
+
+
+def mget_test(api, client, sample_taxonomy):
+    api.create_term(TermIdentification(taxonomy='test', slug='c'), extra_data={'title': 'C'})
+    api.delete_term(TermIdentification(taxonomy='test', slug='c'), remove_after_delete=False)
+    api.commit()
+
+    resp = client.post('/api/2.0/taxonomies/_mget', json=[
+        'http://localhost/api/2.0/taxonomies/test/a/aa',
+        'test/b',
+        'test/unknown',
+        'test/c',
+        'unknown/a',
+        'http://localhost/something/else'
+    ])
+    assert resp.status_code == 200
+    assert resp.json == [
+        {
+            'ref': 'http://localhost/api/2.0/taxonomies/test/a/aa',
+            'status': 200,
+            'data': {
+                'title': 'AA',
+                'links': {'self': 'http://localhost/api/2.0/taxonomies/test/a/aa'},
+                'ancestors': [{
+                    'title': 'A',
+                    'links': {'self': 'http://localhost/api/2.0/taxonomies/test/a'}
+                }]
+            }
+        },
+        {
+            'ref': 'test/b',
+            'status': 200,
+            'data': {
+                'title': 'B',
+                'links': {'self': 'http://localhost/api/2.0/taxonomies/test/b'}
+            }
+        },
+        {'ref': 'test/unknown', 'status': 404, 'reason': 'does-not-exist'},
+        {'ref': 'test/c', 'status': 410, 'reason': 'deleted'},
+        {'ref': 'unknown/a', 'status': 404, 'reason': 'does-not-exist'},
+        {
+            'ref': 'http://localhost/something/else',
+            'status': 400,
+            'message': 'Url http://localhost/something/else does not start with FLASK_TAXONOMIES_URL_PREFIX',
+            'reason': 'invalid-reference'
+        }
+    ]
+
+
+def mget_in_taxonomy_test(api, client, sample_taxonomy):
+    api.rename_term(TermIdentification(taxonomy='test', slug='b'), new_slug='bb', remove_after_delete=False)
+    api.commit()
+
+    resp = client.post('/api/2.0/taxonomies/test/_mget', json=['a', 'b'],
+                       headers={'prefer': 'return=minimal'})
+    assert resp.status_code == 200
+    assert resp.json == [
+        {'ref': 'a', 'status': 200, 'data': {'slug': 'a'}},
+        {
+            'ref': 'b',
+            'status': 301,
+            'links': {
+                'self': 'http://localhost/api/2.0/taxonomies/test/b',
+                'obsoleted_by': 'http://localhost/api/2.0/taxonomies/test/bb'
+            }
+        }
+    ]
+
+
+def mget_invalid_payload_test(api, client, sample_taxonomy):
+    resp = client.post('/api/2.0/taxonomies/_mget', json={'a': 1})
+    assert resp.status_code == 400
+
+
+def mget_ancestors_representation_test(api, client, sample_taxonomy):
+    for include in ('anc', 'anl', 'anh'):
+        url = 'http://localhost/api/2.0/taxonomies/test/a/aa?representation:include=' + include
+        resp = client.post('/api/2.0/taxonomies/_mget?representation:include=' + include,
+                           json=['http://localhost/api/2.0/taxonomies/test/a/aa'])
+        assert resp.status_code == 200
+        assert resp.json[0]['status'] == 200
+        assert resp.json[0]['data'] == client.get(url).json
@@ -2,6 +2,8 @@ import json
 
 from link_header import Link, LinkHeader, parse
 
+from flask_taxonomies.term_identification import TermIdentification
+
 
 def links2dict(links):
     return {
@@ -74,3 +76,22 @@ def term_move_to_element_test(api, client, sample_taxonomy):
         },
         'status': 'moved'
     }
+
+
+def term_moved_twice_test(api, client, sample_taxonomy):
+    api.rename_term(TermIdentification(taxonomy='test', slug='b'), new_slug='bb', remove_after_delete=False)
+    api.rename_term(TermIdentification(taxonomy='test', slug='bb'), new_slug='bbb', remove_after_delete=False)
+    api.commit()
+
+    resp = client.get('/api/2.0/taxonomies/test/b')
+    assert resp.status_code == 301
+    # redirect goes straight to the final term, not through the intermediate one
+    assert resp.headers['Location'] == 'http://localhost/api/2.0/taxonomies/test/bbb'
+    assert json.loads(resp.data)['links']['obsoleted_by'] == 'http://localhost/api/2.0/taxonomies/test/bbb'
+    assert '<http://localhost/api/2.0/taxonomies/test/bbb>; rel=obsoleted_by' in resp.headers['Link']
+    assert '/test/bb>' not in resp.headers['Link']
+
+    api.delete_term(TermIdentification(taxonomy='test', slug='bbb'), remove_after_delete=False)
+    api.commit()
+    resp = client.get('/api/2.0/taxonomies/test/b')
+    assert resp.status_code == 410
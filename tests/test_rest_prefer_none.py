@@ -0,0 +1,72 @@
+import json
+
+from sqlalchemy import event
+
+
+def term_prefer_none_test(api, client, sample_taxonomy):
+    statements = []
+
+    def count(*args, **kwargs):
+        statements.append(args[2])
+
+    event.listen(api.session.bind, 'before_cursor_execute', count)
+    try:
+        resp = client.put('/api/2.0/taxonomies/test/c', data=json.dumps({'title': 'c'}),
+                          content_type='application/json', headers={'prefer': 'return=none'})
+    finally:
+        event.remove(api.session.bind, 'before_cursor_execute', count)
+    assert resp.status_code == 201
+    assert resp.data == b''
+    assert resp.headers['Location'] == 'http://localhost/api/2.0/taxonomies/test/c'
+    # nothing is read back after the insert
+    assert not any(x.lstrip().upper().startswith('SELECT') for x in statements[-2:])
+
+    resp = client.put('/api/2.0/taxonomies/test/c', data=json.dumps({'title': 'cc'}),
+                      content_type='application/json', headers={'prefer': 'return=none'})
+    assert resp.status_code == 204
+    assert resp.headers['Location'] == 'http://localhost/api/2.0/taxonomies/test/c'
+
+    resp = client.patch('/api/2.0/taxonomies/test/c',
+                        data=json.dumps([{'op': 'replace', 'path': '/title', 'value': 'ccc'}]),
+                        content_type='application/json-patch+json', headers={'prefer': 'return=none'})
+    assert resp.status_code == 204
+
+    resp = client.post('/api/2.0/taxonomies/test/c', headers={
+        'Destination': '/a',
+        'Content-Type': 'application/vnd.move',
+        'prefer': 'return=none'
+    })
+    assert resp.status_code == 204
+    assert resp.headers['Location'] == 'http://localhost/api/2.0/taxonomies/test/a/c'
+
+    resp = client.get('/api/2.0/taxonomies/test/a/c')
+    assert resp.json['title'] == 'ccc'
+
+
+def term_written_representation_test(api, client, sample_taxonomy):
+    resp = client.put('/api/2.0/taxonomies/test/a/ab', data=json.dumps({'title': 'ab'}),
+                      content_type='application/json', headers={'prefer': 'return=representation; include=anc'})
+    assert resp.status_code == 201
+    assert resp.json == client.get('/api/2.0/taxonomies/test/a/ab',
+                                   headers={'prefer': 'return=representation; include=anc'}).json
+
+    resp = client.patch('/api/2.0/taxonomies/test/a/ab',
+                        data=json.dumps([{'op': 'add', 'path': '/code', 'value': 'x'}]),
+                        content_type='application/json-patch+json')
+    assert resp.status_code == 200
+    assert resp.json == client.get('/api/2.0/taxonomies/test/a/ab').json
+
+
+def taxonomy_prefer_none_test(api, client, sample_taxonomy):
+    resp = client.put('/api/2.0/taxonomies/new', data=json.dumps({'title': 'new'}),
+                      content_type='application/json', headers={'prefer': 'return=none'})
+    assert resp.status_code == 201
+    assert resp.data == b''
+    assert resp.headers['Location'] == 'http://localhost/api/2.0/taxonomies/new/'
+
+    resp = client.patch('/api/2.0/taxonomies/new',
+                        data=json.dumps([{'op': 'replace', 'path': '/title', 'value': 'newer'}]),
+                        content_type='application/json-patch+json')
+    assert resp.status_code == 200
+    assert resp.json == client.get('/api/2.0/taxonomies/new').json
+    assert resp.json['title'] == 'newer'
@@ -0,0 +1,68 @@
+import pytest
+
+from flask_taxonomies.models import TaxonomyTerm
+from flask_taxonomies.term_identification import TermIdentification
+
+
+def term_not_found_test(api, client, sample_taxonomy):
+    resp = client.get('/api/2.0/taxonomies/test/unknown')
+    assert resp.status_code == 404
+    assert resp.json['reason'] == 'does-not-exist'
+
+    api.delete_term(TermIdentification(taxonomy='test', slug='b'), remove_after_delete=False)
+    api.commit()
+    resp = client.get('/api/2.0/taxonomies/test/b')
+    assert resp.status_code == 410
+
+    resp = client.get('/api/2.0/taxonomies/test/b', headers={'prefer': 'return=minimal; include=del'})
+    assert resp.status_code == 200
+    assert resp.json == {'slug': 'b'}
+
+
+@pytest.mark.parametrize('app', [
+    {
+        'FLASK_TAXONOMIES_NEGATIVE_CACHE_TTL': 60
+    }
+], indirect=['app'])
+def term_negative_cache_test(api, client, sample_taxonomy):
+    resp = client.get('/api/2.0/taxonomies/test/c')
+    assert resp.status_code == 404
+
+    # a term inserted behind the api's back is not seen until the cache entry expires
+    api.session.add(TaxonomyTerm(slug='c', level=0, taxonomy_id=sample_taxonomy.id, taxonomy_code='test'))
+    api.commit()
+    resp = client.get('/api/2.0/taxonomies/test/c')
+    assert resp.status_code == 404
+    api.negative_cache.clear()
+    resp = client.get('/api/2.0/taxonomies/test/c')
+    assert resp.status_code == 200
+
+    # terms created through the api invalidate the cache immediately
+    resp = client.get('/api/2.0/taxonomies/test/d')
+    assert resp.status_code == 404
+    api.create_term(TermIdentification(taxonomy='test', slug='d'))
+    api.commit()
+    resp = client.get('/api/2.0/taxonomies/test/d')
+    assert resp.status_code == 200
+
+
+@pytest.mark.parametrize('app', [
+    {
+        'FLASK_TAXONOMIES_NEGATIVE_CACHE_TTL': 60
+    }
+], indirect=['app'])
+def term_negative_cache_discarded_on_commit_test(api, client, sample_taxonomy):
+    api.create_term(TermIdentification(taxonomy='test', slug='c'))
+    # a concurrent request has not seen the uncommitted term
+    api.negative_cache.add(('test', 'c'), 60)
+    api.commit()
+    assert ('test', 'c') not in api.negative_cache
+    resp = client.get('/api/2.0/taxonomies/test/c')
+    assert resp.status_code == 200
+
+    # nothing is discarded after a rollback
+    api.create_term(TermIdentification(taxonomy='test', slug='d'))
+    api.session.rollback()
+    api.negative_cache.add(('test', 'd'), 60)
+    api.commit()
+    assert ('test', 'd') in api.negative_cache
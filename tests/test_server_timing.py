@@ -0,0 +1,43 @@
+import logging
+import re
+
+import pytest
+
+
+def _metrics(header):
+    return {m.group(1): m.group(3) for m in re.finditer(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', header)}
+
+
+@pytest.mark.parametrize('app', [
+    {
+        'FLASK_TAXONOMIES_SERVER_TIMING': True
+    }
+], indirect=['app'])
+def server_timing_test(api, client, deep_taxonomy, caplog):
+    with caplog.at_level(logging.INFO, logger='flask_taxonomies.timing'):
+        resp = client.get('/api/2.0/taxonomies/deep?representation:include=dsc&size=2')
+    assert resp.status_code == 200
+    metrics = _metrics(resp.headers['Server-Timing'])
+    assert set(metrics) == {'lookup', 'perm', 'count', 'query', 'build', 'encode', 'sql', 'total'}
+    # taxonomy, count and the page of terms
+    assert metrics['sql'] == '3 statements'
+
+    records = [r.getMessage() for r in caplog.records if r.name == 'flask_taxonomies.timing']
+    assert len(records) == 1
+    assert records[0].startswith('GET /api/2.0/taxonomies/deep?representation:include=dsc&size=2 200 lookup=')
+    assert 'sql=' in records[0] and '(3 statements)' in records[0]
+
+    resp = client.get('/api/2.0/taxonomies/deep/a/aa')
+    metrics = _metrics(resp.headers['Server-Timing'])
+    assert {'lookup', 'perm', 'query', 'build', 'encode'} <= set(metrics)
+    assert 'count' not in metrics
+
+    # statements outside of requests are not timed
+    api.list_taxonomies().all()
+    assert 'flask_taxonomies_statement_start' not in api.session.connection().info
+
+
+def server_timing_disabled_test(api, client, deep_taxonomy):
+    resp = client.get('/api/2.0/taxonomies/deep?representation:include=dsc')
+    assert resp.status_code == 200
+    assert 'Server-Timing' not in resp.headers
@@ -0,0 +1,62 @@
+import os
+import stat
+
+import pytest
+from flask import g
+
+from flask_taxonomies.models import TaxonomyError
+from flask_taxonomies.snapshot import write_snapshot
+from flask_taxonomies.term_identification import TermIdentification
+
+
+def _use_snapshot(app, api, path):
+    app.config['FLASK_TAXONOMIES_SNAPSHOT'] = path
+    api.__dict__.pop('snapshot_session', None)
+
+
+def snapshot_cli_test(app, api, sample_taxonomy, tmpdir):
+    api.create_taxonomy('other')
+    api.commit()
+    path = str(tmpdir.join('taxonomies.sqlite3'))
+    result = app.test_cli_runner().invoke(args=['taxonomies', 'snapshot', path, 'test'])
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith('Written 1 taxonomies with 3 terms')
+    assert not os.stat(path).st_mode & stat.S_IWUSR
+    assert os.listdir(str(tmpdir)) == ['taxonomies.sqlite3']
+
+    result = app.test_cli_runner().invoke(args=['taxonomies', 'snapshot', path, 'unknown'])
+    assert result.exit_code == 2
+    with pytest.raises(TaxonomyError):
+        write_snapshot(path, codes=['unknown'])
+
+
+def snapshot_reads_test(app, api, client, sample_taxonomy, tmpdir):
+    path = str(tmpdir.join('taxonomies.sqlite3'))
+    write_snapshot(path)
+    _use_snapshot(app, api, path)
+
+    assert api.read_session is api.session
+    api.use_read_copy()
+    assert api.read_session is api.snapshot_session
+    slugs = [t.slug for t in api.descendants_or_self(TermIdentification(taxonomy='test', slug='a'))]
+    assert slugs == ['a', 'a/aa']
+    assert [t.slug for t in api.ancestors(TermIdentification(taxonomy='test', slug='a/aa'))] == ['a']
+
+    # a change in the primary database is not visible until a new snapshot is written
+    api.update_term(TermIdentification(taxonomy='test', slug='a'), extra_data={'title': 'A changed'},
+                    session=api.session)
+    api.commit()
+    api.remove_read_sessions()
+    assert client.get('/api/2.0/taxonomies/test/a').json['title'] == 'A'
+
+    write_snapshot(path)
+    api.remove_read_sessions()  # done at the end of each request outside of tests
+    assert client.get('/api/2.0/taxonomies/test/a').json['title'] == 'A changed'
+
+    # writes go to the primary database and the response is read from there
+    resp = client.patch('/api/2.0/taxonomies/test/a', json=[{'op': 'replace', 'path': '/title', 'value': 'A2'}],
+                        content_type='application/json-patch+json')
+    assert resp.status_code == 200
+    assert resp.json['title'] == 'A2'
+    g.pop('flask_taxonomies_primary')  # tests share the application context among requests
+    assert client.get('/api/2.0/taxonomies/test/a').json['title'] == 'A changed'
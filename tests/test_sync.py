@@ -0,0 +1,216 @@
+import json
+
+import pytest
+from flask_principal import Permission, UserNeed
+
+from flask_taxonomies.models import (
+    TaxonomyError,
+    TaxonomyTerm,
+    TaxonomyTermBusyError,
+    TermStatusEnum,
+)
+from flask_taxonomies.utils import to_json
+
+
+def _terms(api, taxonomy):
+    return {
+        t.slug: (t.status, t.extra_data, t.level)
+        for t in api.session.query(TaxonomyTerm).filter(TaxonomyTerm.taxonomy_id == taxonomy.id)
+    }
+
+
+def sync_unchanged_test(api, deep_taxonomy):
+    tree = to_json(api, deep_taxonomy)
+    assert api.sync_taxonomy('deep', tree) == {'created': [], 'updated': [], 'deleted': [], 'moved': []}
+
+
+def sync_test(api, deep_taxonomy):
+    tree = [
+        {'slug': 'a', 'title': 'A', 'children': [
+            {'slug': 'a/aa', 'title': 'AA changed'},
+            {'slug': 'ab', 'title': 'AB', 'children': [
+                {'slug': 'aba', 'title': 'ABA'}
+            ]}
+        ]},
+        {'slug': 'b', 'title': 'B', 'children': [
+            {'slug': 'b/b1', 'title': 'B1'},
+        ]},
+    ]
+    assert api.sync_taxonomy('deep', tree, dry_run=True) == {
+        'created': ['a/ab', 'a/ab/aba'],
+        'updated': ['a/aa'],
+        'deleted': ['a/aa/aaa', 'a/aa/aaa/aaaa', 'b/b2', 'b/b2/b21', 'b/b2/b22'],
+        'moved': []
+    }
+    assert api.session.query(TaxonomyTerm).filter(TaxonomyTerm.slug == 'a/ab').count() == 0
+
+    api.sync_taxonomy('deep', tree)
+    api.commit()
+    terms = _terms(api, deep_taxonomy)
+    assert terms['a/aa'] == (TermStatusEnum.alive, {'title': 'AA changed'}, 1)
+    assert terms['a/ab/aba'] == (TermStatusEnum.alive, {'title': 'ABA'}, 2)
+    assert terms['b/b2'][0] == TermStatusEnum.deleted
+    assert terms['b/b2/b22'][0] == TermStatusEnum.deleted
+    parent = api.session.query(TaxonomyTerm).filter(TaxonomyTerm.slug == 'a/ab/aba').one().parent
+    assert parent.slug == 'a/ab'
+
+    # deleted terms are revived when they appear in the tree again
+    tree[1]['children'].append({'slug': 'b2', 'title': 'B2 again'})
+    assert api.sync_taxonomy('deep', tree)['created'] == ['b/b2']
+    assert _terms(api, deep_taxonomy)['b/b2'] == (TermStatusEnum.alive, {'title': 'B2 again'}, 1)
+
+
+def sync_move_test(api, deep_taxonomy):
+    tree = to_json(api, deep_taxonomy)
+    b = tree[1]
+    assert b['slug'] == 'b'
+    b2 = b['children'].pop()
+    assert b2['slug'] == 'b/b2'
+    tree[0]['children'].append({**b2, 'slug': 'a/c', 'children': [
+        {**b2['children'][0], 'slug': 'a/c/b21'},
+        {'slug': 'a/c/new'}
+    ]})
+    b['children'].append({'slug': 'b/b2', 'status': 'D', 'obsoleted_by': 'a/c'})
+
+    diff = api.sync_taxonomy('deep', tree)
+    api.commit()
+    assert diff == {
+        'created': ['a/c/new'],
+        'updated': [],
+        'deleted': ['a/c/b22'],
+        'moved': [['b/b2', 'a/c']]
+    }
+    terms = _terms(api, deep_taxonomy)
+    assert terms['b/b2'][0] == TermStatusEnum.deleted
+    assert terms['a/c'] == (TermStatusEnum.alive, {'title': 'B2'}, 1)
+    assert terms['a/c/b21'][0] == TermStatusEnum.alive
+    old = api.session.query(TaxonomyTerm).filter(TaxonomyTerm.slug == 'b/b2').one()
+    assert old.obsoleted_by.slug == 'a/c'
+
+    assert api.sync_taxonomy('deep', to_json(api, deep_taxonomy), dry_run=True) == {
+        'created': [], 'updated': [], 'deleted': [], 'moved': []
+    }
+
+
+def sync_invalid_tree_test(api, deep_taxonomy):
+    with pytest.raises(TaxonomyError):
+        api.sync_taxonomy('deep', [{'title': 'no slug'}])
+
+
+def _term_id(api, slug):
+    return api.session.query(TaxonomyTerm.id).filter(TaxonomyTerm.slug == slug).scalar()
+
+
+def sync_busy_test(api, deep_taxonomy):
+    api.mark_busy([_term_id(api, 'a')])
+    tree = to_json(api, deep_taxonomy)
+
+    # terms inside a busy subtree can not be changed
+    tree[0]['children'][0]['title'] = 'AA changed'
+    with pytest.raises(TaxonomyTermBusyError):
+        api.sync_taxonomy('deep', tree)
+    tree = to_json(api, deep_taxonomy)
+    tree[0]['children'].append({'slug': 'a/new'})
+    with pytest.raises(TaxonomyTermBusyError):
+        api.sync_taxonomy('deep', tree)
+
+    # nor moved into one
+    tree = to_json(api, deep_taxonomy)
+    b2 = tree[1]['children'].pop()
+    tree[0]['children'].append({**b2, 'slug': 'a/c', 'children': []})
+    tree[1]['children'].append({'slug': 'b/b2', 'status': 'D', 'obsoleted_by': 'a/c'})
+    with pytest.raises(TaxonomyTermBusyError):
+        api.sync_taxonomy('deep', tree)
+
+    # a subtree containing a busy term can not be moved
+    api.mark_busy([_term_id(api, 'b/b2/b21')])
+    tree = to_json(api, deep_taxonomy)
+    b2 = tree[1]['children'].pop()
+    tree.append({**b2, 'slug': 'c', 'children': []})
+    tree[1]['children'].append({'slug': 'b/b2', 'status': 'D', 'obsoleted_by': 'c'})
+    with pytest.raises(TaxonomyTermBusyError):
+        api.sync_taxonomy('deep', tree)
+
+    # terms outside busy subtrees can be changed
+    tree = to_json(api, deep_taxonomy)
+    tree[1]['children'][0]['title'] = 'B1 changed'
+    assert api.sync_taxonomy('deep', tree)['updated'] == ['b/b1']
+
+
+def sync_rest_test(api, client, sample_taxonomy):
+    resp = client.post('/api/2.0/taxonomies/test/_sync?dry_run=true',
+                       data=json.dumps([{'slug': 'c'}]), content_type='application/json')
+    assert resp.status_code == 200
+    assert resp.json == {'created': ['c'], 'updated': [], 'deleted': ['a', 'a/aa', 'b'], 'moved': []}
+
+    resp = client.post('/api/2.0/taxonomies/test/_sync',
+                       data=json.dumps([{'slug': 'c'}]), content_type='application/json')
+    assert resp.status_code == 200
+    assert client.get('/api/2.0/taxonomies/test/c').status_code == 200
+    assert client.get('/api/2.0/taxonomies/test/a').status_code == 410
+
+
+def sync_cli_test(app, api, sample_taxonomy, tmpdir):
+    tree = tmpdir.join('tree.json')
+    tree.write(json.dumps([{'slug': 'a', 'title': 'A'}, {'slug': 'b', 'title': 'B'}]))
+    result = app.test_cli_runner().invoke(args=['taxonomies', 'sync', 'test', str(tree)])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines() == ['- a/aa', '0 created, 0 updated, 1 deleted, 0 moved']
+
+    result = app.test_cli_runner().invoke(args=['taxonomies', 'sync', 'unknown', str(tree)])
+    assert result.exit_code == 1
+    assert 'Error: Taxonomy unknown does not exist' in result.output
+
+    tree.write(json.dumps([{'title': 'no slug'}]))
+    result = app.test_cli_runner().invoke(args=['taxonomies', 'sync', 'test', str(tree)])
+    assert result.exit_code == 1
+    assert 'Error: Every node of the tree must be an object with a slug' in result.output
+
+
+def sync_rest_errors_test(api, client, sample_taxonomy):
+    resp = client.post('/api/2.0/taxonomies/test/_sync',
+                       data=json.dumps([{'title': 'no slug'}]), content_type='application/json')
+    assert resp.status_code == 400
+    assert resp.json['reason'] == 'invalid-tree'
+
+    resp = client.post('/api/2.0/taxonomies/test/_sync',
+                       data=json.dumps({'slug': 'c'}), content_type='application/json')
+    assert resp.status_code == 400
+    assert resp.json['reason'] == 'invalid-payload'
+
+    api.mark_busy([_term_id(api, 'a')])
+    api.commit()
+    resp = client.post('/api/2.0/taxonomies/test/_sync',
+                       data=json.dumps([{'slug': 'c'}]), content_type='application/json')
+    assert resp.status_code == 412
+    assert resp.json['reason'] == 'term-busy'
+    assert client.get('/api/2.0/taxonomies/test/b').status_code == 200
+
+
+def _admin_deletes_top_level(request, taxonomy, term):
+    if '/' not in term.slug:
+        return [Permission(UserNeed('admin'))]
+    return []
+
+
+@pytest.mark.parametrize('app', [{
+    'FLASK_TAXONOMIES_PERMISSION_FACTORIES': {
+        'taxonomy_term_delete': _admin_deletes_top_level
+    }
+}], indirect=['app'])
+def sync_rest_permissions_test(api, client, sample_taxonomy):
+    tree = json.dumps([{'slug': 'a', 'title': 'A'}, {'slug': 'c'}])
+    for url in ('/api/2.0/taxonomies/test/_sync', '/api/2.0/taxonomies/test/_sync?dry_run=true'):
+        resp = client.post(url, data=json.dumps([{'slug': 'a', 'title': 'A'}, {'slug': 'b', 'title': 'B'}]),
+                           content_type='application/json')
+        assert resp.status_code == 200
+        resp = client.post(url, data=tree, content_type='application/json')
+        assert resp.status_code == 403
+    # nothing has been changed
+    assert client.get('/api/2.0/taxonomies/test/c').status_code == 404
+    assert client.get('/api/2.0/taxonomies/test/b').status_code == 200
+
+    client.post('/login', json={'username': 'admin'})
+    resp = client.post('/api/2.0/taxonomies/test/_sync', data=tree, content_type='application/json')
+    assert resp.status_code == 200
+    assert resp.json['deleted'] == ['b']
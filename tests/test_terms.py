@@ -1,4 +1,5 @@
 import pytest
+from sqlalchemy.orm.exc import NoResultFound
 
 from flask_taxonomies.api import TermIdentification
 from flask_taxonomies.models import TaxonomyError, TaxonomyTerm, TermStatusEnum
@@ -215,3 +216,21 @@ def update_test(api, test_taxonomy):
     api.session.commit()
     api.session.refresh(term)
     assert term.extra_data == {'a': 'c'}
+
+
+def update_loaded_term_test(api, test_taxonomy):
+    term = api.create_term(TermIdentification(taxonomy=test_taxonomy, slug='b'))
+    api.session.commit()
+    api.delete_term(term, remove_after_delete=False)
+    api.session.commit()
+
+    # the term is looked up again with status_cond
+    with pytest.raises(NoResultFound):
+        api.update_term(term, extra_data={'a': 'b'})
+
+    # the loaded term is updated as it is, its status is checked by the caller
+    assert api.update_term(term, extra_data={'a': 'c'}, status=TermStatusEnum.alive, reload=False) is term
+    api.session.commit()
+    api.session.refresh(term)
+    assert term.extra_data == {'a': 'c'}
+    assert term.status == TermStatusEnum.alive